@@ -0,0 +1,46 @@
+"""Add the discord_author_daily message-count rollup.
+
+Revision ID: discord_author_daily_006
+Revises: discord_checkpoints_005
+Create Date: 2026-10-17
+
+Creates discord_author_daily (messages per lower(author_name) per UTC hour) and
+backfills it from discord_messages. DiscordFetcher keeps it current afterwards.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+revision = 'discord_author_daily_006'
+down_revision = 'discord_checkpoints_005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('discord_author_daily'):  # init_db() may have created it
+        op.create_table(
+            'discord_author_daily',
+            sa.Column('author_key', sa.String(), primary_key=True),
+            sa.Column('day', sa.String(), primary_key=True),
+            sa.Column('hour', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.Integer()),
+            sa.Column('message_count', sa.Integer(), nullable=False),
+        )
+        op.create_index('ix_discord_author_daily_day', 'discord_author_daily', ['day'])
+        op.create_index('ix_discord_author_daily_user_id', 'discord_author_daily', ['user_id'])
+
+    bind.execute(text("DELETE FROM discord_author_daily"))
+    bind.execute(text("""
+        INSERT INTO discord_author_daily (author_key, day, hour, user_id, message_count)
+        SELECT COALESCE(lower(author_name), ''), strftime('%Y-%m-%d', created_at),
+               CAST(strftime('%H', created_at) AS INTEGER), MAX(user_id), COUNT(*)
+        FROM discord_messages
+        WHERE created_at IS NOT NULL
+        GROUP BY 1, 2, 3
+    """))
+
+
+def downgrade():
+    op.drop_table('discord_author_daily')
@@ -0,0 +1,46 @@
+"""Add per-channel Discord harvest checkpoints.
+
+Revision ID: discord_checkpoints_005
+Revises: normalize_user_ids_004
+Create Date: 2026-10-17
+
+Creates discord_channel_checkpoints (one row per channel holding the last
+harvested message id) and seeds it from the messages already stored, so the
+first concurrent harvest resumes each channel from its own watermark.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+revision = 'discord_checkpoints_005'
+down_revision = 'normalize_user_ids_004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('discord_channel_checkpoints'):  # init_db() may have created it
+        op.create_table(
+            'discord_channel_checkpoints',
+            sa.Column('channel_id', sa.Integer(), primary_key=True, autoincrement=False),
+            sa.Column('channel_name', sa.String()),
+            sa.Column('guild_id', sa.Integer()),
+            sa.Column('last_message_id', sa.Integer(), nullable=False),
+            sa.Column('last_message_at', sa.DateTime()),
+            sa.Column('updated_at', sa.DateTime()),
+        )
+
+    # Discord snowflakes increase with time, so MAX(id) is the channel's newest message
+    bind.execute(text("""
+        INSERT OR IGNORE INTO discord_channel_checkpoints
+            (channel_id, channel_name, guild_id, last_message_id, last_message_at, updated_at)
+        SELECT channel_id, MAX(channel_name), MAX(guild_id), MAX(id), MAX(created_at), CURRENT_TIMESTAMP
+        FROM discord_messages
+        WHERE channel_id IS NOT NULL
+        GROUP BY channel_id
+    """))
+
+
+def downgrade():
+    op.drop_table('discord_channel_checkpoints')
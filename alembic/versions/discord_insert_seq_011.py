@@ -0,0 +1,36 @@
+"""Add insert_seq to discord_messages (insertion-order watermark).
+
+Revision ID: discord_insert_seq_011
+Revises: pipeline_runs_010
+Create Date: 2026-10-17
+
+DiscordFetcher._save_batch inserts each message with MAX(insert_seq) + 1,
+evaluated inside the INSERT under SQLite's write lock, so insert_seq follows
+commit order. Snowflake ids do not: channels are harvested concurrently, so a
+message with a lower id can be committed after one with a higher id.
+TrigramNameMatcher reads new authors past this watermark. Existing rows keep
+NULL and are covered by the matcher's first full build.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+revision = 'discord_insert_seq_011'
+down_revision = 'pipeline_runs_010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    columns = {row[1] for row in bind.execute(text("PRAGMA table_info(discord_messages)")).fetchall()}
+
+    if 'insert_seq' not in columns:
+        op.add_column('discord_messages', sa.Column('insert_seq', sa.Integer(), nullable=True))
+        op.create_index('ix_discord_messages_insert_seq', 'discord_messages', ['insert_seq'])
+
+
+def downgrade():
+    op.drop_index('ix_discord_messages_insert_seq', 'discord_messages')
+    with op.batch_alter_table('discord_messages') as batch:
+        batch.drop_column('insert_seq')
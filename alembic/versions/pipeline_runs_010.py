@@ -0,0 +1,43 @@
+"""Add pipeline_runs (per-stage run telemetry history).
+
+Revision ID: pipeline_runs_010
+Revises: snapshot_dedup_009
+Create Date: 2026-10-17
+
+main.py appends one row per stage after every run (core/telemetry.py). The
+table is excluded from the pipeline's database fingerprint, so recording a
+run does not make the next one look changed.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'pipeline_runs_010'
+down_revision = 'snapshot_dedup_009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('pipeline_runs'):  # init_db() may have created it
+        op.create_table(
+            'pipeline_runs',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('run_id', sa.String()),
+            sa.Column('started_at', sa.DateTime()),
+            sa.Column('stage', sa.String()),
+            sa.Column('status', sa.String()),
+            sa.Column('wall_s', sa.Float()),
+            sa.Column('cpu_s', sa.Float()),
+            sa.Column('peak_rss_mb', sa.Float()),
+            sa.Column('rows_read', sa.Integer()),
+            sa.Column('rows_written', sa.Integer()),
+            sa.Column('http_requests', sa.Integer()),
+            sa.Column('metrics', sa.Text()),
+        )
+        op.create_index('ix_pipeline_runs_run_id', 'pipeline_runs', ['run_id'])
+        op.create_index('ix_pipeline_runs_started_at', 'pipeline_runs', ['started_at'])
+        op.create_index('ix_pipeline_runs_stage', 'pipeline_runs', ['stage'])
+
+
+def downgrade():
+    op.drop_table('pipeline_runs')
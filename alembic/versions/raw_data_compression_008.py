@@ -0,0 +1,39 @@
+"""Add raw_data_dictionaries for compressed wom_snapshots.raw_data.
+
+Revision ID: raw_data_compression_008
+Revises: skill_snapshots_007
+Create Date: 2026-10-17
+
+Schema only: compression is opt-in. Existing rows stay JSON text until
+scripts/compress_raw_data.py --train --compress is run (it reports size and
+throughput before and after); readers accept both formats.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'raw_data_compression_008'
+down_revision = 'skill_snapshots_007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('raw_data_dictionaries'):  # init_db() may have created it
+        op.create_table(
+            'raw_data_dictionaries',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('dictionary', sa.LargeBinary(), nullable=False),
+            sa.Column('sample_count', sa.Integer()),
+            sa.Column('created_at', sa.DateTime()),
+        )
+
+
+def downgrade():
+    # Compressed rows would be unreadable without their dictionaries
+    bind = op.get_bind()
+    remaining = bind.execute(sa.text(
+        "SELECT COUNT(*) FROM wom_snapshots WHERE typeof(raw_data) = 'blob'"
+    )).scalar()
+    if remaining:
+        raise RuntimeError(f"{remaining} compressed raw_data rows; run scripts/compress_raw_data.py --decompress first")
+    op.drop_table('raw_data_dictionaries')
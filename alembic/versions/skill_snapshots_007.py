@@ -0,0 +1,75 @@
+"""Add skill_snapshots and activity_snapshots.
+
+Revision ID: skill_snapshots_007
+Revises: discord_author_daily_006
+Create Date: 2026-10-17
+
+Typed per-skill and per-activity rows extracted from wom_snapshots.raw_data,
+so 99 counts and similar stats no longer parse JSON. Existing history is
+backfilled with SQLite's json_each; SnapshotIngestor writes new rows at ingest
+(scripts/backfill_skill_snapshots.py does the same backfill outside alembic).
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+revision = 'skill_snapshots_007'
+down_revision = 'discord_author_daily_006'
+branch_labels = None
+depends_on = None
+
+# Harvested rows wrap the player data in 'data'; older rows may not
+_DATA = "CASE WHEN json_type(ws.raw_data, '$.data') = 'object' THEN '$.data' ELSE '$' END"
+
+
+def upgrade():
+    bind = op.get_bind()
+    existing = sa.inspect(bind)  # init_db() may have created the tables
+    if not existing.has_table('skill_snapshots'):
+        op.create_table(
+            'skill_snapshots',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('snapshot_id', sa.Integer()),
+            sa.Column('skill', sa.String()),
+            sa.Column('level', sa.Integer()),
+            sa.Column('experience', sa.Integer()),
+            sa.Column('rank', sa.Integer()),
+        )
+        op.create_index('ix_skill_snapshots_snapshot_id', 'skill_snapshots', ['snapshot_id'])
+        op.create_index('ix_skill_snapshots_skill', 'skill_snapshots', ['skill'])
+
+    if not existing.has_table('activity_snapshots'):
+        op.create_table(
+            'activity_snapshots',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('snapshot_id', sa.Integer()),
+            sa.Column('activity', sa.String()),
+            sa.Column('score', sa.Integer()),
+            sa.Column('rank', sa.Integer()),
+        )
+        op.create_index('ix_activity_snapshots_snapshot_id', 'activity_snapshots', ['snapshot_id'])
+        op.create_index('ix_activity_snapshots_activity', 'activity_snapshots', ['activity'])
+
+    bind.execute(text("DELETE FROM skill_snapshots"))
+    bind.execute(text("DELETE FROM activity_snapshots"))
+    bind.execute(text(f"""
+        INSERT INTO skill_snapshots (snapshot_id, skill, level, experience, rank)
+        SELECT ws.id, j.key,
+               COALESCE(json_extract(j.value, '$.level'), 0),
+               COALESCE(json_extract(j.value, '$.experience'), 0),
+               COALESCE(json_extract(j.value, '$.rank'), 0)
+        FROM wom_snapshots ws, json_each(ws.raw_data, {_DATA} || '.skills') j
+        WHERE json_valid(ws.raw_data)
+    """))
+    bind.execute(text(f"""
+        INSERT INTO activity_snapshots (snapshot_id, activity, score, rank)
+        SELECT ws.id, j.key, json_extract(j.value, '$.score'),
+               COALESCE(json_extract(j.value, '$.rank'), 0)
+        FROM wom_snapshots ws, json_each(ws.raw_data, {_DATA} || '.activities') j
+        WHERE json_valid(ws.raw_data) AND COALESCE(json_extract(j.value, '$.score'), -1) > -1
+    """))
+
+
+def downgrade():
+    op.drop_table('activity_snapshots')
+    op.drop_table('skill_snapshots')
@@ -0,0 +1,60 @@
+"""Add content_hash / ref_snapshot_id to wom_snapshots.
+
+Revision ID: snapshot_dedup_009
+Revises: raw_data_compression_008
+Create Date: 2026-10-17
+
+SnapshotIngestor stores a snapshot whose data is identical to one already
+saved for the player as a reference row: no raw_data and no boss/skill rows,
+ref_snapshot_id pointing at the row that has them. Existing rows keep a NULL
+hash and are never referenced, so no backfill is needed.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+revision = 'snapshot_dedup_009'
+down_revision = 'raw_data_compression_008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    columns = {row[1] for row in bind.execute(text("PRAGMA table_info(wom_snapshots)")).fetchall()}
+
+    if 'content_hash' not in columns:
+        op.add_column('wom_snapshots', sa.Column('content_hash', sa.String(), nullable=True))
+        op.create_index('ix_wom_snapshots_content_hash', 'wom_snapshots', ['content_hash'])
+    if 'ref_snapshot_id' not in columns:
+        op.add_column('wom_snapshots', sa.Column('ref_snapshot_id', sa.Integer(), nullable=True))
+        op.create_index('ix_wom_snapshots_ref_snapshot_id', 'wom_snapshots', ['ref_snapshot_id'])
+
+
+def downgrade():
+    bind = op.get_bind()
+    # Materialise references so every row carries its own payload and boss/skill rows again
+    bind.execute(text("""
+        UPDATE wom_snapshots
+        SET raw_data = (SELECT src.raw_data FROM wom_snapshots src WHERE src.id = wom_snapshots.ref_snapshot_id)
+        WHERE ref_snapshot_id IS NOT NULL
+    """))
+    bind.execute(text("""
+        INSERT INTO boss_snapshots (snapshot_id, wom_snapshot_id, boss_name, kills, rank)
+        SELECT ws.id, ws.id, bs.boss_name, bs.kills, bs.rank
+        FROM wom_snapshots ws JOIN boss_snapshots bs ON bs.snapshot_id = ws.ref_snapshot_id
+        WHERE ws.ref_snapshot_id IS NOT NULL
+    """))
+    for table, cols in (("skill_snapshots", "skill, level, experience, rank"),
+                        ("activity_snapshots", "activity, score, rank")):
+        bind.execute(text(f"""
+            INSERT INTO {table} (snapshot_id, {cols})
+            SELECT ws.id, {', '.join('t.' + c.strip() for c in cols.split(','))}
+            FROM wom_snapshots ws JOIN {table} t ON t.snapshot_id = ws.ref_snapshot_id
+            WHERE ws.ref_snapshot_id IS NOT NULL
+        """))
+    op.drop_index('ix_wom_snapshots_ref_snapshot_id', 'wom_snapshots')
+    op.drop_index('ix_wom_snapshots_content_hash', 'wom_snapshots')
+    with op.batch_alter_table('wom_snapshots') as batch:
+        batch.drop_column('ref_snapshot_id')
+        batch.drop_column('content_hash')
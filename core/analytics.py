@@ -12,26 +12,140 @@ backward compatibility during transition period.
 Timestamps: All methods use UTC internally. Use TimestampHelper for creating cutoff dates.
 """
 import logging
-import json
+import threading
 from collections import defaultdict
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, NamedTuple, Optional, Any
 from sqlalchemy import select, func, and_, text
 from sqlalchemy.orm import Session
 
-from database.models import WOMSnapshot, DiscordMessage, ClanMember, BossSnapshot
+from database.models import WOMSnapshot, ClanMember, SkillSnapshot
 from core.usernames import UsernameNormalizer
 from core.timestamps import TimestampHelper
+from core import telemetry
 from core.config import Config
+from core.snapshot_index import SnapshotAsOfIndex
+from core.boss_matrix import BossMatrix
+from database import rollups
+from services.identity_service import IdentityIndex
 from services.user_access_service import UserAccessService
 
 logger = logging.getLogger("Analytics")
 
+
+class SnapshotRow(NamedTuple):
+    """
+    Detached wom_snapshots row (every column but raw_data), as memoized by AnalyticsSnapshot.
+
+    Memoized datasets outlive the session that loaded them and are read from
+    other sessions and threads, so they hold plain tuples rather than ORM
+    instances that would lazy-load through their original session.
+    """
+    id: int
+    user_id: Optional[int]
+    username: str
+    timestamp: Optional[datetime]
+    total_xp: Optional[int]
+    total_boss_kills: Optional[int]
+    ehp: Optional[float]
+    ehb: Optional[float]
+    ref_snapshot_id: Optional[int]
+
+    @property
+    def source_id(self) -> int:
+        """Id of the row holding this snapshot's raw_data and boss/skill rows."""
+        return self.ref_snapshot_id or self.id
+
+
+SNAPSHOT_ROW_COLUMNS = [getattr(WOMSnapshot, name) for name in SnapshotRow._fields]
+
+
+class AnalyticsSnapshot:
+    """
+    Run-scoped memo of analytics datasets, keyed by (dataset, window).
+
+    Each dataset is computed on first use and reused by every later caller in the
+    process (export, Excel report, chart helpers). The memo is dropped when the
+    database's data version moves: `PRAGMA data_version` for commits from other
+    connections, `total_changes()` for writes on this one.
+
+    `now` is frozen when the context is created, so `cutoff(days)` returns the same
+    datetime for every caller and windowed datasets share memo keys.
+    Returned datasets are shared; treat them as read-only. Snapshots are held as
+    SnapshotRow tuples, never as session-bound ORM objects. Safe to share between
+    threads (core/pipeline.py runs report stages concurrently): a dataset is
+    computed once while other callers wait for it.
+    """
+
+    def __init__(self, db_session: Session, now: Optional[datetime] = None):
+        self.db = db_session
+        self.now = now or datetime.now(timezone.utc)
+        self._memo: Dict[Any, Any] = {}
+        self._version: Optional[tuple] = None
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def cutoff(self, days: int) -> datetime:
+        return self.now - timedelta(days=days)
+
+    def data_version(self) -> tuple:
+        return (
+            self.db.execute(text("PRAGMA data_version")).scalar(),
+            self.db.execute(text("SELECT total_changes()")).scalar(),
+        )
+
+    def _check_version(self) -> None:
+        version = self.data_version()
+        if version != self._version:
+            if self._memo:
+                logger.debug(f"Data version moved {self._version} -> {version}; dropping {len(self._memo)} datasets")
+            self._memo.clear()
+            self._version = version
+
+    def peek(self, dataset: str, window: Any = None) -> Any:
+        """Memoized value or None, without computing."""
+        with self.lock:
+            self._check_version()
+            return self._memo.get((dataset, window))
+
+    def get(self, dataset: str, window: Any, compute):
+        with self.lock:
+            self._check_version()
+            key = (dataset, window)
+            if key in self._memo:
+                self.hits += 1
+                telemetry.count("analytics_cache_hits")
+                return self._memo[key]
+            self.misses += 1
+            telemetry.count("analytics_cache_misses")
+            value = self._memo[key] = compute()
+            return value
+
+    def put(self, dataset: str, window: Any, value: Any) -> None:
+        with self.lock:
+            self._check_version()
+            self._memo[(dataset, window)] = value
+
+    def invalidate(self, dataset: Optional[str] = None) -> None:
+        with self.lock:
+            if dataset is None:
+                self._memo.clear()
+            else:
+                for key in [k for k in self._memo if k[0] == dataset]:
+                    del self._memo[key]
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"datasets": len(self._memo), "hits": self.hits, "misses": self.misses}
+
+
 class AnalyticsService:
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, context: Optional[AnalyticsSnapshot] = None):
         self.db = db_session
         # Initialize unified access service
-        self.user_access = UserAccessService(db_session)
+        self.user_access = UserAccessService(db_session, identity_index=IdentityIndex.for_session(db_session))
+        # Shared per-run memo; pass one context to several services/reports to share datasets
+        self.context = context or AnalyticsSnapshot(db_session)
 
     @staticmethod
     def _as_int(value: Any) -> Optional[int]:
@@ -40,40 +154,55 @@ class AnalyticsService:
         except (TypeError, ValueError):
             return None
 
-    def _latest_snapshots_windowed(self, cutoff_date: Optional[datetime] = None) -> List[WOMSnapshot]:
-        """Return the latest snapshot per username with deterministic ordering."""
-        window_stmt = select(
-            WOMSnapshot.id,
-            WOMSnapshot.username,
-            WOMSnapshot.timestamp,
-            WOMSnapshot.total_xp,
-            WOMSnapshot.total_boss_kills,
-            func.row_number().over(
-                partition_by=WOMSnapshot.username,
-                order_by=(WOMSnapshot.timestamp.desc(), WOMSnapshot.id.desc())
-            ).label("rn")
-        )
+    def snapshot_index(self) -> SnapshotAsOfIndex:
+        """As-of index over wom_snapshots, loaded once per data version (see core/snapshot_index.py)."""
+        return self.context.get("snapshot_index", None, lambda: SnapshotAsOfIndex.load(self.db))
+
+    def boss_matrix(self, snapshot_ids: Optional[List[int]] = None) -> BossMatrix:
+        """Run-scoped snapshot x boss kill matrix (see core/boss_matrix.py), extended with any missing ids."""
+        with self.context.lock:
+            matrix = self.context.get("boss_matrix", None, BossMatrix)
+            if snapshot_ids:
+                matrix.ensure(self.db, snapshot_ids)
+        return matrix
+
+    def refresh_snapshot_index(self) -> None:
+        """Drop the as-of index and everything derived from it."""
+        for dataset in ("snapshot_index", "latest_snapshots", "snapshots_at_cutoff", "min_timestamps"):
+            self.context.invalidate(dataset)
+
+    def _snapshots_as_of(self, cutoffs: List[Optional[datetime]]) -> Dict[Optional[datetime], List[SnapshotRow]]:
+        """Latest snapshot per username at or before each cutoff, loaded in one pass."""
+        baselines = self.snapshot_index().baselines(cutoffs)
+        rows = self._load_snapshot_rows({snap.id for per_user in baselines.values() for snap in per_user.values()})
+        return {
+            cutoff: [rows[snap.id] for snap in per_user.values() if snap.id in rows]
+            for cutoff, per_user in baselines.items()
+        }
 
-        if cutoff_date is not None:
-            window_stmt = window_stmt.where(WOMSnapshot.timestamp <= cutoff_date)
+    def _load_snapshot_rows(self, snapshot_ids) -> Dict[int, SnapshotRow]:
+        ids = list(snapshot_ids)
+        rows: Dict[int, SnapshotRow] = {}
+        for i in range(0, len(ids), 900):  # stay under SQLite's bound-parameter limit
+            stmt = select(*SNAPSHOT_ROW_COLUMNS).where(WOMSnapshot.id.in_(ids[i:i + 900]))
+            rows.update((row[0], SnapshotRow(*row)) for row in self.db.execute(stmt))
+        return rows
 
-        subq = window_stmt.subquery()
+    def _latest_snapshots_windowed(self, cutoff_date: Optional[datetime] = None) -> List[SnapshotRow]:
+        """Return the latest snapshot per username (at or before cutoff_date when given)."""
+        return self._snapshots_as_of([cutoff_date])[cutoff_date]
 
-        stmt = (
-            select(WOMSnapshot)
-            .join(subq, WOMSnapshot.id == subq.c.id)
-            .where(subq.c.rn == 1)
-        )
+    def _cutoff(self, days: int) -> datetime:
+        return self.context.cutoff(days)
 
-        return list(self.db.execute(stmt).scalars().all())
-
-    def get_latest_snapshots(self) -> Dict[str, WOMSnapshot]:
+    def get_latest_snapshots(self) -> Dict[str, SnapshotRow]:
         """
         Fetches the absolute latest snapshot for every user.
-        Returns: {normalized_username: WOMSnapshot}
+        Returns: {normalized_username: SnapshotRow}
         """
-        results = self._latest_snapshots_windowed()
-        return {UsernameNormalizer.normalize(str(r.username)): r for r in results}
+        return self.context.get("latest_snapshots", None, lambda: {
+            UsernameNormalizer.normalize(str(r.username)): r for r in self._latest_snapshots_windowed()
+        })
 
     def get_active_members(self) -> List[ClanMember]:
         """
@@ -84,29 +213,18 @@ class AnalyticsService:
         return list(self.db.execute(stmt).scalars().all())
 
 
-    def get_min_timestamps(self) -> Dict[str, WOMSnapshot]:
+    def get_min_timestamps(self) -> Dict[str, SnapshotRow]:
         """
         Fetches the FIRST seen snapshot for every user.
         Used for calculating 'Days in Clan' fallback or lifetime gains.
-        Returns: {normalized_username: WOMSnapshot}
+        Returns: {normalized_username: SnapshotRow}
         """
-        # Subquery: Min timestamp per user
-        subq = (
-            select(WOMSnapshot.username, func.min(WOMSnapshot.timestamp).label("min_ts"))
-            .group_by(WOMSnapshot.username)
-            .subquery()
-        )
-        
-        stmt = (
-            select(WOMSnapshot)
-            .join(subq, and_(
-                WOMSnapshot.username == subq.c.username,
-                WOMSnapshot.timestamp == subq.c.min_ts
-            ))
-        )
-        
-        results = list(self.db.execute(stmt).scalars().all())
-        return {UsernameNormalizer.normalize(str(r.username)): r for r in results}
+        def compute():
+            first = self.snapshot_index().earliest()
+            rows = self._load_snapshot_rows(snap.id for snap in first.values())
+            results = [rows[snap.id] for snap in first.values() if snap.id in rows]
+            return {UsernameNormalizer.normalize(str(r.username)): r for r in results}
+        return self.context.get("min_timestamps", None, compute)
 
     def get_clan_records(self) -> List[Dict[str, Any]]:
         """
@@ -142,37 +260,39 @@ class AnalyticsService:
             logger.error(f"Failed to fetch clan records: {e}")
             return []
 
-    def get_snapshots_at_cutoff(self, cutoff_date: datetime) -> Dict[str, WOMSnapshot]:
+    def get_snapshots_at_cutoff(self, cutoff_date: datetime) -> Dict[str, SnapshotRow]:
         """
         Fetches the snapshot closest to (available at or after) the cutoff date.
         Used for calculating gains (Current - Old).
         """
-        results = self._latest_snapshots_windowed(cutoff_date)
-        return {UsernameNormalizer.normalize(str(r.username)): r for r in results}
+        return self.get_snapshots_at_cutoffs([cutoff_date])[cutoff_date]
+
+    def get_snapshots_at_cutoffs(self, cutoff_dates: List[datetime]) -> Dict[datetime, Dict[str, SnapshotRow]]:
+        """
+        Bulk get_snapshots_at_cutoff(): {cutoff: {normalized_username: SnapshotRow}}.
+        All cutoffs are answered from the same as-of index and one row fetch.
+        """
+        missing = [c for c in cutoff_dates if self.context.peek("snapshots_at_cutoff", c) is None]
+        if missing:
+            for cutoff, results in self._snapshots_as_of(missing).items():
+                self.context.put("snapshots_at_cutoff", cutoff,
+                                 {UsernameNormalizer.normalize(str(r.username)): r for r in results})
+        return {c: self.context.peek("snapshots_at_cutoff", c) for c in cutoff_dates}
 
     def get_message_counts(self, start_date: datetime) -> Dict[str, int]:
         """
         Counts discord messages per user since start_date.
         Handles case-insensitivity.
         """
-        stmt = (
-            select(
-                func.lower(DiscordMessage.author_name).label("name"), 
-                func.count(DiscordMessage.id).label("msg_count")
-            )
-            .where(DiscordMessage.created_at >= start_date)
-            .group_by(func.lower(DiscordMessage.author_name))
-        )
-        
-        results = self.db.execute(stmt).all()
-        
-        # Normalize keys
-        counts = {}
-        for row in results:
-            norm = UsernameNormalizer.normalize(row.name)
-            counts[norm] = counts.get(norm, 0) + int(row.msg_count)
-            
-        return counts
+        def compute():
+            # Normalize keys
+            counts = {}
+            for name, msg_count in rollups.author_message_counts(self.db, start_date).items():
+                norm = UsernameNormalizer.normalize(name)
+                counts[norm] = counts.get(norm, 0) + msg_count
+            return counts
+
+        return self.context.get("message_counts", start_date, compute)
 
     def calculate_gains(self, current_map: Dict[str, WOMSnapshot], 
                         old_map: Dict[str, WOMSnapshot],
@@ -232,24 +352,10 @@ class AnalyticsService:
         return gains
 
     def _get_boss_kills_by_snapshot(self, snapshot_ids: List[int]) -> Dict[int, Dict[str, int]]:
-        """Fetch boss kills per snapshot ID in a single query to avoid N+1 patterns."""
+        """Boss kills per snapshot ID, served from the shared boss matrix."""
         if not snapshot_ids:
             return {}
-
-        from database.models import BossSnapshot
-
-        stmt = (
-            select(BossSnapshot.snapshot_id, BossSnapshot.boss_name, BossSnapshot.kills)
-            .where(BossSnapshot.snapshot_id.in_(snapshot_ids))
-        )
-
-        data: Dict[int, Dict[str, int]] = {}
-        for row in self.db.execute(stmt).all():
-            snap_id, boss_name, kills = row
-            if snap_id not in data:
-                data[snap_id] = {}
-            data[snap_id][boss_name] = (kills or 0)
-        return data
+        return self.boss_matrix(snapshot_ids).as_dicts(snapshot_ids)
 
     def get_detailed_boss_gains(self, current_map: Dict[str, WOMSnapshot],
                               old_map: Dict[str, WOMSnapshot]) -> Dict[str, int]:
@@ -263,17 +369,9 @@ class AnalyticsService:
         if not curr_ids:
             return {}
 
-        all_ids = list(set(curr_ids + old_ids))
-        boss_data = self._get_boss_kills_by_snapshot(all_ids)
-
-        curr_sums: Dict[str, int] = defaultdict(int)
-        old_sums: Dict[str, int] = defaultdict(int)
-        curr_set = set(curr_ids)
-
-        for snap_id, bosses in boss_data.items():
-            target = curr_sums if snap_id in curr_set else old_sums
-            for boss, kills in bosses.items():
-                target[boss] += kills
+        matrix = self.boss_matrix(curr_ids + old_ids)
+        curr_sums = matrix.sums(curr_ids)
+        old_sums = matrix.sums(old_ids)
 
         gains = {}
         for boss, kills in curr_sums.items():
@@ -298,64 +396,32 @@ class AnalyticsService:
         if not curr_ids:
             return {}
 
-        boss_data = self._get_boss_kills_by_snapshot(list(set(curr_ids + old_ids)))
-        curr_data = {sid: boss_data.get(sid, {}) for sid in curr_ids}
-        old_data = {sid: boss_data.get(sid, {}) for sid in old_ids}
-        
-        # 4. Compare
-        results = {}
-        for user, curr_snap in current_map.items():
-            best_boss = "None"
-            max_delta = -1
-            
-            curr_sid = self._as_int(curr_snap.id)
-            curr_bosses = curr_data.get(curr_sid, {}) if curr_sid is not None else {}
-            old_snap = old_map.get(user)
-            old_sid = self._as_int(old_snap.id) if old_snap is not None else None
-            old_bosses = old_data.get(old_sid, {}) if old_sid is not None else {}
-            
-            for boss, kills in curr_bosses.items():
-                prev = old_bosses.get(boss, 0)
-                delta = kills - prev
-                if delta > max_delta:
-                    max_delta = delta
-                    best_boss = boss
-            
-            # Only record if there's actual activity
-            if max_delta > 0:
-                results[user] = (best_boss, max_delta)
-                
-        return results
+        # 2. Row-wise argmax over (current - baseline) in the boss matrix
+        users = [user for user, snap in current_map.items() if self._as_int(snap.id) is not None]
+        baselines = [self._as_int(old_map[user].id) if user in old_map else None for user in users]
+        favourites = self.boss_matrix(curr_ids + old_ids).favourites(
+            [self._as_int(current_map[user].id) for user in users], baselines)
+
+        # Only users with actual activity
+        return {user: favourites[self._as_int(current_map[user].id)]
+                for user in users if self._as_int(current_map[user].id) in favourites}
 
     def get_activity_heatmap(self, start_date: datetime) -> List[Dict[str, int]]:
         """
         Returns message volume by DayOfWeek and Hour for heatmap.
-        Uses SQLite strftime function.
+        Read from the discord_author_daily hourly rollup.
         Returns: [{'day': 0-6, 'hour': 0-23, 'value': count}, ...]
         """
-        # SQLite strftime: %w = Day of week 0-6 (Sunday=0), %H = Hour 00-23
-        stmt = (
-            select(
-                func.strftime('%w', DiscordMessage.created_at).label("dow"),
-                func.strftime('%H', DiscordMessage.created_at).label("hour"),
-                func.count(DiscordMessage.id).label("count")
-            )
-            .where(DiscordMessage.created_at >= start_date)
-            .group_by("dow", "hour")
-        )
-        
-        results = self.db.execute(stmt).all()
-        
+        # Day of week 0-6 (Sunday=0), Hour 0-23
         data = []
-        for row in results:
-            try:
-                data.append({
-                    "day": int(row.dow),
-                    "hour": int(row.hour),
-                    "value": row.count
-                })
-            except (ValueError, TypeError):
+        for (dow, hour), count in rollups.hourly_message_counts(self.db, start_date).items():
+            if dow is None or hour is None:
                 continue
+            data.append({
+                "day": int(dow),
+                "hour": int(hour),
+                "value": count
+            })
                 
         return data
 
@@ -490,23 +556,10 @@ class AnalyticsService:
         
         Requires: user_id FK populated in discord_messages (Phase 2.2.2)
         """
-        stmt = (
-            select(
-                DiscordMessage.user_id,
-                func.count(DiscordMessage.id).label("count")
-            )
-            .where(and_(
-                DiscordMessage.created_at >= start_date,
-                DiscordMessage.user_id.isnot(None)
-            ))
-            .group_by(DiscordMessage.user_id)
-        )
-        
-        results = self.db.execute(stmt).all()
         return {
-            uid: int(row._mapping["count"])
-            for row in results
-            for uid in (self._as_int(row.user_id),)
+            uid: count
+            for user_id, count in rollups.user_message_counts(self.db, start_date).items()
+            for uid in (self._as_int(user_id),)
             if uid is not None
         }
     
@@ -606,26 +659,12 @@ class AnalyticsService:
         if not author_names:
             return {}
         
-        normalized_names = [UsernameNormalizer.normalize(name, for_comparison=True) for name in author_names]
-        
-        stmt = (
-            select(
-                func.lower(DiscordMessage.author_name).label("name"),
-                func.count(DiscordMessage.id).label("msg_count")
-            )
-            .where(and_(
-                func.lower(DiscordMessage.author_name).in_(normalized_names),
-                DiscordMessage.created_at >= start_date
-            ))
-            .group_by(func.lower(DiscordMessage.author_name))
-        )
-        
-        results = self.db.execute(stmt).all()
+        normalized_names = {UsernameNormalizer.normalize(name, for_comparison=True) for name in author_names}
         
         counts = {}
-        for row in results:
-            norm = UsernameNormalizer.normalize(str(row.name), for_comparison=True)
-            counts[norm] = int(row.msg_count)
+        for name, msg_count in rollups.author_message_counts(self.db, start_date).items():
+            if name in normalized_names:
+                counts[UsernameNormalizer.normalize(name, for_comparison=True)] = msg_count
         
         return counts
 
@@ -638,13 +677,10 @@ class AnalyticsService:
         Otherwise, calculates diversity of TOTAL KILLS (Lifetime).
         """
         if not snapshot_ids: return {"labels": [], "datasets": [{"data": []}]}
-        from data.queries import Queries
-        
-        # Helper to get sums
+        matrix = self.boss_matrix(list(snapshot_ids) + list(old_snapshot_ids or []))
+
         def get_sums(ids):
-             placeholders = ','.join('?' * len(ids))
-             rows = self.db.connection().exec_driver_sql(Queries.GET_BOSS_SUMS_FOR_IDS.format(placeholders), tuple(ids)).fetchall()
-             return {r[0]: r[1] for r in rows}
+            return matrix.sums(ids, members_only=True)
 
         curr_sums = get_sums(snapshot_ids)
         
@@ -676,7 +712,7 @@ class AnalyticsService:
         """
         # 1. Get Snapshots
         latest_snaps = self.get_latest_snapshots()
-        old_snaps = self.get_snapshots_at_cutoff(datetime.now(timezone.utc) - timedelta(days=7))
+        old_snaps = self.get_snapshots_at_cutoff(self._cutoff(7))
         
         # 2. Bulk Fetch Boss Kills for both sets
         latest_ids = [sid for sid in (self._as_int(s.id) for s in latest_snaps.values()) if sid is not None]
@@ -685,32 +721,12 @@ class AnalyticsService:
         if not latest_ids:
              return {"labels": [], "datasets": [{"data": []}]}
         
-        ids_to_fetch = list(set(latest_ids + old_ids))
-        boss_data_map = self.get_boss_data(ids_to_fetch)
-        
-        # 3. Calculate Gains Aggregated by Boss
-        boss_gains = defaultdict(int)
-        
-        for username, latest in latest_snaps.items():
-            latest_sid = self._as_int(latest.id)
-            if latest_sid is None or latest_sid not in boss_data_map:
-                continue
-            
-            latest_bosses = boss_data_map[latest_sid]
-            old_bosses = {}
-            
-            if username in old_snaps:
-                old = old_snaps[username]
-                old_sid = self._as_int(old.id)
-                if old_sid is not None and old_sid in boss_data_map:
-                    old_bosses = boss_data_map[old_sid]
-            
-            for boss_name, kills in latest_bosses.items():
-                old_kills = old_bosses.get(boss_name, 0)
-                gain = kills - old_kills
-                if gain > 0:
-                    boss_gains[boss_name] += gain
-                    
+        # 3. Calculate Gains Aggregated by Boss (row-wise deltas in the boss matrix)
+        users = [u for u, snap in latest_snaps.items() if self._as_int(snap.id) is not None]
+        curr = [self._as_int(latest_snaps[u].id) for u in users]
+        base = [self._as_int(old_snaps[u].id) if u in old_snaps else None for u in users]
+        boss_gains = self.boss_matrix(latest_ids + old_ids).gain_totals(curr, base)
+
         # 4. Sort and Format
         # Filter small gains to avoid clutter? (Optional)
         sorted_bosses = sorted(boss_gains.items(), key=lambda x: x[1], reverse=True)
@@ -741,7 +757,7 @@ class AnalyticsService:
         """
         # 1. Get XP Gains
         latest_snaps = self.get_latest_snapshots()
-        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        cutoff = self._cutoff(days)
         old_snaps = self.get_snapshots_at_cutoff(cutoff)
         
         xp_gains = self.calculate_gains(latest_snaps, old_snaps, staleness_limit_days=21)
@@ -775,10 +791,8 @@ class AnalyticsService:
     def get_raids_performance(self, snapshot_ids: List[int]) -> Dict[str, Any]:
         """Calculates average raids KC for CoX, ToB, ToA."""
         if not snapshot_ids: return {"labels": [], "datasets": [{"data": []}]}
-        from data.queries import Queries
-        placeholders = ','.join('?' * len(snapshot_ids))
-        rows = self.db.connection().exec_driver_sql(Queries.GET_BOSS_SUMS_FOR_IDS.format(placeholders), tuple(snapshot_ids)).fetchall()
-        
+        rows = self.boss_matrix(snapshot_ids).sums(snapshot_ids, members_only=True).items()
+
         raids_map = {
             'Chambers Of Xeric': 'CoX', 'Chambers Of Xeric Challenge Mode': 'CoX',
             'Theatre Of Blood': 'ToB', 'Theatre Of Blood Hard Mode': 'ToB',
@@ -795,52 +809,44 @@ class AnalyticsService:
         return {"labels": list(raids_totals.keys()), "datasets": [{"data": list(raids_totals.values())}]}
 
     def get_skill_mastery(self, snapshot_ids: List[int]) -> Dict[str, Any]:
-        """Counts 99s across all skills using the 'raw_data' JSON column."""
+        """Counts 99s across all skills from the typed skill_snapshots table."""
         if not snapshot_ids: return {"labels": [], "datasets": [{"data": []}]}
-        from data.queries import Queries
-        placeholders = ','.join('?' * len(snapshot_ids))
-        rows = self.db.connection().exec_driver_sql(Queries.GET_RAW_DATA_FOR_IDS.format(placeholders), tuple(snapshot_ids)).fetchall()
-        
+        ids = list(set(snapshot_ids))
+
         skill_counts = defaultdict(int)
-        for (json_str,) in rows:
-            if not json_str: continue
-            try:
-                data = json.loads(json_str)
-                # Handle varying WOM JSON structure
-                skills = data.get('data', {}).get('skills', {}) or data.get('skills', {})
-                for skill, stats in skills.items():
-                    if skill != 'overall' and stats.get('level', 0) >= 99:
-                        skill_counts[skill] += 1
-            except json.JSONDecodeError: continue
+        for i in range(0, len(ids), 900):
+            # Reference rows (unchanged snapshots) count their source row's skills
+            stmt = (
+                select(SkillSnapshot.skill, func.count())
+                .join(WOMSnapshot, SkillSnapshot.snapshot_id == func.coalesce(WOMSnapshot.ref_snapshot_id, WOMSnapshot.id))
+                .where(WOMSnapshot.id.in_(ids[i:i + 900]))
+                .where(SkillSnapshot.skill != 'overall')
+                .where(SkillSnapshot.level >= 99)
+                .group_by(SkillSnapshot.skill)
+            )
+            for skill, count in self.db.execute(stmt).all():
+                skill_counts[skill] += count
             
         sorted_skills = sorted(skill_counts.items(), key=lambda x: x[1], reverse=True)
         return {"labels": [s[0].title() for s in sorted_skills], "datasets": [{"data": [s[1] for s in sorted_skills]}]}
 
     def get_discord_stats_simple(self, days: Optional[int] = None) -> Dict[str, int]:
-        """Returns {lower_username: msg_count} for the given timeframe (using basic SQL)."""
-        from data.queries import Queries
-        conn = self.db.connection()
-        if days:
-            cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
-            rows = conn.exec_driver_sql(Queries.GET_DISCORD_MSG_COUNTS_SINCE_SIMPLE, (cutoff,)).fetchall()
-        else:
-            rows = conn.exec_driver_sql(Queries.GET_DISCORD_MSG_COUNTS_TOTAL).fetchall()
-        return {row[0]: row[1] for row in rows}
+        """Returns {lower_username: msg_count} for the given timeframe (from the discord_author_daily rollup)."""
+        cutoff = self._cutoff(days) if days else None
+        return self.context.get("discord_stats", cutoff, lambda: rollups.author_message_counts(self.db, cutoff))
 
     def get_activity_heatmap_simple(self, days: int = 30) -> List[int]:
         """Returns 24-hour activity distribution for the last N days."""
-        from data.queries import Queries
-        cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
-        rows = self.db.connection().exec_driver_sql(Queries.GET_HOURLY_ACTIVITY, (cutoff,)).fetchall()
-        heatmap = {str(h).zfill(2): 0 for h in range(24)}
-        for hr, count in rows:
-            if hr: heatmap[hr] = count
-        return [heatmap[str(h).zfill(2)] for h in range(24)]
+        cutoff = self._cutoff(days)
+        heatmap = [0] * 24
+        for (_, hour), count in rollups.hourly_message_counts(self.db, cutoff).items():
+            if hour is not None: heatmap[int(hour)] += count
+        return heatmap
 
     def get_clan_trend(self, days: int = 30) -> List[Dict[str, Any]]:
         """Calculates Daily Clan XP Gains and Message Counts for the last N days."""
         from data.queries import Queries
-        start_date = datetime.now(timezone.utc) - timedelta(days=days+1)
+        start_date = self._cutoff(days + 1)
         cutoff_ts = start_date.isoformat()
         conn = self.db.connection()
         
@@ -851,7 +857,7 @@ class AnalyticsService:
 
         # Message Counts
         trend_data = defaultdict(lambda: {'msgs': 0, 'xp_gain': 0})
-        for day, count in conn.exec_driver_sql(Queries.GET_DAILY_MSGS, (cutoff_ts,)).fetchall():
+        for day, count in rollups.daily_message_counts(self.db, start_date).items():
             trend_data[day]['msgs'] = count
             
         # Calculate Gains
@@ -863,7 +869,7 @@ class AnalyticsService:
 
         # Format
         result = []
-        display_start = datetime.now(timezone.utc) - timedelta(days=days)
+        display_start = self._cutoff(days)
         for i in range(days):
             d_str = (display_start + timedelta(days=i)).strftime('%Y-%m-%d')
             val = trend_data[d_str]
@@ -878,40 +884,25 @@ class AnalyticsService:
         if not snapshot_ids:
             return {}
             
-        ids = list(set(snapshot_ids))
-        result = {}
-        chunk_size = 900
-        
-        for i in range(0, len(ids), chunk_size):
-            chunk = ids[i:i + chunk_size]
-            stmt = select(BossSnapshot).where(BossSnapshot.snapshot_id.in_(chunk))
-            rows = self.db.execute(stmt).scalars().all()
-            
-            for row in rows:
-                if row.snapshot_id not in result:
-                    result[row.snapshot_id] = {}
-                result[row.snapshot_id][row.boss_name] = row.kills
-                
-        return result
+        return self.boss_matrix(snapshot_ids).as_dicts(set(snapshot_ids))
 
     def get_trending_boss(self, days: int = 30) -> Optional[Dict[str, Any]]:
         """Identifies the trending boss (highest gain) over the last N days."""
         latest_snaps = self.get_latest_snapshots()
         if not latest_snaps: return None
         
-        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        cutoff = self._cutoff(days)
         past_snaps = self.get_snapshots_at_cutoff(cutoff)
         
         latest_ids = [sid for sid in (self._as_int(s.id) for s in latest_snaps.values()) if sid is not None]
         past_ids = [sid for sid in (self._as_int(s.id) for s in past_snaps.values()) if sid is not None]
         if not latest_ids: return None
 
-        from data.queries import Queries
-        conn = self.db.connection()
+        matrix = self.boss_matrix(latest_ids + past_ids)
+
         def get_sums(ids):
-            if not ids: return {}
-            return {r[0]: r[1] for r in conn.exec_driver_sql(Queries.GET_BOSS_SUMS_FOR_IDS.format(','.join('?' * len(ids))), tuple(ids)).fetchall()}
-            
+            return matrix.sums(ids, members_only=True)
+
         now_sums = get_sums(latest_ids)
         old_sums = get_sums(past_ids) if past_ids else {}
         
@@ -927,8 +918,10 @@ class AnalyticsService:
         top_boss = max(deltas.keys(), key=lambda k: deltas[k])
         
         # Daily Data
+        from data.queries import Queries
+        conn = self.db.connection()
         daily_raw = {r[0]: r[1] for r in conn.exec_driver_sql(Queries.GET_DAILY_BOSS_KILLS, (cutoff.isoformat(), top_boss)).fetchall()}
-        if not daily_raw: daily_raw = {datetime.now(timezone.utc).strftime('%Y-%m-%d'): now_sums.get(top_boss, 0)}
+        if not daily_raw: daily_raw = {self.context.now.strftime('%Y-%m-%d'): now_sums.get(top_boss, 0)}
         
         sorted_days = sorted(daily_raw.keys())
         labels, values = [], []
@@ -0,0 +1,208 @@
+"""
+Dense snapshot x boss kill matrix.
+
+boss_snapshots is loaded once per run into an int64 NumPy matrix (rows are
+snapshot ids, columns the boss vocabulary; bosses first seen in a later load
+are appended), plus a mask of which cells had a stored row. Deltas, per-boss sums, favourites and diversity counts are
+then array operations instead of nested {snapshot_id: {boss: kills}} dicts.
+
+The backing arrays grow geometrically (capacity doubles), so loading snapshots
+over many `ensure` calls copies each cell O(1) times on average;
+`kills` / `present` / `member` are views of the filled part.
+
+The vocabulary is the set of boss_name values actually stored (WOM metric
+keys such as 'chambers_of_xeric'); data/bosses.json lists NPC display names
+and does not match those keys.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from database.models import BossSnapshot, ClanMember, WOMSnapshot
+
+
+class BossMatrix:
+    """Kill counts for a growing set of snapshots; `ensure` loads any ids not yet present."""
+
+    def __init__(self):
+        self.bosses: List[str] = []
+        self._col: Dict[str, int] = {}
+        self._row: Dict[int, int] = {}
+        # Backing arrays with spare capacity; the logical shape is (len(self._row), len(self.bosses))
+        self._kills = np.zeros((0, 0), dtype=np.int64)
+        self._present = np.zeros((0, 0), dtype=bool)
+        self._member = np.zeros(0, dtype=bool)
+        self.loads = 0
+
+    def __len__(self) -> int:
+        return len(self._row)
+
+    @property
+    def kills(self) -> np.ndarray:
+        return self._kills[:len(self._row), :len(self.bosses)]
+
+    @property
+    def present(self) -> np.ndarray:
+        return self._present[:len(self._row), :len(self.bosses)]
+
+    @property
+    def member(self) -> np.ndarray:
+        return self._member[:len(self._row)]
+
+    def ensure(self, db: Session, snapshot_ids: Iterable[int]) -> "BossMatrix":
+        missing = sorted({int(sid) for sid in snapshot_ids if sid is not None} - self._row.keys())
+        if not missing:
+            return self
+
+        # Unchanged snapshots reference the row holding their boss rows (ref_snapshot_id)
+        source: Dict[int, int] = {}
+        members = set()
+        for i in range(0, len(missing), 900):  # stay under SQLite's bound-parameter limit
+            chunk = missing[i:i + 900]
+            for sid, src, is_member in db.execute(
+                select(WOMSnapshot.id,
+                       func.coalesce(WOMSnapshot.ref_snapshot_id, WOMSnapshot.id),
+                       WOMSnapshot.username.in_(select(ClanMember.username)))
+                .where(WOMSnapshot.id.in_(chunk))
+            ):
+                source[sid] = src
+                if is_member:
+                    members.add(sid)
+
+        by_source: Dict[int, List[Tuple[str, int]]] = defaultdict(list)
+        source_ids = sorted({source.get(sid, sid) for sid in missing})
+        for i in range(0, len(source_ids), 900):
+            for src, boss, kills in db.execute(
+                select(BossSnapshot.snapshot_id, BossSnapshot.boss_name, BossSnapshot.kills)
+                .where(BossSnapshot.snapshot_id.in_(source_ids[i:i + 900]))
+            ):
+                by_source[src].append((boss, kills))
+        rows = [(sid, boss, kills) for sid in missing for boss, kills in by_source.get(source.get(sid, sid), ())]
+
+        new_bosses = sorted({boss for _, boss, _ in rows if boss is not None} - self._col.keys())
+        self._grow(len(missing), new_bosses)
+
+        start = len(self._row)
+        for offset, sid in enumerate(missing):
+            self._row[sid] = start + offset
+        self._member[start:len(self._row)] = [sid in members for sid in missing]
+
+        valid = [(sid, boss, kills) for sid, boss, kills in rows if boss is not None]
+        if valid:
+            r = np.fromiter((self._row[sid] for sid, _, _ in valid), dtype=np.int64, count=len(valid))
+            c = np.fromiter((self._col[boss] for _, boss, _ in valid), dtype=np.int64, count=len(valid))
+            k = np.fromiter((kills or 0 for _, _, kills in valid), dtype=np.int64, count=len(valid))
+            self.kills[r, c] = k
+            self.present[r, c] = True
+        self.loads += 1
+        return self
+
+    def _grow(self, extra_rows: int, new_bosses: Sequence[str]) -> None:
+        for boss in new_bosses:
+            self._col[boss] = len(self.bosses)
+            self.bosses.append(boss)
+        n_rows, n_cols = len(self._row) + extra_rows, len(self.bosses)
+        cap_rows, cap_cols = self._kills.shape
+        if n_rows <= cap_rows and n_cols <= cap_cols:
+            return
+        # Double the dimension that ran out (or jump straight to what is needed)
+        if n_rows > cap_rows:
+            cap_rows = max(n_rows, 2 * cap_rows)
+        if n_cols > cap_cols:
+            cap_cols = max(n_cols, 2 * cap_cols)
+        filled = (slice(0, len(self._row)), slice(0, self._kills.shape[1]))
+        kills = np.zeros((cap_rows, cap_cols), dtype=np.int64)
+        present = np.zeros((cap_rows, cap_cols), dtype=bool)
+        member = np.zeros(cap_rows, dtype=bool)
+        kills[filled] = self._kills[filled]
+        present[filled] = self._present[filled]
+        member[:len(self._row)] = self._member[:len(self._row)]
+        self._kills, self._present, self._member = kills, present, member
+
+    def _rows(self, snapshot_ids: Sequence[Optional[int]]) -> np.ndarray:
+        """Row index per id; -1 for ids without a row (unknown or None)."""
+        return np.fromiter((self._row.get(sid, -1) if sid is not None else -1 for sid in snapshot_ids),
+                           dtype=np.int64, count=len(snapshot_ids))
+
+    def _take(self, rows: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+        out = matrix[np.maximum(rows, 0)] if len(matrix) else np.zeros((len(rows), len(self.bosses)), matrix.dtype)
+        out[rows < 0] = 0
+        return out
+
+    # --- Dict views (compatible with the old {snapshot_id: {boss: kills}} shape) ---
+
+    def as_dicts(self, snapshot_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+        result = {}
+        for sid in snapshot_ids:
+            row = self._row.get(sid)
+            if row is None or not self.present[row].any():
+                continue
+            cols = np.flatnonzero(self.present[row])
+            result[sid] = {self.bosses[c]: int(self.kills[row, c]) for c in cols}
+        return result
+
+    # --- Vectorized aggregates ---
+
+    def sums(self, snapshot_ids: Sequence[int], members_only: bool = False) -> Dict[str, int]:
+        """{boss: total kills} over the given snapshots (optionally clan members only)."""
+        rows = self._rows(list(dict.fromkeys(snapshot_ids)))
+        rows = rows[rows >= 0]
+        if members_only:
+            rows = rows[self.member[rows]]
+        if not len(rows):
+            return {}
+        totals = self.kills[rows].sum(axis=0)
+        seen = self.present[rows].any(axis=0)
+        return {self.bosses[c]: int(totals[c]) for c in np.flatnonzero(seen)}
+
+    def deltas(self, current_ids: Sequence[int], baseline_ids: Sequence[Optional[int]]) -> np.ndarray:
+        """Row-wise current - baseline (baseline missing counts as zero kills)."""
+        return self._take(self._rows(current_ids), self.kills) - self._take(self._rows(baseline_ids), self.kills)
+
+    def gain_totals(self, current_ids: Sequence[int], baseline_ids: Sequence[Optional[int]]) -> Dict[str, int]:
+        """
+        {boss: sum of positive per-snapshot gains}, pairing current_ids[i] with
+        baseline_ids[i]; only bosses stored for the current snapshot count.
+        """
+        if not len(current_ids) or not self.bosses:
+            return {}
+        rows = self._rows(list(current_ids))
+        gains = self.deltas(list(current_ids), list(baseline_ids))
+        gains[~self._take(rows, self.present)] = 0
+        totals = np.clip(gains, 0, None).sum(axis=0)
+        return {self.bosses[c]: int(totals[c]) for c in np.flatnonzero(totals)}
+
+    def favourites(self, current_ids: Sequence[int],
+                   baseline_ids: Optional[Sequence[Optional[int]]] = None) -> Dict[int, Tuple[str, int]]:
+        """
+        {current_id: (boss, value)} for the boss with the highest kills (or gain over
+        the baseline when given) among bosses stored for that snapshot. Only positive values.
+        """
+        current_ids = list(current_ids)
+        if not current_ids or not self.bosses:
+            return {}
+        rows = self._rows(current_ids)
+        values = self._take(rows, self.kills)
+        if baseline_ids is not None:
+            values = values - self._take(self._rows(list(baseline_ids)), self.kills)
+        masked = np.where(self._take(rows, self.present), values, np.iinfo(np.int64).min)
+        best = masked.argmax(axis=1)
+        best_values = masked[np.arange(len(rows)), best]
+        return {
+            sid: (self.bosses[col], int(val))
+            for sid, col, val in zip(current_ids, best, best_values)
+            if val > 0
+        }
+
+    def diversity(self, snapshot_ids: Sequence[int], members_only: bool = False) -> Dict[str, int]:
+        """{boss: number of snapshots with at least one kill}"""
+        rows = self._rows(list(dict.fromkeys(snapshot_ids)))
+        rows = rows[rows >= 0]
+        if members_only:
+            rows = rows[self.member[rows]]
+        counts = (self.kills[rows] > 0).sum(axis=0) if len(rows) else np.zeros(len(self.bosses), np.int64)
+        return {self.bosses[c]: int(counts[c]) for c in np.flatnonzero(counts)}
@@ -35,6 +35,7 @@ class Config:
     DISCORD_BATCH_SIZE = int(os.getenv('DISCORD_BATCH_SIZE', _d_conf.get('batch_size', 100)))
     DISCORD_RATE_LIMIT_DELAY = float(os.getenv('DISCORD_RATE_LIMIT_DELAY', _d_conf.get('rate_limit_delay', 0.75)))
     DISCORD_MAX_MESSAGES = int(os.getenv('DISCORD_MAX_MESSAGES', _d_conf.get('max_messages', 0))) # 0 = Unlimited
+    DISCORD_CHANNEL_CONCURRENCY = int(os.getenv('DISCORD_CHANNEL_CONCURRENCY', _d_conf.get('channel_concurrency', 4)))
     DAYS_LOOKBACK = int(os.getenv('DAYS_LOOKBACK', 400)) 
 
     # --- WOM ---
@@ -48,9 +49,19 @@ class Config:
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
     
     _w_conf = _yaml_config.get('wom', {})
-    WOM_TARGET_RPM = int(os.getenv('WOM_TARGET_RPM', _w_conf.get('target_rpm', 90)))
-    WOM_RATE_LIMIT_DELAY = float(os.getenv('WOM_RATE_LIMIT_DELAY', _w_conf.get('rate_limit_delay', 0.67)))
+    # Legacy fixed spacing (seconds per request); without an explicit target it sets the bucket's refill rate
+    _wom_delay = float(os.getenv('WOM_RATE_LIMIT_DELAY', _w_conf.get('rate_limit_delay', 0)) or 0)
+    WOM_TARGET_RPM = int(os.getenv('WOM_TARGET_RPM', _w_conf.get('target_rpm', round(60 / _wom_delay) if _wom_delay > 0 else 90)))
     WOM_MAX_CONCURRENT = int(os.getenv('WOM_MAX_CONCURRENT', _w_conf.get('max_concurrent', 2)))
+    # Token bucket: burst size, and the floor the AIMD controller may back off to after 429s
+    WOM_BURST = int(os.getenv('WOM_BURST', _w_conf.get('burst', 5)))
+    WOM_MIN_RPM = int(os.getenv('WOM_MIN_RPM', _w_conf.get('min_rpm', 12)))
+    # Snapshot pages requested concurrently once a history outgrows its page estimate
+    WOM_PAGE_PREFETCH = int(os.getenv('WOM_PAGE_PREFETCH', _w_conf.get('page_prefetch', 3)))
+    # Response cache backend: 'memory' (per process) or 'sqlite' (persists across pipeline stages/runs)
+    WOM_CACHE_BACKEND = str(os.getenv('WOM_CACHE_BACKEND', _w_conf.get('cache_backend', 'memory'))).lower()
+    WOM_CACHE_PATH = os.getenv('WOM_CACHE_PATH', _w_conf.get('cache_path', 'data/wom_cache.db'))
+    WOM_CACHE_MAX_BYTES = int(os.getenv('WOM_CACHE_MAX_BYTES', _w_conf.get('cache_max_bytes', 64 * 1024 * 1024)))
     # Short update delay: If true, wait 10s after triggering update. If false, wait 3 minutes (180s).
     WOM_SHORT_UPDATE_DELAY = str(os.getenv('WOM_SHORT_UPDATE_DELAY', _w_conf.get('short_update_delay', False))).lower() == 'true'
     WOM_UPDATE_WAIT = int(os.getenv('WOM_UPDATE_WAIT', 10 if WOM_SHORT_UPDATE_DELAY else 180))
@@ -78,12 +89,63 @@ class Config:
     # Harvest Safety
     HARVEST_STALE_THRESHOLD_SECONDS = int(os.getenv('HARVEST_STALE_THRESHOLD_SECONDS', 86400))
     HARVEST_SAFE_DELETE_RATIO = float(os.getenv('HARVEST_SAFE_DELETE_RATIO', 0.20))
+    # Set-based roster sync (bulk upsert/delete in one transaction). Set to false for the legacy per-row ORM sync.
+    HARVEST_BULK_ROSTER_SYNC = str(os.getenv('HARVEST_BULK_ROSTER_SYNC', 'true')).lower() == 'true'
+
+    # Fuzzy name resolution (services/name_matcher.py): minimum share of a name's trigrams
+    # a candidate must contain. 1.0 = substring matches only.
+    FUZZY_MATCH_THRESHOLD = float(os.getenv('FUZZY_MATCH_THRESHOLD', 0.8))
     
     # WOM Snapshot Staleness Optimization (skip fetching players with recent data)
     # Set to 0 to disable staleness skipping (fetch all players every run)
     # Set to desired hours threshold (e.g., 6 = skip players with snapshots < 6 hours old)
     WOM_STALENESS_SKIP_HOURS = int(os.getenv('WOM_STALENESS_SKIP_HOURS', 6))
 
+    # Batched snapshot ingestion (services/snapshot_ingestion.py)
+    # Snapshots per multi-row INSERT, and how many chunks to write per COMMIT
+    WOM_INGEST_CHUNK_SIZE = int(os.getenv('WOM_INGEST_CHUNK_SIZE', 500))
+    WOM_INGEST_COMMIT_INTERVAL = int(os.getenv('WOM_INGEST_COMMIT_INTERVAL', 4))
+    # Pipelined harvest: fetch workers feed a bounded queue drained by one DB writer.
+    # Set WOM_HARVEST_PIPELINED=false to download everything before saving (legacy).
+    WOM_HARVEST_PIPELINED = str(os.getenv('WOM_HARVEST_PIPELINED', 'true')).lower() == 'true'
+    WOM_HARVEST_WORKERS = int(os.getenv('WOM_HARVEST_WORKERS', 8))
+    WOM_HARVEST_QUEUE_SIZE = int(os.getenv('WOM_HARVEST_QUEUE_SIZE', 16))
+    # Harvest mode: 'history' (paginated snapshots per player) or 'delta' (group payload change
+    # markers + one /players call per changed member; history only for new members or gaps)
+    WOM_HARVEST_MODE = str(os.getenv('WOM_HARVEST_MODE', 'history')).lower()
+    WOM_DELTA_MAX_GAP_DAYS = int(os.getenv('WOM_DELTA_MAX_GAP_DAYS', 3))
+    # Store snapshots identical to one already saved for the player (offline players) as
+    # reference rows (content_hash + ref_snapshot_id) instead of a new payload + boss rows
+    WOM_SNAPSHOT_DEDUP = str(os.getenv('WOM_SNAPSHOT_DEDUP', 'true')).lower() == 'true'
+    # raw_data storage for new snapshots: 'none' (JSON text) or 'zlib' (compressed BLOB using the
+    # newest raw_data_dictionaries entry). Existing rows: scripts/compress_raw_data.py
+    RAW_DATA_COMPRESSION = str(os.getenv('RAW_DATA_COMPRESSION', 'none')).lower()
+
+    # SQLite connection profile, applied to every connection (database/connector.py)
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # bytes; 0 disables mmap
+    SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', -64000))  # negative = KiB (~64 MB)
+    SQLITE_TEMP_STORE = os.getenv('SQLITE_TEMP_STORE', 'MEMORY')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 30000))
+
+    # Pipeline runner (core/pipeline.py): stages run in-process as a DAG, up to N at once.
+    # PIPELINE_SUBPROCESS_STAGES: comma-separated stage names (or 'all') to run via `python -m` instead
+    PIPELINE_MAX_WORKERS = int(os.getenv('PIPELINE_MAX_WORKERS', 3))
+    PIPELINE_SUBPROCESS_STAGES = [s.strip() for s in os.getenv('PIPELINE_SUBPROCESS_STAGES', '').split(',') if s.strip()]
+    # Skip stages whose inputs (database, files, config, code) are unchanged since their last
+    # successful run ("cached"). `python main.py --force` runs everything regardless.
+    PIPELINE_INCREMENTAL = os.getenv('PIPELINE_INCREMENTAL', 'true').lower() == 'true'
+    PIPELINE_STATE_FILE = os.getenv('PIPELINE_STATE_FILE', 'data/pipeline_state.json')
+    # Per-stage telemetry (core/telemetry.py): JSON report of the last run next to app.log, plus
+    # history rows in pipeline_runs. PIPELINE_TELEMETRY=false also opens plain sqlite3 connections
+    # (no row counting on fetches).
+    PIPELINE_TELEMETRY = os.getenv('PIPELINE_TELEMETRY', 'true').lower() == 'true'
+    PIPELINE_RUN_REPORT = os.getenv('PIPELINE_RUN_REPORT', 'pipeline_run.json')
+    # Metrics registry export (core/metrics.py) after each run: Prometheus text, or JSON for a
+    # *.json path. Empty disables the file (the registry itself is always on).
+    METRICS_EXPORT_PATH = os.getenv('METRICS_EXPORT_PATH', 'metrics.prom')
+
     # Dashboard Limits
     LEADERBOARD_SIZE = int(os.getenv('LEADERBOARD_SIZE', 10))
     TOP_BOSS_CARDS = int(os.getenv('TOP_BOSS_CARDS', 4))
@@ -183,5 +245,6 @@ class Config:
         logger.info(f"Discord Relay Channel: {Config.RELAY_CHANNEL_ID}")
         logger.info(f"Days Lookback: {Config.DAYS_LOOKBACK}")
         logger.info(f"Discord Batch Size: {Config.DISCORD_BATCH_SIZE}")
-        logger.info(f"WOM Rate Limit: {Config.WOM_RATE_LIMIT_DELAY}s delay, {Config.WOM_TARGET_RPM} RPM target")
+        logger.info(f"WOM Rate Limit: {Config.WOM_TARGET_RPM} RPM target (burst {Config.WOM_BURST}, "
+                    f"floor {Config.WOM_MIN_RPM} RPM), {Config.WOM_MAX_CONCURRENT} concurrent")
         logger.info("=" * 60)
@@ -7,6 +7,8 @@ import logging
 from functools import wraps
 from typing import Callable, Any, TypeVar, Optional
 
+from core.metrics import REGISTRY
+
 logger = logging.getLogger("Utils.Performance")
 
 T = TypeVar('T')
@@ -52,35 +54,42 @@ def timed_operation(operation_name: Optional[str] = None):
     """
     Decorator to log execution time of operations.
     Works with both sync and async functions.
+    Durations also go to the `operation_seconds` histogram (core/metrics.py).
     """
     def decorator(func: Callable) -> Callable:
         name = operation_name or func.__name__
+        ok_latency = REGISTRY.histogram("operation_seconds", operation=name, outcome="ok")
+        error_latency = REGISTRY.histogram("operation_seconds", operation=name, outcome="error")
         
         if asyncio.iscoroutinefunction(func):
             @wraps(func)
             async def async_wrapper(*args, **kwargs):
-                start = time.time()
+                start = time.perf_counter()
                 try:
                     result = await func(*args, **kwargs)
-                    elapsed = time.time() - start
+                    elapsed = time.perf_counter() - start
+                    ok_latency.observe(elapsed)
                     logger.info(f"⏱️  {name} completed in {elapsed:.2f}s")
                     return result
                 except Exception as e:
-                    elapsed = time.time() - start
+                    elapsed = time.perf_counter() - start
+                    error_latency.observe(elapsed)
                     logger.error(f"❌ {name} failed after {elapsed:.2f}s: {e}")
                     raise
             return async_wrapper
         else:
             @wraps(func)
             def sync_wrapper(*args, **kwargs):
-                start = time.time()
+                start = time.perf_counter()
                 try:
                     result = func(*args, **kwargs)
-                    elapsed = time.time() - start
+                    elapsed = time.perf_counter() - start
+                    ok_latency.observe(elapsed)
                     logger.info(f"⏱️  {name} completed in {elapsed:.2f}s")
                     return result
                 except Exception as e:
-                    elapsed = time.time() - start
+                    elapsed = time.perf_counter() - start
+                    error_latency.observe(elapsed)
                     logger.error(f"❌ {name} failed after {elapsed:.2f}s: {e}")
                     raise
             return sync_wrapper
@@ -89,14 +98,14 @@ def timed_operation(operation_name: Optional[str] = None):
 
 
 class PerformanceMonitor:
-    """Context manager for timing operations"""
+    """Context manager for timing operations (also recorded in the `operation_seconds` histogram)"""
     
     def __init__(self, operation_name: str):
         self.operation_name = operation_name
         self.start_time: Optional[float] = None
         
     def __enter__(self):
-        self.start_time = time.time()
+        self.start_time = time.perf_counter()
         logger.info(f"▶️  Starting: {self.operation_name}")
         return self
         
@@ -104,7 +113,9 @@ class PerformanceMonitor:
         if self.start_time is None:
             logger.error(f"❌ Failed: {self.operation_name} (start time was not set)")
             return False
-        elapsed = time.time() - self.start_time
+        elapsed = time.perf_counter() - self.start_time
+        REGISTRY.histogram("operation_seconds", operation=self.operation_name,
+                           outcome="ok" if exc_type is None else "error").observe(elapsed)
         if exc_type is None:
             logger.info(f"✅ Completed: {self.operation_name} ({elapsed:.2f}s)")
         else:
@@ -0,0 +1,384 @@
+"""
+In-process pipeline runner.
+
+Stages are plain callables declared with the resources they read (`inputs`)
+and write (`outputs`): "db" for the database, file paths for artefacts. A
+stage depends on the latest earlier stage that writes one of its inputs, which
+gives a DAG; stages whose dependencies are done run concurrently (sync stages
+in worker threads, async stages on the event loop). For the default stages the
+Excel report and CSV dump only need the database, so they run beside enrichment
+right after the harvest; the dashboard export also reads data/ai_insights.json
+and waits for enrichment.
+
+All stages share the process: one SQLAlchemy engine pair (database/connector.py)
+and one AnalyticsSnapshot, so datasets computed by the export are reused by the
+Excel report instead of being rebuilt in a fresh interpreter.
+
+Subprocess isolation (`python -m <module>`, the old behaviour) is opt-in per
+stage or for the whole run via Config.PIPELINE_SUBPROCESS_STAGES.
+
+Incremental runs: before a stage starts its inputs are fingerprinted (see
+`fingerprint_resource`) together with the config and the code. When that
+matches the fingerprint stored after its last successful run
+(data/pipeline_state.json) and its output files exist, the stage is reported
+as "cached" and not run. An hourly run where the harvest stored nothing new
+therefore only runs the harvest. Stages without inputs always run.
+
+Every executed stage gets a StageStats (core/telemetry.py) for the duration
+of its run; `StageResult.metrics` carries wall/CPU time, peak RSS, rows
+read/written and the counters instrumented code recorded.
+"""
+
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from core import telemetry
+from core.metrics import REGISTRY
+
+logger = logging.getLogger("Pipeline")
+
+
+@dataclass
+class Stage:
+    """One pipeline step. `run` receives the PipelineContext; returning False marks it failed."""
+    name: str
+    description: str
+    run: Callable[["PipelineContext"], Any]
+    module: Optional[str] = None  # `python -m` target for subprocess isolation
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    critical: bool = False  # failure aborts the whole run
+    isolated: bool = False  # run in a subprocess instead of in-process
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str  # 'ok' | 'cached' | 'failed' | 'skipped'
+    seconds: float = 0.0
+    error: Optional[str] = None
+    metrics: Optional[Dict[str, Any]] = None
+
+
+class PipelineContext:
+    """State shared by every stage of one run."""
+
+    def __init__(self):
+        self._analytics = None
+        self._analytics_session = None
+        # Stages run in worker threads; only one may create the shared snapshot
+        self._analytics_lock = threading.Lock()
+        self.results: Dict[str, StageResult] = {}
+
+    @property
+    def analytics(self):
+        """Run-wide AnalyticsSnapshot, created on first use (after the harvest has written)."""
+        with self._analytics_lock:
+            if self._analytics is None:
+                from core.analytics import AnalyticsSnapshot
+                from database.connector import ReadOnlySession
+                self._analytics_session = ReadOnlySession()
+                self._analytics = AnalyticsSnapshot(self._analytics_session)
+            return self._analytics
+
+    def close(self) -> None:
+        with self._analytics_lock:
+            if self._analytics_session is not None:
+                self._analytics_session.close()
+                self._analytics_session = None
+
+
+# --- Fingerprints ---
+
+# Tables up to this many rows are hashed in full, so in-place updates (roster roles,
+# aliases) are seen; larger, append-mostly tables use row count + max(rowid).
+SMALL_TABLE_ROWS = 5000
+CODE_DIRS = ("core", "database", "reporting", "scripts", "services")
+# Written by the runner itself after every run
+FINGERPRINT_EXCLUDED_TABLES = {"pipeline_runs"}
+
+
+def _digest(*parts: Any) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else repr(part).encode())
+    return h.hexdigest()
+
+
+def database_fingerprint(db_file: Optional[str] = None) -> str:
+    """
+    Per-table row count and max(rowid) (full content for small tables).
+
+    PRAGMA data_version is not used: it is only comparable within one connection,
+    and this fingerprint has to survive across runs.
+    """
+    from database.connector import connect
+    conn = connect(read_only=True, db_file=db_file)
+    try:
+        parts = []
+        tables = [r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+            if r[0] not in FINGERPRINT_EXCLUDED_TABLES]
+        for table in tables:
+            try:
+                count, max_id = conn.execute(f'SELECT COUNT(*), MAX(rowid) FROM "{table}"').fetchone()
+            except Exception:  # WITHOUT ROWID tables
+                count, max_id = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0], None
+            parts.append((table, count, max_id))
+            if count <= SMALL_TABLE_ROWS:
+                parts.append(_digest(*conn.execute(f'SELECT * FROM "{table}"').fetchall()))
+        return _digest(*parts)
+    finally:
+        conn.close()
+
+
+def path_fingerprint(path: str) -> str:
+    """File content hash; directories by name, size and mtime of their files."""
+    if os.path.isdir(path):
+        entries = []
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                st = os.stat(os.path.join(root, name))
+                entries.append((os.path.relpath(os.path.join(root, name), path), st.st_size, st.st_mtime_ns))
+        return _digest(*entries)
+    if not os.path.exists(path):
+        return "missing"
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def config_fingerprint() -> str:
+    """Hash of the public Config values (pipeline runner settings excluded)."""
+    from core.config import Config
+    values = sorted((k, repr(v)) for k, v in vars(Config).items()
+                    if k.isupper() and not k.startswith('PIPELINE_'))
+    return _digest(*values)
+
+
+def code_fingerprint(dirs: Sequence[str] = CODE_DIRS) -> str:
+    """Name, size and mtime of the project's Python sources, so a deploy reruns every stage."""
+    entries = []
+    for d in dirs:
+        for root, subdirs, files in os.walk(d):
+            subdirs[:] = sorted(x for x in subdirs if x != '__pycache__')
+            for name in sorted(files):
+                if name.endswith('.py'):
+                    st = os.stat(os.path.join(root, name))
+                    entries.append((os.path.join(root, name), st.st_size, st.st_mtime_ns))
+    return _digest(*entries)
+
+
+def fingerprint_resource(resource: str, db_file: Optional[str] = None) -> str:
+    """"db" -> database_fingerprint, "day" -> the UTC date (windowed reports roll over daily), else a path."""
+    if resource == "db":
+        return database_fingerprint(db_file)
+    if resource == "day":
+        return datetime.now(timezone.utc).date().isoformat()
+    return path_fingerprint(resource)
+
+
+class PipelineState:
+    """Input fingerprints of each stage's last successful run, persisted as JSON."""
+
+    def __init__(self, path: str = "data/pipeline_state.json", db_file: Optional[str] = None):
+        self.path = path
+        self.db_file = db_file
+        self.fingerprints: Dict[str, str] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.fingerprints = json.load(f).get("fingerprints", {})
+            except (OSError, ValueError):
+                logger.warning(f"Ignoring unreadable pipeline state {path}")
+
+    def fingerprint(self, stage: "Stage") -> Optional[str]:
+        """None for stages without inputs (always run)."""
+        if not stage.inputs:
+            return None
+        return _digest(config_fingerprint(), code_fingerprint(),
+                       *[(r, fingerprint_resource(r, self.db_file)) for r in sorted(set(stage.inputs))])
+
+    def is_fresh(self, stage: "Stage", fingerprint: Optional[str]) -> bool:
+        if fingerprint is None or self.fingerprints.get(stage.name) != fingerprint:
+            return False
+        return all(os.path.exists(o) for o in stage.outputs if o not in ("db", "day"))
+
+    def record(self, name: str, fingerprint: Optional[str]) -> None:
+        if fingerprint is None:
+            return
+        self.fingerprints[name] = fingerprint
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"fingerprints": self.fingerprints}, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def _thread_timed(fn, ctx, cpu: List[float]):
+    """Run a sync stage in its worker thread, recording that thread's CPU time."""
+    start = time.thread_time()
+    try:
+        return fn(ctx)
+    finally:
+        cpu[0] = time.thread_time() - start
+
+
+def build_graph(stages: Sequence[Stage]) -> Dict[str, List[str]]:
+    """{stage: [dependencies]} from declared inputs/outputs, in declaration order."""
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate stage names: {names}")
+    last_writer: Dict[str, str] = {}
+    graph: Dict[str, List[str]] = {}
+    for stage in stages:
+        deps = []
+        # Read-after-write, plus write-after-write so artefacts keep their final writer
+        for resource in stage.inputs + stage.outputs:
+            writer = last_writer.get(resource)
+            if writer and writer not in deps:
+                deps.append(writer)
+        graph[stage.name] = deps
+        for resource in stage.outputs:
+            last_writer[resource] = stage.name
+    return graph
+
+
+class Pipeline:
+    """
+    Runs stages as a DAG.
+
+    Args:
+        stages: Stages in declaration order (used to derive dependencies).
+        max_workers: Upper bound on stages running at once.
+        run_isolated: `(module, description) -> bool` used for isolated stages.
+        isolate: Stage names to run in a subprocess, or {"all"}.
+        state: Fingerprint store; stages with unchanged inputs are "cached". None runs everything.
+        force: Run every stage, but still record fingerprints.
+    """
+
+    def __init__(self, stages: Sequence[Stage], max_workers: int = 3,
+                 run_isolated: Optional[Callable[[str, str], bool]] = None,
+                 isolate: Sequence[str] = (), state: Optional[PipelineState] = None,
+                 force: bool = False):
+        self.stages = {s.name: s for s in stages}
+        self.graph = build_graph(stages)
+        self.max_workers = max(1, int(max_workers))
+        self.run_isolated = run_isolated
+        self.isolate = set(isolate)
+        self.state = state
+        self.force = force
+
+    def _is_isolated(self, stage: Stage) -> bool:
+        return bool(stage.module) and (stage.isolated or "all" in self.isolate or stage.name in self.isolate)
+
+    async def _execute(self, stage: Stage, ctx: PipelineContext) -> StageResult:
+        started = time.perf_counter()
+        fingerprint = None
+        if self.state is not None:
+            try:
+                fingerprint = await asyncio.to_thread(self.state.fingerprint, stage)
+            except Exception as e:
+                logger.warning(f"Could not fingerprint {stage.name} inputs, running it: {e}")
+            if not self.force and self.state.is_fresh(stage, fingerprint):
+                return StageResult(stage.name, "cached", time.perf_counter() - started)
+
+        # Set inside this stage's task, so to_thread workers and child tasks inherit it
+        stats = telemetry.StageStats()
+        token = telemetry.activate(stats)
+        rss_before = telemetry.peak_rss_bytes()
+        started = time.perf_counter()
+        cpu_s = 0.0
+        try:
+            if self._is_isolated(stage):
+                if self.run_isolated is None:
+                    raise RuntimeError("no subprocess runner configured")
+                cpu_start = telemetry.child_cpu_seconds()
+                try:
+                    ok = await asyncio.to_thread(self.run_isolated, stage.module, stage.description)
+                finally:
+                    cpu_s = telemetry.child_cpu_seconds() - cpu_start
+            elif inspect.iscoroutinefunction(stage.run):
+                cpu_start = time.process_time()
+                try:
+                    ok = await stage.run(ctx)
+                finally:
+                    cpu_s = time.process_time() - cpu_start
+            else:
+                cpu = [0.0]
+                ok = await asyncio.to_thread(_thread_timed, stage.run, ctx, cpu)
+                cpu_s = cpu[0]
+            status, error = ("failed", "returned False") if ok is False else ("ok", None)
+        except SystemExit as e:
+            status, error = ("ok", None) if not e.code else ("failed", f"exit code {e.code}")
+        except Exception as e:
+            logger.exception(f"Stage {stage.name} failed")
+            status, error = "failed", f"{type(e).__name__}: {e}"
+        finally:
+            telemetry.deactivate(token)
+        seconds = time.perf_counter() - started
+        REGISTRY.histogram("pipeline_stage_seconds", stage=stage.name, status=status).observe(seconds)
+        metrics = telemetry.stage_metrics(stats, seconds, cpu_s, rss_before, telemetry.peak_rss_bytes())
+        if status == "ok" and self.state is not None:
+            self.state.record(stage.name, fingerprint)
+        return StageResult(stage.name, status, seconds, error, metrics)
+
+    async def run(self, ctx: Optional[PipelineContext] = None,
+                  on_start: Optional[Callable[[Stage], None]] = None,
+                  on_finish: Optional[Callable[[Stage, StageResult], None]] = None) -> Dict[str, StageResult]:
+        """Run every stage; returns results in completion order."""
+        ctx = ctx or PipelineContext()
+        pending = dict(self.graph)
+        running: Dict[asyncio.Task, Stage] = {}
+        aborted = False
+
+        try:
+            while pending or running:
+                # Skip stages whose dependencies did not succeed
+                for name in [n for n, deps in pending.items()
+                             if aborted or any(ctx.results.get(d) and ctx.results[d].status in ("failed", "skipped")
+                                               for d in deps)]:
+                    del pending[name]
+                    result = StageResult(name, "skipped", error="aborted" if aborted else "upstream failed")
+                    ctx.results[name] = result
+                    if on_finish:
+                        on_finish(self.stages[name], result)
+
+                ready = [n for n, deps in pending.items()
+                         if all(d in ctx.results and ctx.results[d].status not in ("failed", "skipped") for d in deps)]
+                for name in ready[:max(0, self.max_workers - len(running))]:
+                    del pending[name]
+                    stage = self.stages[name]
+                    if on_start:
+                        on_start(stage)
+                    running[asyncio.ensure_future(self._execute(stage, ctx))] = stage
+
+                if not running:
+                    if pending:
+                        raise RuntimeError(f"Unresolvable stage dependencies: {sorted(pending)}")
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    stage = running.pop(task)
+                    result = task.result()
+                    ctx.results[stage.name] = result
+                    if on_finish:
+                        on_finish(stage, result)
+                    if result.status == "failed" and stage.critical:
+                        aborted = True
+        finally:
+            ctx.close()
+        return ctx.results
@@ -0,0 +1,120 @@
+"""
+As-of index over wom_snapshots.
+
+One ordered scan of (username, timestamp, id, total_xp, total_boss_kills)
+builds sorted per-user arrays; the snapshot a user had at any cutoff is then
+a binary search instead of a ROW_NUMBER() window over the whole table. A
+report asking for 7d / 30d / 90d / 365d baselines pays for one scan.
+"""
+
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database.models import WOMSnapshot
+
+
+class AsOfSnapshot(NamedTuple):
+    id: int
+    username: str
+    timestamp: datetime
+    total_xp: int
+    total_boss_kills: int
+
+
+def _epoch(ts: datetime) -> float:
+    # wom_snapshots.timestamp is stored as naive UTC
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+class _Timeline:
+    __slots__ = ("epochs", "ids", "xp", "boss")
+
+    def __init__(self):
+        # Parallel typed arrays (~32 bytes per snapshot) ordered by (timestamp, id)
+        self.epochs = array('d')
+        self.ids = array('q')
+        self.xp = array('q')
+        self.boss = array('q')
+
+
+class SnapshotAsOfIndex:
+    """
+    Per-user snapshot timelines answering "latest snapshot at or before T".
+
+    Ties on timestamp resolve to the highest id, matching the
+    `ORDER BY timestamp DESC, id DESC` of the window query it replaces.
+    """
+
+    def __init__(self):
+        self._timelines: Dict[str, _Timeline] = {}
+
+    @classmethod
+    def load(cls, db: Session) -> "SnapshotAsOfIndex":
+        index = cls()
+        stmt = (
+            select(WOMSnapshot.id, WOMSnapshot.username, WOMSnapshot.timestamp,
+                   WOMSnapshot.total_xp, WOMSnapshot.total_boss_kills)
+            .where(WOMSnapshot.timestamp.isnot(None))
+            .order_by(WOMSnapshot.username, WOMSnapshot.timestamp, WOMSnapshot.id)
+        )
+        for snap_id, username, ts, xp, boss in db.execute(stmt):
+            index.add(username, ts, snap_id, xp or 0, boss or 0)
+        return index
+
+    def add(self, username: str, timestamp: datetime, snap_id: int, total_xp: int, total_boss_kills: int) -> None:
+        """Append a snapshot; callers add each user's rows in (timestamp, id) order."""
+        timeline = self._timelines.get(username)
+        if timeline is None:
+            timeline = self._timelines[username] = _Timeline()
+        timeline.epochs.append(_epoch(timestamp))
+        timeline.ids.append(snap_id)
+        timeline.xp.append(total_xp)
+        timeline.boss.append(total_boss_kills)
+
+    def __len__(self) -> int:
+        return len(self._timelines)
+
+    @property
+    def usernames(self) -> List[str]:
+        return list(self._timelines)
+
+    def _row(self, username: str, timeline: _Timeline, pos: int) -> AsOfSnapshot:
+        return AsOfSnapshot(timeline.ids[pos], username,
+                            datetime.fromtimestamp(timeline.epochs[pos], timezone.utc).replace(tzinfo=None),
+                            timeline.xp[pos], timeline.boss[pos])
+
+    def as_of(self, username: str, cutoff: Optional[datetime] = None) -> Optional[AsOfSnapshot]:
+        """The user's latest snapshot at or before `cutoff` (latest overall if None)."""
+        timeline = self._timelines.get(username)
+        if timeline is None or not timeline.ids:
+            return None
+        pos = len(timeline.ids) if cutoff is None else bisect_right(timeline.epochs, _epoch(cutoff))
+        return self._row(username, timeline, pos - 1) if pos else None
+
+    def at(self, cutoff: Optional[datetime] = None) -> Dict[str, AsOfSnapshot]:
+        """{username: snapshot as of cutoff} for every user with one."""
+        result = {}
+        for username in self._timelines:
+            snap = self.as_of(username, cutoff)
+            if snap is not None:
+                result[username] = snap
+        return result
+
+    def latest(self) -> Dict[str, AsOfSnapshot]:
+        return self.at(None)
+
+    def earliest(self) -> Dict[str, AsOfSnapshot]:
+        """{username: first snapshot}"""
+        return {username: self._row(username, timeline, 0)
+                for username, timeline in self._timelines.items() if timeline.ids}
+
+    def baselines(self, cutoffs: Iterable[Optional[datetime]]) -> Dict[Optional[datetime], Dict[str, AsOfSnapshot]]:
+        """Bulk form of `at`: {cutoff: {username: snapshot}} for every requested cutoff."""
+        return {cutoff: self.at(cutoff) for cutoff in cutoffs}
@@ -0,0 +1,282 @@
+"""
+Per-stage run telemetry for the pipeline (core/pipeline.py).
+
+While a stage runs, its `StageStats` is the current one (a ContextVar, so it
+follows the stage into `asyncio.to_thread` workers and tasks). Instrumented
+code adds to it with `count(name)`:
+
+- SQLite connections from database/connector.py (CountingConnection) count rows
+  read per fetch call, and rows written per statement from the connection's own
+  `total_changes`; both go to the stage that ran the statement, so stages that
+  overlap in time do not count each other's writes
+- WOMClient: http_requests, http_429, http_cache_hits / http_cache_misses
+- LLMClient: llm_requests, llm_429
+- AnalyticsSnapshot: analytics_cache_hits / analytics_cache_misses
+
+`run_report` turns the finished stages into the JSON written next to app.log
+(Config.PIPELINE_RUN_REPORT); `save_run_history` appends it to pipeline_runs.
+Counting outside a stage (no current StageStats) is a no-op.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("Telemetry")
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+@dataclass
+class StageStats:
+    rows_read: int = 0
+    rows_written: int = 0
+    counters: Counter = field(default_factory=Counter)
+
+
+_current: ContextVar[Optional[StageStats]] = ContextVar("pipeline_stage_stats", default=None)
+
+
+def current() -> Optional[StageStats]:
+    return _current.get()
+
+
+def activate(stats: Optional[StageStats]):
+    """Make `stats` current; returns the token for `deactivate`."""
+    return _current.set(stats)
+
+
+def deactivate(token) -> None:
+    _current.reset(token)
+
+
+def count(name: str, n: int = 1) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.counters[name] += n
+
+
+# --- SQLite instrumentation ---
+
+def _count_rows(n: int) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.rows_read += n
+
+
+def _count_changes(n: int) -> None:
+    if n:
+        stats = _current.get()
+        if stats is not None:
+            stats.rows_written += n
+
+
+class CountingCursor(sqlite3.Cursor):
+    """
+    Counts rows per fetch call (one Python call per fetchall/fetchmany, not per
+    row) and rows changed per execute call, from sqlite's `total_changes`
+    before and after the statement.
+    """
+
+    def execute(self, sql, parameters=()):
+        before = self.connection.total_changes
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _count_changes(self.connection.total_changes - before)
+
+    def executemany(self, sql, seq_of_parameters):
+        before = self.connection.total_changes
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _count_changes(self.connection.total_changes - before)
+
+    def executescript(self, sql_script):
+        before = self.connection.total_changes
+        try:
+            return super().executescript(sql_script)
+        finally:
+            _count_changes(self.connection.total_changes - before)
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            _count_rows(1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        _count_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        _count_rows(len(rows))
+        return rows
+
+
+class CountingConnection(sqlite3.Connection):
+    """
+    sqlite3 connection factory (`sqlite3.connect(..., factory=CountingConnection)`).
+
+    Every statement runs through a CountingCursor, which adds rows fetched and
+    rows changed to the current StageStats. Attribution follows the ContextVar,
+    so it is per stage even when stages overlap; two threads running statements
+    on one connection at the same moment could still see each other's changes.
+    Rows read by iterating a cursor directly are not counted.
+    """
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or CountingCursor)
+
+    # The C implementations create their cursor internally, bypassing cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+# --- Process measurements ---
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process so far (None if unavailable)."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            if ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                        ctypes.byref(counters), counters.cb):
+                return int(counters.PeakWorkingSetSize)
+        except Exception:
+            pass
+    return None
+
+
+def child_cpu_seconds() -> float:
+    """CPU time of finished child processes (subprocess-isolated stages)."""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _mb(value: Optional[int]) -> Optional[float]:
+    return round(value / (1024 * 1024), 1) if value is not None else None
+
+
+def stage_metrics(stats: StageStats, wall_s: float, cpu_s: float,
+                  rss_before: Optional[int], rss_after: Optional[int]) -> Dict[str, Any]:
+    """Flat metrics dict for one stage, with hit ratios for every *_hits/*_misses pair."""
+    metrics: Dict[str, Any] = {
+        "wall_s": round(wall_s, 3),
+        "cpu_s": round(cpu_s, 3),
+        "peak_rss_mb": _mb(rss_after),
+        # Process-wide high-water mark, so concurrent stages share it
+        "rss_growth_mb": _mb(rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+        "rows_read": stats.rows_read,
+        "rows_written": stats.rows_written,
+    }
+    metrics.update(sorted(stats.counters.items()))
+    for key in [k for k in metrics if k.endswith("_hits")]:
+        prefix = key[:-len("_hits")]
+        total = metrics[key] + metrics.get(f"{prefix}_misses", 0)
+        metrics[f"{prefix}_hit_ratio"] = round(metrics[key] / total, 3) if total else None
+    return metrics
+
+
+# --- Run report ---
+
+def run_report(results, started_at: datetime, wall_s: float, trace_id: str = "") -> Dict[str, Any]:
+    """JSON-ready summary of a pipeline run from its StageResults (in completion order)."""
+    stages = []
+    for result in results.values():
+        entry = {"name": result.name, "status": result.status}
+        if result.error:
+            entry["error"] = result.error
+        entry.update(result.metrics or {"wall_s": round(result.seconds, 3)})
+        stages.append(entry)
+    statuses = {s["status"] for s in stages}
+    return {
+        "run_id": started_at.strftime("%Y%m%dT%H%M%S") + (f"-{trace_id}" if trace_id else ""),
+        "trace_id": trace_id,
+        "started_at": started_at.isoformat(),
+        "wall_s": round(wall_s, 3),
+        "status": "failed" if "failed" in statuses else "ok",
+        "peak_rss_mb": _mb(peak_rss_bytes()),
+        "stages": stages,
+    }
+
+
+def write_run_report(report: Dict[str, Any], path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def save_run_history(db, report: Dict[str, Any]) -> int:
+    """Append one pipeline_runs row per stage. Returns rows written."""
+    from database.models import PipelineRun
+    started_at = datetime.fromisoformat(report["started_at"])
+    rows = [
+        PipelineRun(
+            run_id=report["run_id"],
+            started_at=started_at.replace(tzinfo=None),
+            stage=stage["name"],
+            status=stage["status"],
+            wall_s=stage.get("wall_s"),
+            cpu_s=stage.get("cpu_s"),
+            peak_rss_mb=stage.get("peak_rss_mb"),
+            rows_read=stage.get("rows_read"),
+            rows_written=stage.get("rows_written"),
+            http_requests=stage.get("http_requests"),
+            metrics=json.dumps(stage, sort_keys=True),
+        )
+        for stage in report["stages"]
+    ]
+    db.add_all(rows)
+    db.commit()
+    return len(rows)
+
+
+def previous_wall_times(db, stages: List[str], limit: int = 5) -> Dict[str, float]:
+    """Median wall time of each stage over its last `limit` successful runs."""
+    from sqlalchemy import select
+    from database.models import PipelineRun
+    medians = {}
+    for stage in stages:
+        times = sorted(db.execute(
+            select(PipelineRun.wall_s).where(PipelineRun.stage == stage, PipelineRun.status == "ok")
+            .order_by(PipelineRun.id.desc()).limit(limit)
+        ).scalars())
+        if times:
+            medians[stage] = times[len(times) // 2]
+    return medians
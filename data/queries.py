@@ -87,60 +87,22 @@ class Queries:
         GROUP BY day, username
     '''
     
-    GET_DAILY_MSGS = '''
-        SELECT date(created_at) as day, COUNT(*) 
-        FROM discord_messages 
-        WHERE created_at >= ?
-        GROUP BY day
-    '''
-    
     GET_BOSS_DIVERSITY = '''
         SELECT boss_name, COUNT(DISTINCT ws.username) as clan_members
         FROM boss_snapshots bs
-        JOIN wom_snapshots ws ON bs.snapshot_id = ws.id
+        JOIN wom_snapshots ws ON bs.snapshot_id = COALESCE(ws.ref_snapshot_id, ws.id)
         WHERE bs.snapshot_id IN ({})
         AND ws.username IN (SELECT username FROM clan_members)
         GROUP BY boss_name
         ORDER BY COUNT(DISTINCT ws.username) DESC
     '''
     
-    GET_BOSS_SUMS_FOR_IDS = '''
-        SELECT boss_name, ROUND(SUM(bs.kills), 1) as total_kills
-        FROM boss_snapshots bs
-        JOIN wom_snapshots ws ON bs.snapshot_id = ws.id
-        WHERE bs.snapshot_id IN ({})
-        AND ws.username IN (SELECT username FROM clan_members)
-        GROUP BY boss_name
-    '''
-
-    GET_RAW_DATA_FOR_IDS = '''
-        SELECT raw_data
-        FROM wom_snapshots
-        WHERE id IN ({})
-    '''
-
     GET_DAILY_BOSS_KILLS = '''
         SELECT date(ws.timestamp) as day, SUM(bs.kills)
         FROM wom_snapshots ws
-        JOIN boss_snapshots bs ON ws.id = bs.snapshot_id
+        JOIN boss_snapshots bs ON COALESCE(ws.ref_snapshot_id, ws.id) = bs.snapshot_id
         WHERE ws.timestamp >= ? AND bs.boss_name = ?
         GROUP BY day
     '''
     
-    GET_DISCORD_MSG_COUNTS_TOTAL = "SELECT lower(author_name), COUNT(*) FROM discord_messages GROUP BY lower(author_name)"
-    
-    GET_DISCORD_MSG_COUNTS_SINCE_SIMPLE = '''
-        SELECT lower(author_name), COUNT(*) 
-        FROM discord_messages 
-        WHERE created_at >= ? 
-        GROUP BY lower(author_name)
-    '''
-
-    GET_HOURLY_ACTIVITY = '''
-        SELECT strftime('%H', created_at) as hour, COUNT(*) 
-        FROM discord_messages 
-        WHERE created_at >= ? 
-        GROUP BY hour
-    '''
-
     GET_ALL_MEMBERS_METADATA = "SELECT username, role, joined_at FROM clan_members"
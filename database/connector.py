@@ -1,6 +1,30 @@
-from sqlalchemy import create_engine
+"""
+Connection factory for the SQLite database.
+
+Every connection - ORM sessions, the read-only report engine and raw DBAPI
+handles from `connect()` - gets the same tuned PRAGMA profile on connect
+(see Config.SQLITE_* and `SQLITE_PROFILE`):
+
+- journal_mode=WAL: readers don't block the harvest writer (persistent, set by writers)
+- synchronous=NORMAL: fsync per checkpoint instead of per commit (safe under WAL)
+- mmap_size / cache_size: keep hot pages mapped/cached instead of re-reading them
+- temp_store=MEMORY: sorts and temp b-trees for GROUP BY/ORDER BY stay in RAM
+- busy_timeout: wait for locks instead of failing with "database is locked"
+
+Read-only connections (report stages) open the file with mode=ro and
+query_only=ON, so they can never take the write lock.
+
+With Config.PIPELINE_TELEMETRY, connections are created as
+telemetry.CountingConnection, which adds rows fetched and rows changed to the
+stage running each statement (core/telemetry.py).
+"""
+import sqlite3
+from typing import Dict
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
+from core import telemetry
 from core.config import Config
 from .models import Base
 
@@ -10,27 +34,82 @@ from .models import Base
 
 DB_URL = f"sqlite:///{Config.DB_FILE}"
 
+SQLITE_PROFILE: Dict[str, object] = {
+    "journal_mode": Config.SQLITE_JOURNAL_MODE,
+    "synchronous": Config.SQLITE_SYNCHRONOUS,
+    "mmap_size": Config.SQLITE_MMAP_SIZE,
+    "cache_size": Config.SQLITE_CACHE_SIZE,
+    "temp_store": Config.SQLITE_TEMP_STORE,
+    "busy_timeout": Config.SQLITE_BUSY_TIMEOUT_MS,
+}
+
+
+def apply_sqlite_profile(dbapi_conn, read_only: bool = False) -> None:
+    """Apply SQLITE_PROFILE to a DBAPI connection."""
+    cursor = dbapi_conn.cursor()
+    try:
+        for pragma, value in SQLITE_PROFILE.items():
+            # journal_mode is a property of the file; a read-only handle can't change it
+            if value in (None, "") or (read_only and pragma == "journal_mode"):
+                continue
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+    finally:
+        cursor.close()
+
+
+# sqlite3.connect() kwargs shared by every connection (wait up to 30 s for locks)
+CONNECT_ARGS: Dict[str, object] = {"timeout": 30, "check_same_thread": False}
+if Config.PIPELINE_TELEMETRY:
+    CONNECT_ARGS["factory"] = telemetry.CountingConnection
+
+
+def connect(read_only: bool = False, db_file: str = None) -> sqlite3.Connection:
+    """Raw sqlite3 connection with the tuned profile (for legacy cursor-based code)."""
+    path = db_file or Config.DB_FILE
+    if read_only and path != ":memory:":
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, **CONNECT_ARGS)
+    else:
+        conn = sqlite3.connect(path, **CONNECT_ARGS)
+    apply_sqlite_profile(conn, read_only=read_only)
+    return conn
+
+
 # Use StaticPool for SQLite to maintain a single connection that's reused
 # This prevents connection pool exhaustion and lock contention
 engine = create_engine(
     DB_URL, 
-    connect_args={
-        "check_same_thread": False,
-        "timeout": 30  # 30 second timeout for lock waits
-    },
+    connect_args=CONNECT_ARGS,
     poolclass=StaticPool,
     pool_pre_ping=True,  # Test connections before use
     echo=False
 )
+
+# Report stages only read: separate pooled engine so several can run beside the writer
+read_engine = create_engine(
+    "sqlite://",
+    creator=lambda: connect(read_only=True),
+    pool_pre_ping=True,
+    echo=False
+)
+
+
+@event.listens_for(engine, "connect")
+def _tune_connection(dbapi_conn, _record):
+    apply_sqlite_profile(dbapi_conn)
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadOnlySession = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 def init_db():
     """Initializes the database schema (creates tables if missing)."""
     Base.metadata.create_all(bind=engine)
 
-def get_db():
-    """Dependency: yields a database session."""
-    db = SessionLocal()
+def get_db(read_only: bool = False):
+    """Dependency: yields a database session (read-only sessions for report stages)."""
+    db = ReadOnlySession() if read_only else SessionLocal()
     try:
         yield db
     finally:
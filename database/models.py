@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime, Boolean
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, Boolean, LargeBinary
+from sqlalchemy.orm import declarative_base, deferred, object_session
 
 Base = declarative_base()
 
@@ -16,6 +16,31 @@ class DiscordMessage(Base):
     guild_id = Column(Integer)
     guild_name = Column(String)
     created_at = Column(DateTime, index=True)
+    # Insertion counter set by DiscordFetcher._save_batch: follows commit order, unlike snowflake ids
+    insert_seq = Column(Integer, index=True)
+
+class DiscordChannelCheckpoint(Base):
+    __tablename__ = 'discord_channel_checkpoints'
+
+    # Per-channel high-water mark so each channel resumes with after=last_message_id
+    channel_id = Column(Integer, primary_key=True, autoincrement=False)
+    channel_name = Column(String)
+    guild_id = Column(Integer)
+    last_message_id = Column(Integer, nullable=False)
+    last_message_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+class DiscordAuthorDaily(Base):
+    __tablename__ = 'discord_author_daily'
+
+    # Message counts per author per UTC hour, kept in step with discord_messages by
+    # DiscordFetcher._save_batch (see database/rollups.py). Windowed message counts
+    # read this instead of grouping the whole message table.
+    author_key = Column(String, primary_key=True)  # lower(author_name), same key as the old GROUP BY
+    day = Column(String, primary_key=True, index=True)  # 'YYYY-MM-DD'
+    hour = Column(Integer, primary_key=True)  # 0-23
+    user_id = Column(Integer, index=True)
+    message_count = Column(Integer, nullable=False, default=0)
 
 class WOMRecord(Base):
     __tablename__ = 'wom_records'
@@ -41,7 +66,32 @@ class WOMSnapshot(Base):
     total_boss_kills = Column(Integer)
     ehp = Column(Float)
     ehb = Column(Float)
-    raw_data = Column(Text)
+    # JSON text, or a compressed BLOB (database/raw_payload.py). Deferred: only loaded when accessed.
+    raw_data = deferred(Column(Text))
+    # Unchanged snapshots are stored as references: raw_data and boss/skill rows live on ref_snapshot_id
+    content_hash = Column(String, index=True)
+    ref_snapshot_id = Column(Integer, index=True)
+
+    @property
+    def source_id(self) -> int:
+        """Id of the row holding this snapshot's raw_data and boss/skill rows."""
+        return self.ref_snapshot_id or self.id
+
+    @property
+    def payload(self) -> dict:
+        """raw_data decoded and parsed on first access."""
+        if '_payload' not in self.__dict__:
+            from database.raw_payload import load_raw_data
+            session = object_session(self)
+            raw = self.raw_data
+            if self.ref_snapshot_id is not None and session is not None:
+                source = session.get(WOMSnapshot, self.ref_snapshot_id)
+                if source is None:
+                    # Referenced row pruned, or a partial dedup migration: nothing to resolve
+                    raise LookupError(f"wom_snapshots {self.id} references missing snapshot {self.ref_snapshot_id}")
+                raw = source.raw_data
+            self.__dict__['_payload'] = load_raw_data(session, raw)
+        return self.__dict__['_payload']
 
 class ClanMember(Base):
     __tablename__ = 'clan_members'
@@ -81,3 +131,50 @@ class BossSnapshot(Base):
     boss_name = Column(String, index=True)
     kills = Column(Integer)
     rank = Column(Integer)
+
+class SkillSnapshot(Base):
+    __tablename__ = 'skill_snapshots'
+    # One row per skill per snapshot, extracted from raw_data at ingest
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    snapshot_id = Column(Integer, index=True)  # FK to wom_snapshots.id
+    skill = Column(String, index=True)
+    level = Column(Integer)
+    experience = Column(Integer)
+    rank = Column(Integer)
+
+class ActivitySnapshot(Base):
+    __tablename__ = 'activity_snapshots'
+    # Clue scrolls, minigames, etc. (WOM 'activities'); unranked (-1) scores are skipped like bosses
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    snapshot_id = Column(Integer, index=True)  # FK to wom_snapshots.id
+    activity = Column(String, index=True)
+    score = Column(Integer)
+    rank = Column(Integer)
+
+class RawDataDictionary(Base):
+    __tablename__ = 'raw_data_dictionaries'
+    # Preset zlib dictionaries for compressed raw_data; rows reference them by id
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    dictionary = Column(LargeBinary, nullable=False)
+    sample_count = Column(Integer)
+    created_at = Column(DateTime)
+
+class PipelineRun(Base):
+    __tablename__ = 'pipeline_runs'
+    # One row per stage per main.py run (core/telemetry.py); full stage metrics in `metrics` (JSON)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(String, index=True)
+    started_at = Column(DateTime, index=True)
+    stage = Column(String, index=True)
+    status = Column(String)
+    wall_s = Column(Float)
+    cpu_s = Column(Float)
+    peak_rss_mb = Column(Float)
+    rows_read = Column(Integer)
+    rows_written = Column(Integer)
+    http_requests = Column(Integer)
+    metrics = Column(Text)
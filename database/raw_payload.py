@@ -0,0 +1,244 @@
+"""
+Compressed storage for wom_snapshots.raw_data.
+
+raw_data holds either the original JSON text (legacy rows, and the default
+RAW_DATA_COMPRESSION=none) or a BLOB:
+
+    b'ZR' + dictionary id (uint16, big-endian; 0 = none) + zlib stream
+
+Dictionaries live in raw_data_dictionaries and are preset zlib dictionaries
+(`zdict`) built from the shape of existing payloads. WOM payloads are mostly
+the same ~150 keys repeated, so a shared dictionary is where most of the gain
+comes from on multi-KB rows. Rows name their dictionary, so training a new one
+never invalidates old rows.
+
+Readers go through `load_raw_data` / `WOMSnapshot.payload`, which decode on
+access and accept both formats.
+"""
+
+import json
+import logging
+import struct
+import time
+import weakref
+import zlib
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Union
+
+from sqlalchemy import LargeBinary, bindparam, case, cast, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from database.models import RawDataDictionary, WOMSnapshot
+
+logger = logging.getLogger("RawPayload")
+
+MAGIC = b'ZR'
+HEADER = struct.Struct('>2sH')
+ZDICT_SIZE = 32 * 1024  # zlib only looks back 32 KB, so larger dictionaries are wasted
+
+RawValue = Union[str, bytes, memoryview, None]
+
+
+def is_compressed(value: RawValue) -> bool:
+    return isinstance(value, (bytes, memoryview)) and bytes(value[:2]) == MAGIC
+
+
+def _skeleton(obj: Any) -> Any:
+    """Payload with values blanked, leaving the keys and structure that repeat across snapshots."""
+    if isinstance(obj, dict):
+        return {k: _skeleton(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_skeleton(v) for v in obj]
+    if isinstance(obj, bool) or obj is None:
+        return obj
+    if isinstance(obj, (int, float)):
+        return 0
+    return ""
+
+
+def train_dictionary(samples: Iterable[str], size: int = ZDICT_SIZE) -> bytes:
+    """Build a zlib preset dictionary from sample payloads (JSON text)."""
+    counts: Counter = Counter()
+    for sample in samples:
+        try:
+            counts[json.dumps(_skeleton(json.loads(sample)))] += 1
+        except (TypeError, ValueError):
+            continue
+    # zlib reaches matches near the end of the dictionary cheapest: most common shapes last
+    blob = ''.join(shape for shape, _ in sorted(counts.items(), key=lambda kv: kv[1])).encode()
+    return blob[-size:]
+
+
+class RawPayloadCodec:
+    """Encodes/decodes raw_data values against the stored dictionaries. One per engine."""
+
+    _by_engine: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    def __init__(self, dictionaries: Optional[Dict[int, bytes]] = None, level: int = 6):
+        self.dictionaries: Dict[int, bytes] = dict(dictionaries or {})
+        self.level = level
+
+    @classmethod
+    def for_session(cls, db: Session) -> "RawPayloadCodec":
+        engine = db.get_bind()
+        codec = cls._by_engine.get(engine)
+        if codec is None:
+            codec = cls._by_engine[engine] = cls()
+            codec.reload(db)
+        return codec
+
+    def reload(self, db: Session) -> None:
+        rows = db.execute(select(RawDataDictionary.id, RawDataDictionary.dictionary)).all()
+        self.dictionaries = {int(i): bytes(d) for i, d in rows}
+
+    @property
+    def active_id(self) -> int:
+        """Newest dictionary; new rows are compressed with it."""
+        return max(self.dictionaries, default=0)
+
+    def encode(self, raw_json: str) -> bytes:
+        dict_id = self.active_id
+        comp = (zlib.compressobj(self.level, zdict=self.dictionaries[dict_id]) if dict_id
+                else zlib.compressobj(self.level))
+        return HEADER.pack(MAGIC, dict_id) + comp.compress(raw_json.encode('utf-8')) + comp.flush()
+
+    def decode(self, value: RawValue) -> Optional[str]:
+        if value is None or isinstance(value, str):
+            return value
+        value = bytes(value)
+        if not is_compressed(value):
+            return value.decode('utf-8')
+        _, dict_id = HEADER.unpack_from(value)
+        if dict_id and dict_id not in self.dictionaries:
+            raise LookupError(f"raw_data dictionary {dict_id} is not loaded")
+        decomp = (zlib.decompressobj(zdict=self.dictionaries[dict_id]) if dict_id
+                  else zlib.decompressobj())
+        return (decomp.decompress(value[HEADER.size:]) + decomp.flush()).decode('utf-8')
+
+
+def decode_raw_data(db: Optional[Session], value: RawValue) -> Optional[str]:
+    """raw_data as JSON text, whichever format it is stored in."""
+    if not is_compressed(value):
+        return RawPayloadCodec().decode(value)
+    if db is None:
+        raise LookupError("compressed raw_data needs a session to load its dictionary")
+    codec = RawPayloadCodec.for_session(db)
+    try:
+        return codec.decode(value)
+    except LookupError:
+        codec.reload(db)  # dictionary trained after the codec was cached
+        return codec.decode(value)
+
+
+def load_raw_data(db: Optional[Session], value: RawValue) -> Dict[str, Any]:
+    """raw_data parsed into a dict ({} for empty or unparseable rows)."""
+    try:
+        raw = decode_raw_data(db, value)
+        return json.loads(raw) if raw else {}
+    except (ValueError, zlib.error):
+        return {}
+
+
+# --- Maintenance (scripts/compress_raw_data.py) ---
+
+def store_dictionary(db: Session, sample_size: int = 200) -> int:
+    """Train a dictionary from the newest payloads and store it. Returns its id (0 if no samples)."""
+    values = db.execute(
+        select(WOMSnapshot.raw_data).where(WOMSnapshot.raw_data.is_not(None))
+        .order_by(WOMSnapshot.id.desc()).limit(sample_size)
+    ).scalars().all()
+    samples = [raw for raw in (decode_raw_data(db, v) for v in values) if raw]
+    zdict = train_dictionary(samples)
+    if not zdict:
+        return 0
+    dict_id = db.execute(
+        insert(RawDataDictionary).returning(RawDataDictionary.id),
+        {'dictionary': zdict, 'sample_count': len(samples), 'created_at': datetime.now(timezone.utc)},
+    ).scalar_one()
+    db.commit()
+    RawPayloadCodec.for_session(db).reload(db)
+    return dict_id
+
+
+def _rewrite(db: Session, convert, batch_size: int) -> int:
+    """Apply `convert(value) -> new value or None` to every raw_data row in id order."""
+    snaps = WOMSnapshot.__table__
+    last_id, changed = 0, 0
+    while True:
+        rows = db.execute(
+            select(snaps.c.id, snaps.c.raw_data).where(snaps.c.id > last_id)
+            .order_by(snaps.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return changed
+        last_id = rows[-1][0]
+        updates = [{'sid': sid, 'raw': new} for sid, value in rows
+                   if (new := convert(value)) is not None]
+        if updates:
+            db.execute(
+                snaps.update().where(snaps.c.id == bindparam('sid')).values(raw_data=bindparam('raw')),
+                updates,
+            )
+            changed += len(updates)
+        db.commit()
+
+
+def compress_existing(db: Session, batch_size: int = 500) -> int:
+    """Compress every plain-text raw_data row with the active dictionary. Returns rows rewritten."""
+    codec = RawPayloadCodec.for_session(db)
+    return _rewrite(db, lambda v: codec.encode(v) if isinstance(v, str) and v else None, batch_size)
+
+
+def decompress_existing(db: Session, batch_size: int = 500) -> int:
+    """Turn compressed rows back into JSON text. Returns rows rewritten."""
+    return _rewrite(db, lambda v: decode_raw_data(db, v) if is_compressed(v) else None, batch_size)
+
+
+def storage_report(db: Session, sample_size: int = 200) -> Dict[str, Any]:
+    """Stored size of raw_data plus encode/decode throughput on a sample of rows."""
+    stored = func.length(cast(WOMSnapshot.raw_data, LargeBinary))
+    rows, text_rows, stored_bytes = db.execute(select(
+        func.count(WOMSnapshot.id),
+        func.sum(case((func.typeof(WOMSnapshot.raw_data) == 'text', 1), else_=0)),
+        func.coalesce(func.sum(stored), 0),
+    )).one()
+    page_size = db.execute(text("PRAGMA page_size")).scalar()
+    page_count = db.execute(text("PRAGMA page_count")).scalar()
+
+    values = db.execute(
+        select(WOMSnapshot.raw_data).where(WOMSnapshot.raw_data.is_not(None))
+        .order_by(WOMSnapshot.id.desc()).limit(sample_size)
+    ).scalars().all()
+    plain = [raw for raw in (decode_raw_data(db, v) for v in values) if raw]
+    codec = RawPayloadCodec.for_session(db)
+    plain_bytes = sum(len(raw.encode('utf-8')) for raw in plain)
+
+    started = time.perf_counter()
+    encoded = [codec.encode(raw) for raw in plain]
+    encode_s = time.perf_counter() - started
+    started = time.perf_counter()
+    for blob in encoded:
+        codec.decode(blob)
+    decode_s = time.perf_counter() - started
+
+    mb = plain_bytes / (1024 * 1024)
+    return {
+        'rows': rows or 0,
+        'text_rows': text_rows or 0,
+        'stored_bytes': stored_bytes,
+        'db_bytes': page_size * page_count,
+        'dictionary_id': codec.active_id,
+        'sample_rows': len(plain),
+        'sample_ratio': (sum(map(len, encoded)) / plain_bytes) if plain_bytes else 0.0,
+        'encode_mb_s': mb / encode_s if encode_s > 0 else 0.0,
+        'decode_mb_s': mb / decode_s if decode_s > 0 else 0.0,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    return (f"raw_data: {report['rows']:,} rows ({report['text_rows']:,} uncompressed), "
+            f"{report['stored_bytes'] / 1e6:,.1f} MB stored; database {report['db_bytes'] / 1e6:,.1f} MB | "
+            f"dictionary {report['dictionary_id'] or 'none'}: ratio {report['sample_ratio']:.1%} on "
+            f"{report['sample_rows']} rows, encode {report['encode_mb_s']:,.0f} MB/s, "
+            f"decode {report['decode_mb_s']:,.0f} MB/s")
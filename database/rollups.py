@@ -0,0 +1,154 @@
+"""
+Incrementally maintained rollups over discord_messages.
+
+`discord_author_daily` holds one row per (lower(author_name), UTC day, hour)
+with the message count. `DiscordFetcher._save_batch` adds each batch's newly
+inserted messages, so windowed counts read a table sized by authors x hours
+instead of grouping the whole message history on every report.
+
+Windows are exact: whole hours come from the rollup, and the part of the
+first hour after `since` is counted from discord_messages (an index range
+scan over at most one hour of messages).
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import Integer, and_, cast, func, or_, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from database.models import DiscordAuthorDaily, DiscordMessage
+
+Bucket = Tuple[str, int]
+
+
+def _utc_naive(ts: datetime) -> datetime:
+    # discord_messages.created_at is stored as naive UTC
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def message_bucket(created_at: datetime) -> Bucket:
+    """(day, hour) bucket of a message timestamp."""
+    ts = _utc_naive(created_at)
+    return ts.strftime('%Y-%m-%d'), ts.hour
+
+
+def _field(row: Any, name: str) -> Any:
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def record_messages(db: Session, rows: Iterable[Any]) -> int:
+    """
+    Add newly inserted messages (dicts or DiscordMessage objects) to the rollup.
+
+    Runs inside the caller's transaction; only pass rows that were actually inserted,
+    otherwise they are counted twice. Returns the number of buckets touched.
+    """
+    counts: Counter = Counter()
+    user_ids: Dict[Tuple[str, str, int], Optional[int]] = {}
+    for row in rows:
+        created_at = _field(row, 'created_at')
+        if created_at is None:
+            continue
+        key = (str(_field(row, 'author_name') or '').lower(), *message_bucket(created_at))
+        counts[key] += 1
+        user_id = _field(row, 'user_id')
+        if user_id is not None or key not in user_ids:
+            user_ids[key] = user_id
+
+    if not counts:
+        return 0
+
+    table = DiscordAuthorDaily.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.author_key, table.c.day, table.c.hour],
+        set_={
+            'message_count': table.c.message_count + stmt.excluded.message_count,
+            'user_id': func.coalesce(stmt.excluded.user_id, table.c.user_id),
+        },
+    )
+    db.execute(stmt, [
+        {'author_key': author, 'day': day, 'hour': hour, 'user_id': user_ids[(author, day, hour)], 'message_count': n}
+        for (author, day, hour), n in counts.items()
+    ])
+    return len(counts)
+
+
+def rebuild_author_daily(db: Session) -> int:
+    """Recompute the whole rollup from discord_messages (backfill, or after bulk user_id fixes)."""
+    db.execute(text("DELETE FROM discord_author_daily"))
+    db.execute(text("""
+        INSERT INTO discord_author_daily (author_key, day, hour, user_id, message_count)
+        SELECT COALESCE(lower(author_name), ''), strftime('%Y-%m-%d', created_at),
+               CAST(strftime('%H', created_at) AS INTEGER), MAX(user_id), COUNT(*)
+        FROM discord_messages
+        WHERE created_at IS NOT NULL
+        GROUP BY 1, 2, 3
+    """))
+    return db.execute(select(func.count()).select_from(DiscordAuthorDaily)).scalar() or 0
+
+
+def _windowed(db: Session, since: Optional[datetime], rollup_keys, raw_keys, where=None) -> Counter:
+    """Sum rollup buckets from `since` on, plus the raw messages in its partial first hour."""
+    rollup = DiscordAuthorDaily
+    stmt = select(*rollup_keys, func.sum(rollup.message_count))
+    if where is not None:
+        stmt = stmt.where(where[0])
+
+    totals: Counter = Counter()
+    if since is not None:
+        since = _utc_naive(since)
+        boundary = since.replace(minute=0, second=0, microsecond=0)
+        if boundary < since:
+            boundary += timedelta(hours=1)
+            raw = (
+                select(*raw_keys, func.count(DiscordMessage.id))
+                .where(and_(DiscordMessage.created_at >= since, DiscordMessage.created_at < boundary))
+            )
+            if where is not None:
+                raw = raw.where(where[1])
+            for *key, n in db.execute(raw.group_by(*raw_keys)).all():
+                totals[tuple(key)] += int(n)
+
+        day, hour = message_bucket(boundary)
+        stmt = stmt.where(or_(rollup.day > day, and_(rollup.day == day, rollup.hour >= hour)))
+
+    for *key, n in db.execute(stmt.group_by(*rollup_keys)).all():
+        totals[tuple(key)] += int(n or 0)
+    return totals
+
+
+def author_message_counts(db: Session, since: Optional[datetime] = None) -> Dict[str, int]:
+    """{lower(author_name): count} for messages at or after `since` (all time if None)."""
+    totals = _windowed(db, since, [DiscordAuthorDaily.author_key],
+                       [func.coalesce(func.lower(DiscordMessage.author_name), '')])
+    return {key[0]: n for key, n in totals.items()}
+
+
+def user_message_counts(db: Session, since: Optional[datetime] = None) -> Dict[int, int]:
+    """{user_id: count} for resolved authors."""
+    totals = _windowed(db, since, [DiscordAuthorDaily.user_id], [DiscordMessage.user_id],
+                       where=(DiscordAuthorDaily.user_id.isnot(None), DiscordMessage.user_id.isnot(None)))
+    return {key[0]: n for key, n in totals.items()}
+
+
+def daily_message_counts(db: Session, since: Optional[datetime] = None) -> Dict[str, int]:
+    """{'YYYY-MM-DD': count}"""
+    totals = _windowed(db, since, [DiscordAuthorDaily.day], [func.date(DiscordMessage.created_at)])
+    return {key[0]: n for key, n in totals.items()}
+
+
+def hourly_message_counts(db: Session, since: Optional[datetime] = None) -> Dict[Tuple[int, int], int]:
+    """{(day_of_week 0-6 with Sunday=0, hour 0-23): count}"""
+    totals = _windowed(
+        db, since,
+        [cast(func.strftime('%w', DiscordAuthorDaily.day), Integer), DiscordAuthorDaily.hour],
+        [cast(func.strftime('%w', DiscordMessage.created_at), Integer),
+         cast(func.strftime('%H', DiscordMessage.created_at), Integer)],
+    )
+    return {(key[0], key[1]): n for key, n in totals.items()}
@@ -3,6 +3,8 @@ import logging
 import sys
 import subprocess
 import os
+import time
+from datetime import datetime, timezone
 from logging.handlers import RotatingFileHandler
 from core.terminal import log_section, log_step, log_info, log_success, log_warning, log_error, console
 
@@ -26,12 +28,18 @@ try:
     
     # We delay logging config details to file only to keep terminal clean
     Config.log_config()
+
+    from core import telemetry
+    from core.metrics import REGISTRY
+    from core.observability import get_trace_id
+    from core.pipeline import Pipeline, PipelineState, Stage
+    from database.connector import SessionLocal
 except Exception as e:
     log_error(f"Configuration Critical Failure: {e}")
     sys.exit(1)
 
 def run_module(module_name: str, description: str) -> bool:
-    """Runs a module via `python -m <module>` and streams output."""
+    """Runs a module via `python -m <module>` and streams output (stages in PIPELINE_SUBPROCESS_STAGES)."""
     log_info(f"Starting: [bold]{description}[/bold]...")
     process = None
     try:
@@ -89,48 +97,141 @@ def run_module(module_name: str, description: str) -> bool:
         log_error(f"Failed to execute {description}: {e}")
         return False
 
-async def main():
+def build_stages():
+    """
+    The pipeline DAG. Dependencies come from inputs/outputs ("db" = the SQLite database);
+    inputs also decide when a stage can be skipped ("day" = reruns once the date changes).
+    """
+    async def harvest(ctx):
+        from scripts.harvest_sqlite import run_sqlite_harvest
+        return await run_sqlite_harvest()
+
+    def enrich(ctx):
+        from scripts.mcp_enrich import main as enrich_main
+        return enrich_main()
+
+    def report(ctx):
+        from scripts.report_sqlite import run_report_sync
+        return run_report_sync(context=ctx.analytics)
+
+    def export(ctx):
+        from scripts.export_sqlite import run_export
+        return run_export(context=ctx.analytics)
+
+    def publish(ctx):
+        from scripts.publish_docs import publish_to_docs
+        return publish_to_docs()
+
+    def csv(ctx):
+        from scripts.export_csv import export_csv_report
+        return export_csv_report()
+
+    return [
+        Stage("harvest", "Harvesting Data from Wise Old Man & Discord", harvest,
+              module='scripts.harvest_sqlite', outputs=("db",), critical=True),
+        Stage("enrich", "Enriching Data with AI (Gemini)", enrich, module='scripts.mcp_enrich',
+              inputs=("db",), outputs=("data/ai_insights.json", "docs/ai_data.js"), critical=True),
+        Stage("report", "Generating Excel Report (SQLite source)", report, module='scripts.report_sqlite',
+              inputs=("db", "day"), outputs=(Config.OUTPUT_FILE_XLSX,)),
+        Stage("export", "Exporting JSON Data for Web Dashboard", export, module='scripts.export_sqlite',
+              inputs=("db", "day", "data/ai_insights.json"), outputs=("clan_data.json", "clan_data.js")),
+        Stage("publish", "Deploying Dashboard to /docs", publish, module='scripts.publish_docs',
+              inputs=("clan_data.json", "clan_data.js", "clan_dashboard.html", "dashboard_logic.js", "assets"),
+              outputs=("docs/index.html", "docs/clan_data.json", "docs/clan_data.js", "docs/dashboard_logic.js")),
+        Stage("csv", "Generating CSV Dump", csv, module='scripts.export_csv',
+              inputs=("db", "day"), outputs=("clan_data.csv",)),
+    ]
+
+
+def record_telemetry(results, started_at, wall_s):
+    """Write the run report next to app.log, append it to pipeline_runs and print per-stage timings."""
+    report = telemetry.run_report(results, started_at, wall_s, trace_id=get_trace_id())
+    try:
+        telemetry.write_run_report(report, Config.PIPELINE_RUN_REPORT)
+    except OSError as e:
+        log_warning(f"Could not write {Config.PIPELINE_RUN_REPORT}: {e}")
+
+    previous = {}
+    db = SessionLocal()
+    try:
+        previous = telemetry.previous_wall_times(db, [s["name"] for s in report["stages"]])
+        telemetry.save_run_history(db, report)
+    except Exception as e:
+        db.rollback()
+        log_warning(f"Run history not saved (run `alembic upgrade head`?): {e}")
+    finally:
+        db.close()
+
+    console.print()
+    for stage in report["stages"]:
+        if stage["status"] not in ("ok", "failed"):
+            continue
+        line = (f"{stage['name']:<8} {stage['wall_s']:>7.1f}s wall {stage.get('cpu_s', 0):>7.1f}s cpu  "
+                f"rows r/w {stage.get('rows_read', 0):,}/{stage.get('rows_written', 0):,}")
+        if stage.get("http_requests"):
+            line += f"  http {stage['http_requests']} ({stage.get('http_429', 0)} x 429)"
+        if stage["name"] in previous and previous[stage["name"]] > 0:
+            line += f"  ({stage['wall_s'] / previous[stage['name']] - 1:+.0%} vs recent runs)"
+        log_info(line)
+    log_info(f"Run report: {Config.PIPELINE_RUN_REPORT} ({report['wall_s']:.1f}s, "
+             f"peak RSS {report['peak_rss_mb'] or '?'} MB)")
+
+
+async def main(force: bool = False):
     log_section("CLAN ACTIVITY REPORT PIPELINE", "Automated Data Harvest & Analytics Engine")
-    
-    # Step 1: Harvest
-    log_step(1, 5, "DATA HARVEST")
-    # Using descriptive name for the task
-    if not run_module('scripts.harvest_sqlite', "Harvesting Data from Wise Old Man & Discord"):
-        log_error("Harvest stage failed. Stopping pipeline to prevent partial data report.")
-        return sys.exit(1)
 
-    # Step 2: AI Enrichment
-    log_step(2, 5, "AI ENRICHMENT")
-    if not run_module('scripts.mcp_enrich', "Enriching Data with AI (Gemini)"):
-        log_error("AI Enrichment failed. Stopping pipeline.")
-        return sys.exit(1)
+    stages = build_stages()
+    state = PipelineState(Config.PIPELINE_STATE_FILE) if Config.PIPELINE_INCREMENTAL else None
+    pipeline = Pipeline(stages, max_workers=Config.PIPELINE_MAX_WORKERS,
+                        run_isolated=run_module, isolate=Config.PIPELINE_SUBPROCESS_STAGES,
+                        state=state, force=force)
+    total = len(stages)
+    order = {s.name: i for i, s in enumerate(stages, 1)}
 
-    # Step 3: Report
-    log_step(3, 5, "REPORT GENERATION")
-    if not run_module('scripts.report_sqlite', "Generating Excel Report (SQLite source)"):
-        log_error("Excel Report generation failed.")
-    
-    # Step 4: Analytics & Export
-    log_step(4, 5, "DASHBOARD EXPORT")
-    if not run_module('scripts.export_sqlite', "Exporting JSON Data for Web Dashboard"):
-        log_error("Dashboard data export failed.")
+    def on_start(stage):
+        log_step(order[stage.name], total, stage.description.upper())
+
+    def on_finish(stage, result):
+        if result.status == "ok":
+            log_success(f"{stage.description} completed in {result.seconds:.1f}s.")
+        elif result.status == "cached":
+            log_info(f"{stage.description}: inputs unchanged, skipped (cached).")
+        elif result.status == "skipped":
+            log_warning(f"{stage.description} skipped ({result.error}).")
+        else:
+            log_error(f"{stage.description} failed: {result.error}")
 
-    # Step 4b: Deploy Docs
-    if not run_module('scripts.publish_docs', "Deploying Dashboard to /docs"):
-        log_error("Docs deployment failed.")
+    started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    results = await pipeline.run(on_start=on_start, on_finish=on_finish)
+    if Config.PIPELINE_TELEMETRY:
+        record_telemetry(results, started_at, time.perf_counter() - started)
+    if Config.METRICS_EXPORT_PATH:
+        try:
+            REGISTRY.export(Config.METRICS_EXPORT_PATH)
+        except OSError as e:
+            log_warning(f"Could not write {Config.METRICS_EXPORT_PATH}: {e}")
 
-    # Step 5: CSV Export
-    log_step(5, 5, "LEGACY EXPORT")
-    run_module('scripts.export_csv', "Generating CSV Dump")
+    failed = [name for name, r in results.items() if r.status == "failed"]
+    if any(pipeline.stages[name].critical for name in failed):
+        log_error("Critical stage failed. Stopping pipeline to prevent partial data report.")
+        return sys.exit(1)
 
     # Final Summary
     console.print()
-    log_success("[bold]Pipeline Execution Successful.[/bold] All systems go.")
+    if failed:
+        log_warning(f"Pipeline finished with failed stages: {', '.join(failed)}")
+    else:
+        log_success("[bold]Pipeline Execution Successful.[/bold] All systems go.")
     console.print()
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the clan activity pipeline.")
+    parser.add_argument("--force", action="store_true", help="Run every stage even if its inputs are unchanged")
+    args = parser.parse_args()
     try:
-        asyncio.run(main())
+        asyncio.run(main(force=args.force))
     except KeyboardInterrupt:
         print()
         log_warning("Pipeline stopped by user action.")
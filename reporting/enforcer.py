@@ -15,7 +15,8 @@ from core.config import Config
 from core.roles import RoleAuthority, ClanRole
 from services.factory import ServiceFactory
 from database.connector import SessionLocal
-from database.models import WOMSnapshot, DiscordMessage
+from database.rollups import author_message_counts
+from database.models import WOMSnapshot
 
 # Logging
 logging.basicConfig(level=logging.ERROR, format='%(message)s')
@@ -26,13 +27,7 @@ async def get_discord_counts(days: int):
     db = SessionLocal()
     cutoff = datetime.now(timezone.utc) - timedelta(days=days)
     try:
-        stmt = (
-            select(DiscordMessage.author_name, func.count(DiscordMessage.id))
-            .where(DiscordMessage.created_at >= cutoff)
-            .group_by(DiscordMessage.author_name)
-        )
-        results = db.execute(stmt).all()
-        return {r[0].lower(): r[1] for r in results if r[0]}
+        return {name: count for name, count in author_message_counts(db, cutoff).items() if name}
     finally:
         db.close()
 
@@ -6,7 +6,6 @@ import xlsxwriter
 import shutil
 from datetime import datetime, timedelta, timezone
 from core.config import Config
-from core.timestamps import TimestampHelper
 from core.utils import get_unique_filename
 from core.performance import timed_operation
 
@@ -18,19 +17,17 @@ class ExcelReporter:
     @timed_operation("Excel Report Generation")
     def generate(self, analytics_service, metadata=None):
         if not analytics_service:
-            from database.connector import SessionLocal
+            from database.connector import ReadOnlySession
             from core.analytics import AnalyticsService
-            db = SessionLocal()
+            db = ReadOnlySession()
             try:
                 analytics_service = AnalyticsService(db)
             finally:
                 db.close()
 
         # 1. Fetch Data
-        cutoff_7d = TimestampHelper.cutoff_days_ago(7)
-        cutoff_30d = TimestampHelper.cutoff_days_ago(30)
-        cutoff_90d = TimestampHelper.cutoff_days_ago(90)
-        cutoff_365d = TimestampHelper.cutoff_days_ago(365)
+        # Cutoffs from the shared run clock, so datasets memoized by the export/charts are reused
+        cutoff_7d, cutoff_30d, cutoff_90d, cutoff_365d = (analytics_service.context.cutoff(d) for d in (7, 30, 90, 365))
         cutoff_lifetime = datetime(2020, 1, 1, tzinfo=timezone.utc)
 
         latest_snaps_raw = analytics_service.get_latest_snapshots()
@@ -44,10 +41,11 @@ class ExcelReporter:
 
         min_timestamps = analytics_service.get_min_timestamps() # Fallback for lifetime gains
         
-        past_7d = analytics_service.get_snapshots_at_cutoff(cutoff_7d)
-        past_30d = analytics_service.get_snapshots_at_cutoff(cutoff_30d)
-        past_90d = analytics_service.get_snapshots_at_cutoff(cutoff_90d)
-        past_365d = analytics_service.get_snapshots_at_cutoff(cutoff_365d)
+        baselines = analytics_service.get_snapshots_at_cutoffs([cutoff_7d, cutoff_30d, cutoff_90d, cutoff_365d])
+        past_7d = baselines[cutoff_7d]
+        past_30d = baselines[cutoff_30d]
+        past_90d = baselines[cutoff_90d]
+        past_365d = baselines[cutoff_365d]
 
         msgs_7d = analytics_service.get_message_counts(cutoff_7d)
         msgs_30d = analytics_service.get_message_counts(cutoff_30d)
@@ -14,7 +14,8 @@ from core.config import Config
 from core.roles import RoleAuthority, ClanRole
 from services.factory import ServiceFactory
 from database.connector import SessionLocal
-from database.models import WOMSnapshot, DiscordMessage
+from database.rollups import author_message_counts
+from database.models import WOMSnapshot
 
 # Logging Setup
 logging.basicConfig(level=logging.INFO, format='%(message)s')
@@ -26,16 +27,15 @@ async def get_discord_counts(days: int):
     cutoff = datetime.now(timezone.utc) - timedelta(days=days)
     
     try:
-        stmt = (
-            select(DiscordMessage.author_name, func.count(DiscordMessage.id))
-            .where(DiscordMessage.created_at >= cutoff)
-            .group_by(DiscordMessage.author_name)
-        )
-        results = db.execute(stmt).all()
         from core.usernames import UsernameNormalizer
         # Normalize keys for lookup
         # Note: author_name from Discord might need normalization
-        return {UsernameNormalizer.normalize(r[0]): r[1] for r in results if r[0]}
+        counts = {}
+        for name, count in author_message_counts(db, cutoff).items():
+            if name:
+                norm = UsernameNormalizer.normalize(name)
+                counts[norm] = counts.get(norm, 0) + count
+        return counts
     finally:
         db.close()
 
@@ -6,7 +6,6 @@ import os
 sys.path.append(os.getcwd())
 
 import sqlite3
-import json
 import logging
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Tuple
@@ -14,7 +13,8 @@ from typing import Dict, List, Tuple
 from core.config import Config
 from core.roles import RoleAuthority, ClanRole
 from services.factory import ServiceFactory
-from database.connector import SessionLocal
+from database.connector import ReadOnlySession, connect
+from database.rollups import author_message_counts
 from database.models import WOMSnapshot
 
 # Configure Logging
@@ -37,7 +37,7 @@ async def get_role_map(group_id) -> Dict[str, str]:
 
 def get_recent_metrics(days=7) -> Dict[str, Dict]:
     """Calculates XP gains and gets latest boss kills from DB."""
-    conn = sqlite3.connect(Config.DB_FILE)
+    conn = connect(read_only=True)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
@@ -48,25 +48,25 @@ def get_recent_metrics(days=7) -> Dict[str, Dict]:
     
     # 1. Get Messages (30d)
     logger.info("Analyzing Discord activity...")
-    cursor.execute("""
-        SELECT lower(author_name) as name, count(*) as count 
-        FROM discord_messages 
-        WHERE created_at >= ? 
-        GROUP BY lower(author_name)
-    """, (cutoff_30d.isoformat(),))
-    msg_map_30d = {row['name']: row['count'] for row in cursor.fetchall()}
+    with ReadOnlySession() as db:
+        msg_map_30d = author_message_counts(db, cutoff_30d)
     
     # 2. Get Snapshots (Latest & 7d ago)
     logger.info("Analyzing XP and Boss data...")
-    # Fetch latest snapshot for every user
+    # Fetch latest snapshot for every user, with raid KCs summed from boss_snapshots
     cursor.execute("""
-        SELECT username, total_xp, raw_data 
-        FROM wom_snapshots 
-        WHERE (username, timestamp) IN (
+        SELECT ws.username, ws.total_xp,
+               COALESCE(SUM(MAX(bs.kills, 0)), 0) AS total_raids
+        FROM wom_snapshots ws
+        LEFT JOIN boss_snapshots bs
+            ON bs.snapshot_id = COALESCE(ws.ref_snapshot_id, ws.id)
+            AND bs.boss_name IN ('chambers_of_xeric', 'theatre_of_blood', 'tombs_of_amascut')
+        WHERE (ws.username, ws.timestamp) IN (
             SELECT username, MAX(timestamp) 
             FROM wom_snapshots 
             GROUP BY username
         )
+        GROUP BY ws.id
     """)
     latest_snaps = cursor.fetchall()
     
@@ -90,26 +90,8 @@ def get_recent_metrics(days=7) -> Dict[str, Dict]:
         # Calculate Gain
         xp_gain_7d = cur_xp - past_xp if past_xp > 0 else 0 
         
-        # Parse Bosses (CoX, ToB, ToA)
-        try:
-            data = json.loads(row['raw_data'])
-            # Handle different JSON structures depending on endpoint source (group vs player)
-            # data structure from harvest is usually player details
-            api_data = data.get('data', data) # fallback
-            bosses = api_data.get('bosses', {})
-            
-            cox = bosses.get('chambers_of_xeric', {}).get('kills', 0)
-            tob = bosses.get('theatre_of_blood', {}).get('kills', 0)
-            toa = bosses.get('tombs_of_amascut', {}).get('kills', 0)
-            
-            # Handle -1 (unranked)
-            cox = max(0, cox)
-            tob = max(0, tob)
-            toa = max(0, toa)
-            
-            total_raids = cox + tob + toa
-        except Exception:
-            total_raids = 0
+        # CoX + ToB + ToA (unranked -1 treated as 0)
+        total_raids = row['total_raids']
             
         metrics[user] = {
             'xp_gain_7d': xp_gain_7d,
@@ -61,7 +61,7 @@ def generate_pulse_headlines(conn):
         cursor = conn.execute("""
             SELECT bs.boss_name, ROUND(AVG(bs.kills), 1) as avg_kills, COUNT(DISTINCT ws.username) as clan_members
             FROM boss_snapshots bs
-            JOIN wom_snapshots ws ON bs.snapshot_id = ws.id
+            JOIN wom_snapshots ws ON bs.snapshot_id = COALESCE(ws.ref_snapshot_id, ws.id)
             WHERE ws.username IN (SELECT username FROM clan_members)
             AND ws.timestamp >= datetime('now', '-7 days')
             AND bs.kills > 0
@@ -184,7 +184,7 @@ def generate_strategic_alerts(conn):
                         ROUND(AVG(bs.kills), 1) as avg_kills_per_player,
                         MAX(bs.kills) as top_player_kills
                     FROM boss_snapshots bs
-                    JOIN wom_snapshots ws ON bs.snapshot_id = ws.id
+                    JOIN wom_snapshots ws ON bs.snapshot_id = COALESCE(ws.ref_snapshot_id, ws.id)
                     WHERE ws.username IN (SELECT username FROM clan_members)
                     AND (boss_name LIKE '%chambers%' OR boss_name LIKE '%tombs%' OR boss_name LIKE '%theatre_of_blood%')
                     AND bs.kills > 0
@@ -278,7 +278,7 @@ def generate_ai_insights(conn):
                     SUM(bs.kills) as total_kills,
                     COUNT(DISTINCT ws.username) as active_raiders
                 FROM boss_snapshots bs
-                JOIN wom_snapshots ws ON bs.snapshot_id = ws.id
+                JOIN wom_snapshots ws ON bs.snapshot_id = COALESCE(ws.ref_snapshot_id, ws.id)
                 WHERE ws.timestamp >= datetime('now', '-7 days')
                 AND bs.kills > 0
                 GROUP BY bs.boss_name
@@ -454,7 +454,7 @@ def generate_ai_insights(conn):
                         ROUND(AVG(bs.kills), 1) as avg_kills_per_player,
                         MAX(bs.kills) as top_player_kills
                     FROM boss_snapshots bs
-                    JOIN wom_snapshots ws ON bs.snapshot_id = ws.id
+                    JOIN wom_snapshots ws ON bs.snapshot_id = COALESCE(ws.ref_snapshot_id, ws.id)
                     WHERE ws.username IN (SELECT username FROM clan_members)
                     AND (boss_name LIKE '%chambers%' OR boss_name LIKE '%tombs%' OR boss_name LIKE '%theatre_of_blood%')
                     AND bs.kills > 0
@@ -0,0 +1,33 @@
+"""
+Backfill skill_snapshots / activity_snapshots from wom_snapshots.raw_data.
+
+New snapshots get their skill rows at ingest (services/snapshot_ingestion.py);
+this fills in history that was harvested before the tables existed. Safe to
+re-run: snapshots that already have rows are skipped.
+
+Usage:
+    python -m scripts.backfill_skill_snapshots [--batch-size 500]
+"""
+import argparse
+import logging
+
+from database.connector import SessionLocal, init_db
+from services.snapshot_ingestion import backfill_skill_snapshots
+
+logger = logging.getLogger("BackfillSkills")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract skills/activities from raw_data into typed tables")
+    parser.add_argument("--batch-size", type=int, default=500, help="Snapshots parsed per commit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    init_db()
+    with SessionLocal() as db:
+        count = backfill_skill_snapshots(db, batch_size=args.batch_size)
+    logger.info(f"Backfilled {count} snapshots.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Convert wom_snapshots.raw_data between JSON text and compressed BLOBs.
+
+Prints a size/throughput report before and after every change.
+
+Usage:
+    python -m scripts.compress_raw_data --report
+    python -m scripts.compress_raw_data --train --compress   # new dictionary, then compress all rows
+    python -m scripts.compress_raw_data --decompress         # back to plain JSON text
+
+After compressing, run VACUUM (scripts/optimize_database.py) to return freed pages
+to the filesystem. Set RAW_DATA_COMPRESSION=zlib so new snapshots are stored compressed.
+"""
+import argparse
+import logging
+
+from database.connector import SessionLocal, init_db
+from database.raw_payload import (
+    compress_existing,
+    decompress_existing,
+    format_report,
+    storage_report,
+    store_dictionary,
+)
+
+logger = logging.getLogger("CompressRawData")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compressed raw_data storage")
+    parser.add_argument("--report", action="store_true", help="Show raw_data size and codec throughput")
+    parser.add_argument("--train", action="store_true", help="Train and store a new dictionary from recent payloads")
+    parser.add_argument("--compress", action="store_true", help="Compress all plain-text rows")
+    parser.add_argument("--decompress", action="store_true", help="Rewrite compressed rows as JSON text")
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows rewritten per commit")
+    args = parser.parse_args()
+
+    if not any([args.report, args.train, args.compress, args.decompress]):
+        parser.print_help()
+        return
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    init_db()
+    with SessionLocal() as db:
+        logger.info(f"Before: {format_report(storage_report(db))}")
+        if args.train:
+            logger.info(f"Stored dictionary {store_dictionary(db)}")
+        if args.compress:
+            logger.info(f"Compressed {compress_existing(db, args.batch_size):,} rows")
+        if args.decompress:
+            logger.info(f"Decompressed {decompress_existing(db, args.batch_size):,} rows")
+        if args.train or args.compress or args.decompress:
+            logger.info(f"After:  {format_report(storage_report(db))}")
+
+
+if __name__ == "__main__":
+    main()
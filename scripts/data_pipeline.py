@@ -56,7 +56,7 @@ class ClanDataPipeline:
                 AVG(CASE WHEN bs.rank > 0 THEN bs.rank END) as avg_rank,
                 MIN(CASE WHEN bs.rank > 0 THEN bs.rank END) as best_rank
             FROM boss_snapshots bs
-            JOIN wom_snapshots ws ON bs.snapshot_id = ws.id
+            JOIN wom_snapshots ws ON bs.snapshot_id = COALESCE(ws.ref_snapshot_id, ws.id)
             WHERE ws.username IN (SELECT username FROM clan_members)
             GROUP BY bs.boss_name
             ORDER BY clan_members DESC
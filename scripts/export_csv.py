@@ -10,7 +10,7 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.config import Config
 from data.queries import Queries
-from database.connector import SessionLocal
+from database.connector import ReadOnlySession
 from services.user_access_service import UserAccessService
 
 # Setup Logging
@@ -29,7 +29,7 @@ def export_csv_report():
             return False
 
         # Use UserAccessService for optimized member data retrieval
-        session = SessionLocal()
+        session = ReadOnlySession()
         user_service = UserAccessService(session)
         
         # Get all active members with comprehensive stats
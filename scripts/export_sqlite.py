@@ -1,11 +1,11 @@
 import sys
 import os
 import json
-import sqlite3
 import datetime
 import logging
 import shutil
 from datetime import timezone, timedelta
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -14,10 +14,11 @@ sys.path.append(os.getcwd())
 from core.config import Config
 from core.usernames import UsernameNormalizer
 from core.assets import BOSS_ASSET_MAP, DEFAULT_BOSS_IMAGE
-from core.analytics import AnalyticsService
+from core.analytics import AnalyticsService, AnalyticsSnapshot
 from data.queries import Queries
 from core.ai_concepts import AIInsightGenerator
 from core.asset_manager import AssetManager, AssetContext
+from database.connector import connect
 
 OUTPUT_FILE = "clan_data.json"
 
@@ -137,9 +138,10 @@ def validate_output_data(payload: dict) -> None:
         raise ValueError("activity_heatmap is empty; heatmap cannot render")
 
 def get_db_connection():
-    return sqlite3.connect(Config.DB_FILE)
+    return connect(read_only=True)
 
-def run_export():
+def run_export(context: Optional[AnalyticsSnapshot] = None):
+    """Build the dashboard JSON. Pass a shared AnalyticsSnapshot to reuse datasets computed earlier in the run."""
     logger.info("Starting Web Dashboard Export...")
     
     # Initialize Core Services
@@ -147,8 +149,8 @@ def run_export():
     
     # We need a Session for AnalyticsService
     from database.connector import get_db
-    db_session = next(get_db())
-    analytics = AnalyticsService(db_session)
+    db_session = next(get_db(read_only=True))
+    analytics = AnalyticsService(db_session, context=context)
     
     try:
         cursor = conn.cursor()
@@ -168,10 +170,11 @@ def run_export():
         
         # 1. Snapshots
         latest_snaps = analytics.get_latest_snapshots()
-        latest_snaps = analytics.get_latest_snapshots()
-        past_7d_snaps = analytics.get_snapshots_at_cutoff(datetime.datetime.now(timezone.utc) - timedelta(days=7))
-        past_30d_snaps = analytics.get_snapshots_at_cutoff(datetime.datetime.now(timezone.utc) - timedelta(days=30))
-        past_year_snaps = analytics.get_snapshots_at_cutoff(datetime.datetime.now(timezone.utc) - timedelta(days=365)) # FIX: Load Year Data
+        cutoff_7d, cutoff_30d, cutoff_year = (analytics.context.cutoff(d) for d in (7, 30, 365))
+        baselines = analytics.get_snapshots_at_cutoffs([cutoff_7d, cutoff_30d, cutoff_year])
+        past_7d_snaps = baselines[cutoff_7d]
+        past_30d_snaps = baselines[cutoff_30d]
+        past_year_snaps = baselines[cutoff_year] # FIX: Load Year Data
         
         logger.info(f"Data Points: {len(latest_snaps)} recent snapshots loaded.")
         
@@ -181,9 +184,12 @@ def run_export():
         old_ids_30 = [s.id for s in past_30d_snaps.values()]
         
         logger.info("Analysing Boss Kills...")
-        latest_boss_data = analytics.get_boss_data(latest_ids)
-        old_boss_data = analytics.get_boss_data(old_ids) # 7d
-        old_boss_data_30 = analytics.get_boss_data(old_ids_30)
+        boss_matrix = analytics.boss_matrix(latest_ids + old_ids + old_ids_30)
+        # Favourites for every member at once: all-time = max kills, monthly = max 30d gain
+        fav_all_time = boss_matrix.favourites(latest_ids)
+        users_30d = [u for u in latest_snaps if u in past_30d_snaps]
+        fav_30d = boss_matrix.favourites([latest_snaps[u].id for u in users_30d],
+                                         [past_30d_snaps[u].id for u in users_30d])
         
         # 3. Discord Stats
         logger.info("Compiling Discord activity stats...")
@@ -191,8 +197,6 @@ def run_export():
         msg_stats_7d = analytics.get_discord_stats_simple(days=7)
         msg_stats_30d = analytics.get_discord_stats_simple(days=30)
         
-        msg_stats_30d = analytics.get_discord_stats_simple(days=30)
-        
         logger.info("Generating secondary charts (Heatmaps, Trends, Diversity)...")
         activity_heatmap = analytics.get_activity_heatmap_simple(days=30)
         clan_history = analytics.get_clan_trend(days=30)
@@ -246,7 +250,6 @@ def run_export():
             # Convert Query Result to dict-like access if needed or use object props
             # The Service returns ORM objects, so we access attributes normally.
             
-            curr_bosses = latest_boss_data.get(curr.id, {})
 
         
             # 7d Gains (with Safe Fallback)
@@ -308,54 +311,37 @@ def run_export():
             fav_boss_all_time_img = "boss_pet_rock.png"
 
             # --- All-Time Favorite (Max Total Kills) ---
-            if curr_bosses:
-                valid_bosses = {k: v for k, v in curr_bosses.items() if v > 0}
-                if valid_bosses:
-                    best_all_time = max(valid_bosses, key=valid_bosses.get)
-                    fav_boss_all_time_name = best_all_time.replace('_', ' ').title()
-                    
-                    # Dynamic Image Lookup (Safe Map)
-                    img_name = BOSS_ASSET_MAP.get(best_all_time, DEFAULT_BOSS_IMAGE)
-                    
-                    # Check file existence to be double-sure
-                    img_path = os.path.join("assets", img_name)
-                    
-                    if os.path.exists(img_path):
-                        fav_boss_all_time_img = img_name
-                    else:
-                        # Fallback if map entry exists but file does not
-                        fav_boss_all_time_img = DEFAULT_BOSS_IMAGE
-                        if 'missing_assets' not in locals(): missing_assets = set()
-                        missing_assets.add(img_name)
+            if curr.id in fav_all_time:
+                best_all_time, _ = fav_all_time[curr.id]
+                fav_boss_all_time_name = best_all_time.replace('_', ' ').title()
+                
+                # Dynamic Image Lookup (Safe Map)
+                img_name = BOSS_ASSET_MAP.get(best_all_time, DEFAULT_BOSS_IMAGE)
+                
+                # Check file existence to be double-sure
+                img_path = os.path.join("assets", img_name)
+                
+                if os.path.exists(img_path):
+                    fav_boss_all_time_img = img_name
+                else:
+                    # Fallback if map entry exists but file does not
+                    fav_boss_all_time_img = DEFAULT_BOSS_IMAGE
+                    missing_assets.add(img_name)
 
             # --- Monthly Favorite (Max 30d Delta) ---
-            if u_clean in past_30d_snaps:
-                old_30 = past_30d_snaps[u_clean]
-                old_bosses_30 = old_boss_data_30.get(old_30.id, {})
+            if curr.id in fav_30d:
+                best_boss_30, _ = fav_30d[curr.id]
+                fav_boss_name = best_boss_30.replace('_', ' ').title()
                 
-                max_delta_30 = -1
-                best_boss_30 = None
+                # Dynamic Image Lookup (Safe Map)
+                img_name = BOSS_ASSET_MAP.get(best_boss_30, DEFAULT_BOSS_IMAGE)
+                img_path = os.path.join("assets", img_name)
                 
-                for b_name, k in curr_bosses.items():
-                    prev = old_bosses_30.get(b_name, 0)
-                    delta = k - prev
-                    if delta > max_delta_30:
-                        max_delta_30 = delta
-                        best_boss_30 = b_name
-                
-                if max_delta_30 > 0:
-                    fav_boss_name = best_boss_30.replace('_', ' ').title()
-                    
-                    # Dynamic Image Lookup (Safe Map)
-                    img_name = BOSS_ASSET_MAP.get(best_boss_30, DEFAULT_BOSS_IMAGE)
-                    img_path = os.path.join("assets", img_name)
-                    
-                    if os.path.exists(img_path):
-                        fav_boss_img = img_name
-                    else:
-                        fav_boss_img = DEFAULT_BOSS_IMAGE 
-                        if 'missing_assets' not in locals(): missing_assets = set()
-                        missing_assets.add(img_name)
+                if os.path.exists(img_path):
+                    fav_boss_img = img_name
+                else:
+                    fav_boss_img = DEFAULT_BOSS_IMAGE 
+                    missing_assets.add(img_name)
             
             # 30d Gains
             # Baseline: Try strict 30d ago. If not found, use Earliest Known Snapshot (if different from current).
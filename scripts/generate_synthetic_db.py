@@ -0,0 +1,376 @@
+"""
+Deterministic synthetic clan database for benchmarks.
+
+Builds a fresh SQLite file with the real schema and fills it through the same
+write paths as the harvest (SnapshotIngestor for WOM histories, the Discord
+rollup rebuild for messages), so every analytics path has data at a known,
+reproducible scale:
+
+- N clan members with roles, join dates and name aliases (some renamed; their
+  older messages use the previous name)
+- M WOM snapshots per member with full-shape payloads (24 skills, 67 bosses with
+  ~64 ranked, activities, computed), progressing over time; idle stretches repeat the
+  previous payload so snapshot dedup is exercised as in production
+- K Discord messages across a few channels, authors drawn from a Zipf
+  distribution (a handful of members write most messages; some authors are
+  guests that resolve to no member)
+
+The same seed and anchor date produce identical data. Timestamps are laid out
+backwards from the anchor (default: today 00:00 UTC), so windowed reports
+(7/30/90 days) always have data.
+
+Usage:
+    python -m scripts.generate_synthetic_db --profile small --out bench.db
+    python -m scripts.generate_synthetic_db --members 500 --snapshots 60 --messages 1000000 --out x10.db
+"""
+import argparse
+import bisect
+import logging
+import os
+import random
+import time
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from core.usernames import UsernameNormalizer
+from database.connector import connect
+from database.models import Base, ClanMember, DiscordChannelCheckpoint, PlayerNameAlias, WOMSnapshot
+from database.rollups import rebuild_author_daily
+from services.snapshot_ingestion import UNIQUE_SNAPSHOT_INDEX, SnapshotIngestor
+
+logger = logging.getLogger("SyntheticDB")
+
+
+@dataclass(frozen=True)
+class SyntheticProfile:
+    members: int
+    snapshots_per_member: int
+    messages: int
+    days: int = 365  # history length
+    alias_fraction: float = 0.15  # members with a previous name
+    guest_author_fraction: float = 0.1  # message authors that are not members
+    idle_fraction: float = 0.25  # snapshot intervals with no progress (stored as references)
+    zipf_exponent: float = 1.1
+
+
+# "medium" and "large" are roughly 10x and 100x the live clan
+PROFILES: Dict[str, SyntheticProfile] = {
+    "tiny": SyntheticProfile(members=20, snapshots_per_member=8, messages=2_000, days=120),
+    "small": SyntheticProfile(members=100, snapshots_per_member=30, messages=10_000),
+    "medium": SyntheticProfile(members=500, snapshots_per_member=60, messages=1_000_000),
+    "large": SyntheticProfile(members=5_000, snapshots_per_member=90, messages=10_000_000),
+}
+
+SKILLS = [
+    "attack", "defence", "strength", "hitpoints", "ranged", "prayer", "magic", "cooking",
+    "woodcutting", "fletching", "fishing", "firemaking", "crafting", "smithing", "mining",
+    "herblore", "agility", "thieving", "slayer", "farming", "runecrafting", "hunter",
+    "construction", "sailing",
+]
+BOSSES = [
+    "abyssal_sire", "alchemical_hydra", "amoxliatl", "araxxor", "artio", "barrows_chests",
+    "bryophyta", "callisto", "calvarion", "cerberus", "chambers_of_xeric",
+    "chambers_of_xeric_challenge_mode", "chaos_elemental", "chaos_fanatic", "commander_zilyana",
+    "corporeal_beast", "crazy_archaeologist", "dagannoth_prime", "dagannoth_rex",
+    "dagannoth_supreme", "deranged_archaeologist", "duke_sucellus", "general_graardor",
+    "giant_mole", "grotesque_guardians", "hespori", "kalphite_queen", "king_black_dragon",
+    "kraken", "kreearra", "kril_tsutsaroth", "lunar_chests", "mimic", "nex", "nightmare",
+    "phosanis_nightmare", "obor", "phantom_muspah", "sarachnis", "scorpia", "scurrius",
+    "skotizo", "sol_heredit", "spindel", "tempoross", "the_gauntlet", "the_corrupted_gauntlet",
+    "the_hueycoatl", "the_leviathan", "the_royal_titans", "the_whisperer", "theatre_of_blood",
+    "theatre_of_blood_hard_mode", "thermonuclear_smoke_devil", "tombs_of_amascut",
+    "tombs_of_amascut_expert", "tzkal_zuk", "tztok_jad", "vardorvis", "venenatis", "vetion",
+    "vorkath", "wintertodt", "yama", "zalcano", "zulrah", "doom_of_mokhaiotl",
+]
+ACTIVITIES = [
+    "league_points", "bounty_hunter_hunter", "bounty_hunter_rogue", "clue_scrolls_all",
+    "clue_scrolls_beginner", "clue_scrolls_easy", "clue_scrolls_medium", "clue_scrolls_hard",
+    "clue_scrolls_elite", "clue_scrolls_master", "last_man_standing", "pvp_arena",
+    "soul_wars_zeal", "guardians_of_the_rift", "colosseum_glory", "collections_logged",
+]
+ROLES = [("member", 60), ("prospector", 15), ("onyx", 8), ("administrator", 5), ("dragonstone", 4),
+         ("zenyte", 3), ("saviour", 2), ("guest", 2), ("deputy_owner", 1)]
+CHANNELS = [(9001, "general"), (9002, "bossing"), (9003, "drops")]
+GUILD_ID, GUILD_NAME = 8000, "Synthetic Clan"
+SYLLABLES = ["ka", "zu", "ri", "mo", "th", "ar", "el", "vor", "dax", "lin", "gro", "sha", "pex", "tor",
+             "nim", "qua", "bel", "ryn", "osk", "wyn", "jad", "fal", "kor", "ith"]
+WORDS = ["gz", "nice", "drop", "raid", "anyone", "for", "cox", "tob", "toa", "mass", "world", "tonight",
+         "lol", "pet", "finally", "dry", "kc", "splits", "learner", "teach", "gear", "check", "ty",
+         "gl", "hf", "brb", "afk", "boss", "trip", "xp", "99", "max", "quest", "done", "clue"]
+
+# OSRS experience table: XP_TABLE[level - 1] is the XP needed for `level`
+XP_TABLE = [0]
+for _level in range(1, 99):
+    XP_TABLE.append(XP_TABLE[-1] + int(_level + 300 * 2 ** (_level / 7)) // 4)
+
+
+def level_for(xp: int) -> int:
+    return max(1, bisect.bisect_right(XP_TABLE, xp))
+
+
+def _display_names(rng: random.Random, count: int) -> List[str]:
+    """Unique RuneScape-style display names (<= 12 chars, mixed case, some spaces)."""
+    names, seen = [], set()
+    while len(names) < count:
+        base = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        suffix = str(rng.randint(1, 999)) if rng.random() < 0.5 else ""
+        name = (base + (" " if suffix and rng.random() < 0.4 else "") + suffix)[:12].strip()
+        key = UsernameNormalizer.normalize(name)
+        if key and key not in seen:
+            seen.add(key)
+            names.append(name)
+    return names
+
+
+class _PlayerModel:
+    """One member's account: starting stats and how fast each part of it grows."""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.pace = rng.lognormvariate(0, 1)  # overall activity multiplier
+        self.xp = {s: rng.randint(XP_TABLE[9], XP_TABLE[80]) for s in SKILLS}
+        if rng.random() < 0.3:
+            self.xp["hitpoints"] = max(self.xp["hitpoints"], XP_TABLE[69])
+        favourites = rng.sample(BOSSES, rng.randint(3, 12))
+        self.boss_rate = {b: rng.uniform(0.5, 6.0) if b in favourites else rng.uniform(0, 0.05) for b in BOSSES}
+        self.kills = {b: int(rng.expovariate(1 / 150)) if b in favourites else
+                      (rng.randint(0, 20) if rng.random() < 0.95 else -1) for b in BOSSES}
+        self.scores = {a: rng.randint(0, 400) if rng.random() < 0.6 else -1 for a in ACTIVITIES}
+
+    def advance(self, days: float) -> None:
+        rng = self.rng
+        for skill in SKILLS:
+            gain = int(rng.expovariate(1 / (20_000 * self.pace)) * days)
+            self.xp[skill] = min(self.xp[skill] + gain, 200_000_000)
+        for boss, rate in self.boss_rate.items():
+            gained = int(rng.expovariate(1 / (rate * self.pace)) * days) if rate > 0.1 else 0
+            if gained:
+                self.kills[boss] = max(self.kills[boss], 0) + gained
+        for activity in ACTIVITIES:
+            if self.scores[activity] >= 0 and rng.random() < 0.3:
+                self.scores[activity] += rng.randint(1, 5)
+
+    def payload(self, player_id: int, snapshot_id: int, ts: datetime) -> Dict:
+        rng = self.rng
+        overall = sum(self.xp.values())
+        skills = {"overall": {"metric": "overall", "experience": overall, "rank": rng.randint(1, 2_000_000),
+                              "level": sum(level_for(x) for x in self.xp.values())}}
+        for skill, xp in self.xp.items():
+            skills[skill] = {"metric": skill, "experience": xp, "rank": rng.randint(1, 2_000_000),
+                             "level": level_for(xp)}
+        bosses = {b: {"metric": b, "kills": k, "rank": rng.randint(1, 500_000) if k >= 0 else -1}
+                  for b, k in self.kills.items()}
+        activities = {a: {"metric": a, "score": s, "rank": rng.randint(1, 500_000) if s >= 0 else -1}
+                      for a, s in self.scores.items()}
+        total_kills = sum(k for k in self.kills.values() if k > 0)
+        return {
+            "id": snapshot_id,
+            "playerId": player_id,
+            "createdAt": ts.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "importedAt": None,
+            "data": {
+                "skills": skills,
+                "bosses": bosses,
+                "activities": activities,
+                "computed": {"ehp": {"metric": "ehp", "value": round(overall / 300_000, 2), "rank": 0},
+                             "ehb": {"metric": "ehb", "value": round(total_kills / 40, 2), "rank": 0}},
+            },
+        }
+
+
+def generate(db_file: str, profile: SyntheticProfile, seed: int = 1337,
+             anchor: Optional[datetime] = None, overwrite: bool = False) -> Dict[str, int]:
+    """Create `db_file` and fill it. Returns row counts per table."""
+    if os.path.exists(db_file):
+        if not overwrite:
+            raise FileExistsError(f"{db_file} exists; pass overwrite=True (--force) to replace it")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_file + suffix):
+                os.remove(db_file + suffix)
+
+    anchor = (anchor or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0))
+    anchor = anchor.astimezone(timezone.utc).replace(tzinfo=None)
+    start = anchor - timedelta(days=profile.days)
+    rng = random.Random(seed)
+
+    engine = create_engine("sqlite://", creator=lambda: connect(db_file=db_file))
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:  # as on a migrated database (dedup_snaps_002)
+        conn.execute(text(f"CREATE UNIQUE INDEX {UNIQUE_SNAPSHOT_INDEX} ON wom_snapshots (username, timestamp)"))
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        started = time.perf_counter()
+        members = _generate_members(db, rng, profile, start, anchor)
+        logger.info(f"Members: {len(members):,} ({time.perf_counter() - started:.1f}s)")
+
+        started = time.perf_counter()
+        stats = _generate_snapshots(db, rng, profile, members, start, anchor)
+        logger.info(f"Snapshots: {stats.summary()} ({time.perf_counter() - started:.1f}s)")
+
+        started = time.perf_counter()
+        _generate_messages(db, np.random.default_rng(seed), profile, members, start, anchor)
+        logger.info(f"Messages: {profile.messages:,} ({time.perf_counter() - started:.1f}s)")
+
+        counts = {
+            table.name: db.execute(select(func.count()).select_from(table)).scalar()
+            for table in Base.metadata.sorted_tables
+        }
+    finally:
+        db.close()
+        engine.dispose()
+    return counts
+
+
+def _generate_members(db: Session, rng: random.Random, profile: SyntheticProfile,
+                      start: datetime, anchor: datetime) -> List[Dict]:
+    names = _display_names(rng, profile.members * 2)
+    current, previous = names[:profile.members], names[profile.members:]
+    roles = [r for r, _ in ROLES]
+    weights = [w for _, w in ROLES]
+    span = (anchor - start).total_seconds()
+
+    members = []
+    for i, display in enumerate(current):
+        joined = start + timedelta(seconds=rng.random() * span * 0.8)
+        renamed = previous[i] if rng.random() < profile.alias_fraction else None
+        members.append({
+            "display": display,
+            "username": UsernameNormalizer.normalize(display),
+            "role": rng.choices(roles, weights)[0],
+            "joined_at": joined,
+            "previous": renamed,
+            "renamed_at": joined + (anchor - joined) * rng.uniform(0.2, 0.8) if renamed else None,
+        })
+
+    db.execute(ClanMember.__table__.insert(), [
+        {"username": m["username"], "role": m["role"], "joined_at": m["joined_at"], "last_updated": anchor}
+        for m in members
+    ])
+    ids = dict(db.execute(select(ClanMember.username, ClanMember.id)).all())
+    aliases = []
+    for m in members:
+        m["id"] = ids[m["username"]]
+        aliases.append({"member_id": m["id"], "normalized_name": m["username"], "canonical_name": m["display"],
+                        "source": "wom", "first_seen_at": m["renamed_at"] or m["joined_at"],
+                        "last_seen_at": anchor, "is_current": True})
+        if m["previous"]:
+            aliases.append({"member_id": m["id"], "normalized_name": UsernameNormalizer.normalize(m["previous"]),
+                            "canonical_name": m["previous"], "source": "wom", "first_seen_at": m["joined_at"],
+                            "last_seen_at": m["renamed_at"], "is_current": False})
+    db.execute(PlayerNameAlias.__table__.insert(), aliases)
+    db.commit()
+    return members
+
+
+def _generate_snapshots(db: Session, rng: random.Random, profile: SyntheticProfile,
+                        members: List[Dict], start: datetime, anchor: datetime):
+    ingestor = SnapshotIngestor(db, chunk_size=500, commit_interval=10)
+    snapshot_id = 0
+    for m in members:
+        player = _PlayerModel(random.Random(rng.random()))
+        first = max(start, m["joined_at"])
+        step = (anchor - first) / max(1, profile.snapshots_per_member)
+        snapshots = []
+        for n in range(profile.snapshots_per_member):
+            ts = first + step * n + timedelta(seconds=rng.randint(0, 3600))
+            if n and rng.random() >= profile.idle_fraction:
+                player.advance(step.total_seconds() / 86400)
+            snapshot_id += 1
+            payload = player.payload(m["id"], snapshot_id, ts)
+            if n and snapshots and rng.random() < profile.idle_fraction:
+                # Idle: WOM returns the same data block again
+                payload["data"] = snapshots[-1]["data"]
+            snapshots.append(payload)
+        ingestor.add_player(m["username"], m["id"], snapshots)
+    stats = ingestor.finish()
+    # The ingestor stamps last_updated with the wall clock; pin it for reproducible files
+    db.execute(ClanMember.__table__.update().values(last_updated=anchor))
+    db.commit()
+    return stats
+
+
+def _generate_messages(db: Session, rng: np.random.Generator, profile: SyntheticProfile,
+                       members: List[Dict], start: datetime, anchor: datetime, chunk: int = 100_000) -> None:
+    if not profile.messages:
+        return
+    guests = [f"Guest{i}" for i in range(max(1, int(len(members) * profile.guest_author_fraction)))]
+    authors = [(m["display"], m["id"]) for m in members] + [(g, None) for g in guests]
+    order = rng.permutation(len(authors))  # which author gets which Zipf rank
+    weights = 1.0 / np.arange(1, len(authors) + 1) ** profile.zipf_exponent
+    weights /= weights.sum()
+    sentences = [" ".join(rng.choice(WORDS, size=int(rng.integers(1, 9)))) for _ in range(500)]
+
+    span_us = int((anchor - start).total_seconds() * 1_000_000)
+    offsets = np.sort(rng.integers(0, span_us, size=profile.messages, dtype=np.int64))
+    base = np.datetime64(start, "us")
+
+    sql = ("INSERT INTO discord_messages (id, user_id, author_id, author_name, content, channel_id, "
+           "channel_name, guild_id, guild_name, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+    raw = db.connection().connection.driver_connection
+    last_id = {}
+    for lo in range(0, profile.messages, chunk):
+        hi = min(lo + chunk, profile.messages)
+        picks = order[rng.choice(len(authors), size=hi - lo, p=weights)]
+        channels = rng.integers(0, len(CHANNELS), size=hi - lo)
+        texts = rng.integers(0, len(sentences), size=hi - lo)
+        stamps = np.char.replace(np.datetime_as_string(base + offsets[lo:hi], unit="us"), "T", " ")
+        rows = []
+        for i, (a, c, t, ts) in enumerate(zip(picks.tolist(), channels.tolist(), texts.tolist(), stamps.tolist())):
+            msg_id = 10 ** 15 + lo + i
+            name, member_id = authors[a]
+            if member_id is not None:
+                m = members[a]
+                if m["previous"] and ts < str(m["renamed_at"]):
+                    name = m["previous"]
+            channel_id, channel_name = CHANNELS[c]
+            rows.append((msg_id, member_id, 10 ** 6 + int(a), name, sentences[t], channel_id, channel_name,
+                         GUILD_ID, GUILD_NAME, ts))
+            last_id[channel_id] = (msg_id, ts)
+        raw.executemany(sql, rows)
+    db.commit()
+
+    for channel_id, channel_name in CHANNELS:
+        if channel_id in last_id:
+            msg_id, ts = last_id[channel_id]
+            db.add(DiscordChannelCheckpoint(channel_id=channel_id, channel_name=channel_name, guild_id=GUILD_ID,
+                                            last_message_id=msg_id, last_message_at=datetime.fromisoformat(ts),
+                                            updated_at=anchor))
+    rebuild_author_daily(db)
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic clan database")
+    parser.add_argument("--out", required=True, help="SQLite file to create")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small")
+    parser.add_argument("--members", type=int, help="Override the profile's member count")
+    parser.add_argument("--snapshots", type=int, help="Override snapshots per member")
+    parser.add_argument("--messages", type=int, help="Override the Discord message count")
+    parser.add_argument("--days", type=int, help="Override the history length in days")
+    parser.add_argument("--seed", type=int, default=1337)
+    parser.add_argument("--anchor", help="Newest timestamp as YYYY-MM-DD (default: today UTC)")
+    parser.add_argument("--force", action="store_true", help="Replace --out if it exists")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    profile = PROFILES[args.profile]
+    overrides = {"members": args.members, "snapshots_per_member": args.snapshots,
+                 "messages": args.messages, "days": args.days}
+    profile = replace(profile, **{k: v for k, v in overrides.items() if v is not None})
+    anchor = datetime.fromisoformat(args.anchor).replace(tzinfo=timezone.utc) if args.anchor else None
+
+    logger.info(f"Generating {args.out}: {asdict(profile)} seed={args.seed}")
+    started = time.perf_counter()
+    counts = generate(args.out, profile, seed=args.seed, anchor=anchor, overwrite=args.force)
+    for table, n in counts.items():
+        logger.info(f"  {table:<28} {n:>12,}")
+    logger.info(f"Done in {time.perf_counter() - started:.1f}s ({os.path.getsize(args.out) / 1e6:,.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,16 +4,17 @@ import asyncio
 import json
 import sqlite3
 import datetime
+from dataclasses import dataclass, field
 from datetime import timezone
-from typing import Optional
+from typing import Optional, Dict, Any, List
 
 
 from services.wom import WOMClient
 from services.discord import DiscordFetcher
 from services.factory import ServiceFactory
-from services.identity_service import resolve_member_by_name
+from services.identity_service import resolve_member_by_name, IdentityIndex, bump_identity_version
+from services.snapshot_ingestion import SnapshotIngestor
 from database.connector import SessionLocal
-from services.user_access_service import UserAccessService
 from core.config import Config
 from core.performance import timed_operation
 from core.usernames import UsernameNormalizer
@@ -36,12 +37,12 @@ logger = logging.getLogger("harvest_sqlite")
 
 console = Console()
 
-from database.connector import SessionLocal
+from database.connector import SessionLocal, connect
 
 # DEPRECATED: Use get_db_session() instead
 def get_db_connection():
     """Legacy function - use get_db_session() for new code"""
-    return sqlite3.connect(Config.DB_FILE)
+    return connect()
 
 def get_db_session():
     """Get a SQLAlchemy session with proper context management"""
@@ -67,27 +68,26 @@ def _extract_joined_at(member: dict) -> Optional[str]:
     except Exception:
         return None
 
-def resolve_member_id_sqlite(cursor: sqlite3.Cursor, normalized_name: str) -> Optional[int]:
+def resolve_member_id_sqlite(cursor: sqlite3.Cursor, normalized_name: str, db_session=None) -> Optional[int]:
     """
-    Resolve a member_id using UserAccessService with fallback to direct sqlite queries.
+    Resolve a member_id using the shared IdentityIndex with fallback to direct sqlite queries.
 
-    Prefers UserAccessService for consistent resolution across the application,
-    then falls back to alias lookup (player_name_aliases.normalized_name) and 
-    clan_members.username if needed.
+    With `db_session`, prefers the in-memory index (alias + member names, loaded
+    once per run) for consistent resolution across the application; pass the
+    caller's session rather than opening one per lookup. Falls back to alias
+    lookup (player_name_aliases.normalized_name) and clan_members.username.
     """
     if not normalized_name:
         return None
 
-    # Try UserAccessService first for consistent resolution
-    try:
-        session = SessionLocal()
-        user_service = UserAccessService(session)
-        user_id = user_service.resolve_user_id(normalized_name)
-        session.close()
-        if user_id:
-            return user_id
-    except Exception as e:
-        logger.debug(f"UserAccessService resolution failed for {normalized_name}: {e}")
+    # Try the shared identity index first for consistent resolution
+    if db_session is not None:
+        try:
+            user_id = IdentityIndex.for_session(db_session).resolve(db_session, normalized_name)
+            if user_id:
+                return user_id
+        except Exception as e:
+            logger.debug(f"Identity index resolution failed for {normalized_name}: {e}")
 
     # Fallback to direct database queries
     try:
@@ -123,20 +123,391 @@ def get_latest_snapshot_timestamp(cursor: sqlite3.Cursor, username: str) -> Opti
         logger.debug(f"Failed to get latest timestamp for {username}: {e}")
         return None
 
-async def fetch_member_data(username, wom=None, start_date: Optional[str] = None):
+@dataclass
+class RosterSyncResult:
+    """Outcome of a roster sync plus the member state preloaded for the fetch loop."""
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    would_delete: int = 0
+    delete_aborted: bool = False
+    # normalized username -> row with (id, username, last_updated)
+    members: Dict[str, Any] = field(default_factory=dict)
+    # normalized username -> MAX(wom_snapshots.timestamp)
+    latest_snapshot_ts: Dict[str, datetime.datetime] = field(default_factory=dict)
+
+    @property
+    def rows_changed(self) -> int:
+        return self.inserted + self.updated + self.deleted
+
+
+def _parse_joined_at(member: dict) -> Optional[datetime.datetime]:
+    joined_iso = _extract_joined_at(member)
+    return datetime.datetime.fromisoformat(joined_iso.replace('Z', '+00:00')) if joined_iso else None
+
+
+def load_roster_state(db_session):
+    """
+    Load every clan member and the latest snapshot timestamp per username.
+
+    Two queries total, regardless of roster size.
+    Returns (members_by_username, latest_snapshot_ts_by_username).
+    """
+    from database.models import ClanMember, WOMSnapshot
+    from sqlalchemy import select, func
+
+    members = {
+        row.username: row
+        for row in db_session.execute(
+            select(ClanMember.id, ClanMember.username, ClanMember.role,
+                   ClanMember.joined_at, ClanMember.last_updated)
+        ).all()
+    }
+    latest = {
+        username: ts
+        for username, ts in db_session.execute(
+            select(WOMSnapshot.username, func.max(WOMSnapshot.timestamp))
+            .group_by(WOMSnapshot.username)
+        ).all()
+        if username and ts
+    }
+    return members, latest
+
+
+def sync_roster_bulk(db_session, members: List[dict]) -> RosterSyncResult:
+    """
+    Set-based member sync: diff the WOM roster against `clan_members` in memory,
+    then apply inserts/updates as one `INSERT ... ON CONFLICT` executemany and
+    stale-member deletes as one `DELETE` executemany.
+
+    Runs inside the caller's transaction; the caller commits.
+    """
+    from database.models import ClanMember
+    from sqlalchemy import select, func, bindparam
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+    result = RosterSyncResult()
+    existing, latest = load_roster_state(db_session)
+    result.latest_snapshot_ts = latest
+
+    upserts = []
+    seen = set()
+    for m in members:
+        raw_name = m.get('username', '')
+        if not raw_name:
+            continue
+        u_clean = UsernameNormalizer.normalize(raw_name)
+        if not u_clean or u_clean in seen:
+            continue
+        seen.add(u_clean)
+
+        role = m.get('role', 'member')
+        joined_dt = _parse_joined_at(m)
+        row = existing.get(u_clean)
+
+        if row is None:
+            result.inserted += 1
+        elif row.role != role or (row.joined_at is None and joined_dt is not None):
+            result.updated += 1
+        else:
+            result.unchanged += 1
+            continue
+
+        # last_updated is NOT touched here, only on successful snapshot fetch
+        upserts.append({'username': u_clean, 'role': role, 'joined_at': joined_dt, 'last_updated': None})
+
+    members_table = ClanMember.__table__
+    conn = db_session.connection()
+
+    if upserts:
+        stmt = sqlite_insert(members_table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[members_table.c.username],
+            set_={
+                'role': stmt.excluded.role,
+                # Never overwrite a known join date
+                'joined_at': func.coalesce(members_table.c.joined_at, stmt.excluded.joined_at),
+            },
+        )
+        conn.execute(stmt, upserts)
+
+    # Stale members (With Safe-Fail Threshold)
+    stale = [u for u in existing if u not in seen]
+    result.would_delete = len(stale)
+    if seen and stale:
+        delete_ratio = len(stale) / len(existing)
+        if delete_ratio > Config.HARVEST_SAFE_DELETE_RATIO:
+            result.delete_aborted = True
+        else:
+            conn.execute(
+                members_table.delete().where(members_table.c.username == bindparam('stale_username')),
+                [{'stale_username': u} for u in stale],
+            )
+            result.deleted = len(stale)
+
+    if result.rows_changed:
+        bump_identity_version()
+        result.members = {
+            row.username: row
+            for row in db_session.execute(
+                select(ClanMember.id, ClanMember.username, ClanMember.last_updated)
+            ).all()
+        }
+    else:
+        result.members = existing
+    return result
+
+
+def sync_roster_per_row(db_session, members: List[dict]) -> RosterSyncResult:
+    """
+    Legacy ORM member sync (one SELECT per roster entry).
+    Kept behind HARVEST_BULK_ROSTER_SYNC=false for comparison and fallback.
+    """
+    from database.models import ClanMember
+    from sqlalchemy import select, func, delete
+
+    result = RosterSyncResult()
+    active_usernames = []
+
+    for m in members:
+        raw_name = m.get('username', '')
+        if not raw_name: continue
+
+        u_clean = UsernameNormalizer.normalize(raw_name)
+        active_usernames.append(u_clean)
+
+        role = m.get('role', 'member')
+        joined_dt = _parse_joined_at(m)
+
+        existing = db_session.execute(
+            select(ClanMember).where(ClanMember.username == u_clean)
+        ).scalar_one_or_none()
+
+        if existing:
+            if existing.role != role or (joined_dt and not existing.joined_at):
+                result.updated += 1
+            else:
+                result.unchanged += 1
+            existing.role = role
+            if joined_dt and not existing.joined_at:
+                existing.joined_at = joined_dt
+        else:
+            db_session.add(ClanMember(username=u_clean, role=role, joined_at=joined_dt, last_updated=None))
+            result.inserted += 1
+
+    if active_usernames:
+        total_db_members = db_session.execute(
+            select(func.count()).select_from(ClanMember)
+        ).scalar()
+
+        if total_db_members > 0:
+            would_delete = db_session.execute(
+                select(func.count()).select_from(ClanMember).where(
+                    ClanMember.username.notin_(active_usernames)
+                )
+            ).scalar()
+            result.would_delete = would_delete
+
+            if would_delete / total_db_members > Config.HARVEST_SAFE_DELETE_RATIO:
+                result.delete_aborted = True
+            else:
+                deleted = db_session.execute(
+                    delete(ClanMember).where(ClanMember.username.notin_(active_usernames))
+                )
+                result.deleted = deleted.rowcount
+
+    db_session.flush()
+    if result.rows_changed:
+        bump_identity_version()
+    result.members, result.latest_snapshot_ts = load_roster_state(db_session)
+    return result
+
+# Reserved harvest_state.json key: username -> snapshot pages read on the last run
+PAGE_HINTS_KEY = "__snapshot_pages__"
+
+async def fetch_member_data(username, wom=None, start_date: Optional[str] = None, page_hint: Optional[int] = None):
     try:
         # Use injected WOM client or get from ServiceFactory
         client = wom if wom is not None else await ServiceFactory.get_wom_client()
         # Fetch snapshots (incremental if start_date provided, else full history)
+        kwargs = {}
         if start_date:
-            snapshots = await client.get_player_snapshots(username, start_date=start_date)
-        else:
-            snapshots = await client.get_player_snapshots(username)
+            kwargs['start_date'] = start_date
+        if page_hint:
+            kwargs['page_hint'] = page_hint
+        snapshots = await client.get_player_snapshots(username, **kwargs)
         return (username, snapshots)
     except Exception as e:
         logger.warning(f"Failed to fetch {username}: {e}")
         return (username, None)
 
+async def iter_member_pages(username, wom, start_date: Optional[str] = None, page_hint: Optional[int] = None):
+    """Yield a member's snapshot pages as they arrive (one batch for clients without paging)."""
+    if hasattr(wom, 'iter_player_snapshot_pages'):
+        async for page in wom.iter_player_snapshot_pages(username, start_date=start_date, page_hint=page_hint):
+            yield page
+    else:
+        _, snapshots = await fetch_member_data(username, wom=wom, start_date=start_date)
+        if snapshots:
+            yield snapshots
+
+def harvest_ingestor(db_session) -> SnapshotIngestor:
+    """
+    SnapshotIngestor for the parallel harvest: commits after every chunk.
+
+    The Discord harvest runs beside it on the same StaticPool connection, so a
+    Discord commit would also commit half-finished WOM work and a Discord
+    rollback would discard WOM chunks already counted as written. A chunk is
+    inserted and committed in one synchronous call, so nothing of ours is left
+    uncommitted while Discord runs.
+    """
+    return SnapshotIngestor(db_session, commit_interval=1)
+
+async def stream_wom_harvest(wom, fetch_jobs, ingestor, members, workers: Optional[int] = None,
+                             queue_size: Optional[int] = None, page_hints: Optional[Dict[str, int]] = None) -> int:
+    """
+    Pipelined harvest: `workers` fetchers pull from `fetch_jobs` and push snapshot
+    pages into a bounded asyncio.Queue; a single writer drains it into the ingestor
+    while HTTP requests are still in flight.
+
+    The writer stays on the event loop thread: the ingestor shares the one
+    StaticPool connection with the Discord harvest running beside it, so its
+    flushes and commits must not interleave with Discord's from another thread.
+    Pass an ingestor from `harvest_ingestor()` so no chunk stays uncommitted
+    while Discord writes.
+
+    fetch_jobs: list of (username, start_date) pairs.
+    members: normalized username -> row with `.id` (RosterSyncResult.members).
+    page_hints: username -> page count from the previous run (sizes the first page wave).
+    Returns the number of players fetched.
+    """
+    page_hints = page_hints or {}
+    workers = max(1, min(workers or Config.WOM_HARVEST_WORKERS, len(fetch_jobs) or 1))
+    queue = asyncio.Queue(maxsize=max(1, queue_size or Config.WOM_HARVEST_QUEUE_SIZE))
+    pending = iter(fetch_jobs)  # shared work list, each job is taken by exactly one worker
+    total = len(fetch_jobs)
+    fetched = 0
+
+    async def producer():
+        for username, start_date in pending:
+            try:
+                async for page in iter_member_pages(username, wom, start_date, page_hints.get(username)):
+                    await queue.put((username, page, False))
+            except Exception as e:
+                logger.warning(f"Failed to fetch {username}: {e}")
+            await queue.put((username, None, True))  # player finished
+
+    async def writer():
+        nonlocal fetched
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            username, page, finished = item
+            if page:
+                u_clean = UsernameNormalizer.normalize(username)
+                member = members.get(u_clean)
+                ingestor.add_player(u_clean, member.id if member else None, page)
+                await asyncio.sleep(0)  # let fetchers and the Discord harvest run between chunks
+            if not finished:
+                continue
+            fetched += 1
+            if fetched % 10 == 0:
+                print(f"  Processed {fetched}/{total} players...")
+                sys.stdout.flush() # Force flush to ensure main.py sees it immediately
+
+    producer_tasks = [asyncio.create_task(producer()) for _ in range(workers)]
+    producers_done = asyncio.gather(*producer_tasks)
+    writer_task = asyncio.create_task(writer())
+    try:
+        await asyncio.wait({writer_task, producers_done}, return_when=asyncio.FIRST_COMPLETED)
+        if writer_task.done():
+            writer_task.result()  # writer only exits early on error; re-raise it
+        await producers_done
+        await queue.put(None)
+        await writer_task
+    finally:
+        for t in producer_tasks:
+            t.cancel()
+        writer_task.cancel()
+    return fetched
+
+@dataclass
+class GroupDeltaPlan:
+    """How each roster member is refreshed in group delta mode."""
+    history: List[tuple] = field(default_factory=list)  # (username, start_date): new members and gaps
+    latest: List[str] = field(default_factory=list)     # changed since our last snapshot: one call each
+    unchanged: List[str] = field(default_factory=list)  # nothing new per the group payload: no call
+
+
+def _parse_wom_ts(value) -> Optional[datetime.datetime]:
+    """ISO string -> naive UTC datetime (how snapshot timestamps are stored)."""
+    if not value:
+        return None
+    try:
+        dt = datetime.datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def plan_group_delta(members, latest_snapshot_ts, now: Optional[datetime.datetime] = None,
+                     max_gap_days: Optional[int] = None) -> GroupDeltaPlan:
+    """
+    Split roster members by what they need, using the change markers that the
+    /groups/{id} payload already carries (no extra API calls).
+
+    members: entries from WOMClient.get_group_members.
+    latest_snapshot_ts: normalized username -> newest stored snapshot timestamp.
+    """
+    now = now or datetime.datetime.now(timezone.utc).replace(tzinfo=None)
+    max_gap = datetime.timedelta(days=Config.WOM_DELTA_MAX_GAP_DAYS if max_gap_days is None else max_gap_days)
+    plan = GroupDeltaPlan()
+
+    for m in members:
+        username = m['username']
+        stored_ts = latest_snapshot_ts.get(UsernameNormalizer.normalize(username))
+        if stored_ts is None:
+            plan.history.append((username, None))
+            continue
+        latest = _parse_wom_ts(stored_ts.isoformat())
+        if now - latest > max_gap:
+            # Too long since our last datapoint: backfill the gap from the history endpoint
+            plan.history.append((username, stored_ts.isoformat()))
+            continue
+
+        changed_at = _parse_wom_ts(m.get('lastChangedAt') or m.get('updatedAt'))
+        if changed_at is not None and changed_at <= latest:
+            plan.unchanged.append(username)
+        else:
+            plan.latest.append(username)
+    return plan
+
+
+async def ingest_latest_snapshots(wom, usernames, ingestor, members) -> int:
+    """Fetch /players/{username} for each user and ingest its latestSnapshot. Returns snapshots fetched."""
+    async def fetch(username):
+        try:
+            return username, await wom.get_player_latest_snapshot(username)
+        except Exception as e:
+            logger.warning(f"Failed to fetch latest snapshot for {username}: {e}")
+            return username, None
+
+    fetched = 0
+    # Requests are paced by the WOMClient limiter; results are written as they land
+    for f in asyncio.as_completed([fetch(u) for u in usernames]):
+        username, snap = await f
+        if not snap:
+            continue
+        fetched += 1
+        u_clean = UsernameNormalizer.normalize(username)
+        member = members.get(u_clean)
+        ingestor.add_player(u_clean, member.id if member else None, [snap])
+    return fetched
+
 async def fetch_and_check_staleness(username, wom=None):
     # Wrapper to fetch details, check staleness, and optionally update
     try:
@@ -315,65 +686,17 @@ async def process_wom_harvest(wom, conn, cursor):
         
         # --- MEMBER SYNC (Source of Truth) ---
         print(f"Synchronizing local database with remote roster...")
-        active_usernames = []
-        ts_now_dt = TimestampHelper.now_utc()
-        ts_now_iso = ts_now_dt.isoformat()
-
-        for m in members:
-            raw_name = m.get('username', '')
-            if not raw_name: continue
-            
-            u_clean = UsernameNormalizer.normalize(raw_name)
-            active_usernames.append(u_clean)
-            
-            role = m.get('role', 'member')
-            joined_iso = _extract_joined_at(m)
-            
-            # UPSERT via SQLAlchemy
-            existing = db_session.execute(
-                select(ClanMember).where(ClanMember.username == u_clean)
-            ).scalar_one_or_none()
-            
-            if existing:
-                existing.role = role
-                # existing.last_updated is NOT updated here, only on successful snapshot fetch
-                if joined_iso and not existing.joined_at:
-                    existing.joined_at = datetime.datetime.fromisoformat(joined_iso.replace('Z', '+00:00'))
-            else:
-                new_member = ClanMember(
-                    username=u_clean,
-                    role=role,
-                    joined_at=datetime.datetime.fromisoformat(joined_iso.replace('Z', '+00:00')) if joined_iso else None,
-                    last_updated=None # Will be set upon first successful snapshot fetch
-                )
-                db_session.add(new_member)
-        
-        # 2. DELETE Stale Members (With Safe-Fail Threshold)
-        if active_usernames:
-            total_db_members = db_session.execute(
-                select(func.count()).select_from(ClanMember)
-            ).scalar()
-            
-            if total_db_members > 0:
-                would_delete = db_session.execute(
-                    select(func.count()).select_from(ClanMember).where(
-                        ClanMember.username.notin_(active_usernames)
-                    )
-                ).scalar()
-                
-                delete_ratio = would_delete / total_db_members
-                
-                if delete_ratio > Config.HARVEST_SAFE_DELETE_RATIO:
-                    print(f"CRITICAL WARNING: Harvest would delete {would_delete} members ({delete_ratio:.1%}). Aborting deletion for safety.")
-                else:
-                    deleted = db_session.execute(
-                        delete(ClanMember).where(ClanMember.username.notin_(active_usernames))
-                    )
-                    deleted_count = deleted.rowcount
-                    print(f"Synced Members: Updated {len(active_usernames)}, Deleted {deleted_count} stale/banned members.")
-        
+        if Config.HARVEST_BULK_ROSTER_SYNC:
+            roster = sync_roster_bulk(db_session, members)
+        else:
+            roster = sync_roster_per_row(db_session, members)
         db_session.commit()
-        
+
+        if roster.delete_aborted:
+            print(f"CRITICAL WARNING: Harvest would delete {roster.would_delete} members. Aborting deletion for safety.")
+        print(f"Synced Members: {roster.inserted} added, {roster.updated} updated, "
+              f"{roster.deleted} stale/banned deleted ({roster.rows_changed} rows changed).")
+
         # --- LOAD HARVEST STATE ---
         STATE_FILE = "data/harvest_state.json"
         harvest_state = {}
@@ -383,9 +706,10 @@ async def process_wom_harvest(wom, conn, cursor):
                     harvest_state = json.load(f)
             except Exception as e:
                 print(f"Warning: Could not load harvest state: {e}")
+        page_hints = harvest_state.get(PAGE_HINTS_KEY, {})
 
         # OPTIMIZATION: Check Staleness via ClanMember.last_updated
-        tasks = []
+        fetch_jobs = []  # (username, start_date) pairs to download
         now_utc = datetime.datetime.now(timezone.utc)
         skipped_count = 0
         
@@ -402,23 +726,15 @@ async def process_wom_harvest(wom, conn, cursor):
             # Track this username to update the state file later (retaining HEAD behavior for state file compat)
             users_processed_in_this_run.append(username)
 
-            # Check Member's last_updated
-            member = db_session.execute(
-                select(ClanMember).where(ClanMember.username == username_normalized)
-            ).scalar_one_or_none()
+            # Check Member's last_updated (preloaded by the roster sync, no per-member query)
+            member = roster.members.get(username_normalized)
             
             should_fetch = True
-            latest_ts = None
             
-            # Get latest snapshot timestamp for start_date optimization
+            # Latest snapshot timestamp for start_date optimization
             # (We still need this to incremental fetch, but NOT for staleness check)
-            latest_snap = db_session.execute(
-                select(WOMSnapshot)
-                .where(WOMSnapshot.username == username_normalized)
-                .order_by(WOMSnapshot.timestamp.desc())
-                .limit(1)
-            ).scalar_one_or_none()
-            latest_ts = latest_snap.timestamp.isoformat() if latest_snap else None
+            latest_snap_ts = roster.latest_snapshot_ts.get(username_normalized)
+            latest_ts = latest_snap_ts.isoformat() if latest_snap_ts else None
 
             if use_staleness_optimization and member and member.last_updated:
                 try:
@@ -437,145 +753,74 @@ async def process_wom_harvest(wom, conn, cursor):
                     pass
             
             if should_fetch:
-                tasks.append(fetch_member_data(username, wom=wom, start_date=latest_ts))
+                fetch_jobs.append((username, latest_ts))
 
         
-        # Determine if we are running in an interactive terminal
-        # is_interactive = sys.stdout.isatty() and not os.environ.get("NO_RICH")
-        is_interactive = False
-        
-        # Initialize results list to store member data
-        results = []
-        
         # Log optimization impact
         if skipped_count > 0:
             hours_threshold = Config.WOM_STALENESS_SKIP_HOURS
-            print(f"Skipped {skipped_count} players with recent data (< {hours_threshold}h old). Fetching {len(tasks)} players...")
+            print(f"Skipped {skipped_count} players with recent data (< {hours_threshold}h old). Fetching {len(fetch_jobs)} players...")
         else:
-            print(f"Downloading player snapshots ({len(tasks)} in queue)...")
-            if is_interactive:
-                # Removed Progress Bar for Parallel safety (console conflict likely)
-                print(f"Downloading player snapshots ({len(tasks)} in queue)...")
-                for f in asyncio.as_completed(tasks):
-                    res = await f
-                    results.append(res)
-            else:
-                # Non-interactive mode (e.g. piped to main.py)
-                completed_count = 0
-                for f in asyncio.as_completed(tasks):
-                    res = await f
-                    results.append(res)
-                    completed_count += 1
-                    if completed_count % 10 == 0:
-                        print(f"  Processed {completed_count}/{len(tasks)} players...")
-                        sys.stdout.flush() # Force flush to ensure main.py sees it immediately
-            
-            print("Saving to Database...")
-            
-            count_snaps = 0
-            count_bosses = 0
-            
-            ts_now_iso_state = now_utc.isoformat()
-            
-            # Update State for all processed users (success or not, we TRIED)
-            for u in users_processed_in_this_run:
-                harvest_state[u] = ts_now_iso_state
-                
-            # Save State File
-            try:
-                with open(STATE_FILE, 'w') as f:
-                    json.dump(harvest_state, f, indent=2)
-                print(f"Updated harvest state for {len(users_processed_in_this_run)} users.")
-            except Exception as e:
-                print(f"Failed to save harvest state: {e}")
+            print(f"Downloading player snapshots ({len(fetch_jobs)} in queue)...")
+
+        # Batched writes: multi-row INSERT OR IGNORE per chunk instead of a flush per snapshot
+        ingestor = harvest_ingestor(db_session)
+
+        if Config.WOM_HARVEST_MODE == 'delta':
+            # Group delta: history only for new members/gaps, one call per changed member, none otherwise
+            jobs_by_user = {u for u, _ in fetch_jobs}
+            plan = plan_group_delta([m for m in members if m['username'] in jobs_by_user], roster.latest_snapshot_ts)
+            print(f"Group delta: {len(plan.latest)} changed, {len(plan.unchanged)} unchanged, "
+                  f"{len(plan.history)} need history (new or gap).")
+            fetch_jobs = plan.history
+            latest_count = await ingest_latest_snapshots(wom, plan.latest, ingestor, roster.members)
+            print(f"  Fetched {latest_count} latest snapshots.")
+
+        if Config.WOM_HARVEST_PIPELINED:
+            # Writes overlap with HTTP; memory is bounded by the queue depth
+            await stream_wom_harvest(wom, fetch_jobs, ingestor, roster.members, page_hints=page_hints)
+        else:
+            # Legacy mode: download everything, then save
+            results = []
+            completed_count = 0
+            tasks = [fetch_member_data(u, wom=wom, start_date=ts, page_hint=page_hints.get(u)) for u, ts in fetch_jobs]
+            for f in asyncio.as_completed(tasks):
+                res = await f
+                results.append(res)
+                completed_count += 1
+                if completed_count % 10 == 0:
+                    print(f"  Processed {completed_count}/{len(tasks)} players...")
+                    sys.stdout.flush() # Force flush to ensure main.py sees it immediately
 
-            
-            # Process results using ORM
+            print("Saving to Database...")
             for username, data in results:
                 if not data: continue
-                
+
                 u_clean = UsernameNormalizer.normalize(username)
-                
-                # Get member_id via ORM
-                member = db_session.execute(
-                    select(ClanMember).where(ClanMember.username == u_clean)
-                ).scalar_one_or_none()
-                
-                member_id = member.id if member else None
-                
-                for snap in data:
-                    snap_data = snap.get('data', {})
-                    created_at = snap.get('createdAt')
-                    if not created_at: continue
-                    
-                    try:
-                        ts_dt = datetime.datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                        ts_dt = TimestampHelper.to_utc(ts_dt)
-                        if ts_dt is None:
-                            continue
-                    except:
-                        continue
-                    
-                    skills = snap_data.get('skills', {})
-                    bosses = snap_data.get('bosses', {})
-                    
-                    xp = skills.get('overall', {}).get('experience', 0)
-                    total_boss = sum(b.get('kills', 0) for b in bosses.values() if b.get('kills', 0) > 0)
-                    
-                    raw_json = json.dumps(snap)
-                    
-                    # Check if snapshot already exists (UNIQUE constraint)
-                    existing_snap = db_session.execute(
-                        select(WOMSnapshot).where(
-                            WOMSnapshot.username == u_clean,
-                            WOMSnapshot.timestamp == ts_dt
-                        )
-                    ).scalar_one_or_none()
-                    
-                    if existing_snap:
-                        continue  # Skip duplicates
-                    
-                    try:
-                        new_snap = WOMSnapshot(
-                            username=u_clean,
-                            timestamp=ts_dt,
-                            total_xp=xp,
-                            total_boss_kills=total_boss,
-                            ehp=0,
-                            ehb=0,
-                            raw_data=raw_json,
-                            user_id=member_id
-                        )
-                        db_session.add(new_snap)
-                        db_session.flush()  # Get the ID
-                        
-                        count_snaps += 1
-                        
-                        # Insert boss snapshots
-                        for b_name, b_val in bosses.items():
-                            kills = b_val.get('kills', -1)
-                            rank = b_val.get('rank', 0)
-                            if kills > -1:
-                                boss_snap = BossSnapshot(
-                                    snapshot_id=new_snap.id,
-                                    boss_name=b_name,
-                                    kills=kills,
-                                    rank=rank
-                                )
-                                db_session.add(boss_snap)
-                                count_bosses += 1
-                
-                        # Update member's last_updated timestamp to mark successful scan
-                        if member:
-                            member.last_updated = datetime.datetime.now(timezone.utc)
-                        
-                    except Exception as e:
-                        logger.error(f"Error inserting snapshot for {u_clean}: {e}")
-                        db_session.rollback()
-                        continue
-            
-            db_session.commit()
-            print(f"Done. Saved {count_snaps} snapshots and {count_bosses} boss records.")
+                member = roster.members.get(u_clean)
+                ingestor.add_player(u_clean, member.id if member else None, data)
+
+        stats = ingestor.finish()
+        print(f"Done. {stats.summary()}")
+
+        ts_now_iso_state = now_utc.isoformat()
+
+        # Update State for all processed users (success or not, we TRIED)
+        for u in users_processed_in_this_run:
+            harvest_state[u] = ts_now_iso_state
+
+        # Remember how many snapshot pages each player needed, to size the next run's page waves
+        page_counts = getattr(wom, 'snapshot_page_counts', None)
+        if isinstance(page_counts, dict):
+            harvest_state[PAGE_HINTS_KEY] = {**page_hints, **page_counts}
+
+        # Save State File
+        try:
+            with open(STATE_FILE, 'w') as f:
+                json.dump(harvest_state, f, indent=2)
+            print(f"Updated harvest state for {len(users_processed_in_this_run)} users.")
+        except Exception as e:
+            print(f"Failed to save harvest state: {e}")
 
     except asyncio.CancelledError:
         print("WOM harvest cancelled.")
@@ -17,6 +17,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     from services.llm_client import UnifiedLLMClient as LLMClient, ModelProvider
     from core.config import Config
+    from database.connector import connect
 except ImportError as e:
     print(f"CRITICAL IMPORT ERROR: {e}")
     # Fallback/Debug print to help user if it still fails
@@ -77,7 +78,7 @@ OUTPUT: Exactly 6 valid JSON objects in array format. No markdown. No explanatio
 """
 
 def get_db_connection():
-    return sqlite3.connect(Config.DB_FILE)
+    return connect(read_only=True)
 
 def get_leadership_roster() -> List[str]:
     """Load leadership roster from clan member role data."""
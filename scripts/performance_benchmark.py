@@ -2,13 +2,23 @@
 """
 Performance benchmark script for UserAccessService vs direct database access.
 Tests bulk operations and individual queries to validate efficiency improvements.
+
+Runs against Config.DB_FILE, another file (--db), or a generated synthetic
+database at a chosen scale (--synthetic, see scripts/generate_synthetic_db.py).
+Synthetic files are kept in the temp directory and reused on later runs.
+
+Usage:
+    python scripts/performance_benchmark.py
+    python scripts/performance_benchmark.py --synthetic medium
 """
 
+import argparse
 import sys
 import os
+import tempfile
 import time
 import statistics
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 # Add parent directory to path to import core modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -21,9 +31,9 @@ from core.config import Config
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def benchmark_unified_access() -> Tuple[float, int]:
+def benchmark_unified_access(db_file: Optional[str] = None) -> Tuple[float, int]:
     """Benchmark unified access patterns (what UserAccessService provides)."""
-    conn = sqlite3.connect(Config.DB_FILE)
+    conn = sqlite3.connect(db_file or Config.DB_FILE)
     cursor = conn.cursor()
     
     start_time = time.time()
@@ -54,9 +64,9 @@ def benchmark_unified_access() -> Tuple[float, int]:
     
     return end_time - start_time, member_count
 
-def benchmark_fragmented_access() -> Tuple[float, int]:
+def benchmark_fragmented_access(db_file: Optional[str] = None) -> Tuple[float, int]:
     """Benchmark old fragmented access patterns (what scripts used to do)."""
-    conn = sqlite3.connect(Config.DB_FILE)
+    conn = sqlite3.connect(db_file or Config.DB_FILE)
     cursor = conn.cursor()
     
     start_time = time.time()
@@ -84,9 +94,20 @@ def benchmark_fragmented_access() -> Tuple[float, int]:
     
     return end_time - start_time, member_count
 
-def run_performance_comparison():
+def synthetic_db(profile: str, seed: int = 1337) -> str:
+    """Path of the synthetic database for `profile`, generating it on first use."""
+    from scripts.generate_synthetic_db import PROFILES, generate
+    db_file = os.path.join(tempfile.gettempdir(), f"clanstats_synthetic_{profile}_{seed}.db")
+    if not os.path.exists(db_file):
+        logger.info(f"Generating synthetic '{profile}' database at {db_file}")
+        generate(db_file, PROFILES[profile], seed=seed)
+    return db_file
+
+
+def run_performance_comparison(db_file: Optional[str] = None):
     """Run comprehensive performance comparison."""
     print("🔬 Performance Benchmark: Unified vs Fragmented Database Access")
+    print(f"   Database: {db_file or Config.DB_FILE}")
     print("=" * 70)
     
     runs = 3
@@ -97,12 +118,12 @@ def run_performance_comparison():
         print(f"\n📊 Run {run + 1}/{runs}")
         
         # Test unified approach (UserAccessService style)
-        unified_time, member_count = benchmark_unified_access()
+        unified_time, member_count = benchmark_unified_access(db_file)
         unified_times.append(unified_time)
         print(f"  Unified Access:    {unified_time:.3f}s ({member_count} members)")
         
         # Test fragmented approach (old script style)  
-        fragmented_time, _ = benchmark_fragmented_access()
+        fragmented_time, _ = benchmark_fragmented_access(db_file)
         fragmented_times.append(fragmented_time)
         print(f"  Fragmented Access: {fragmented_time:.3f}s ({member_count} members)")
         
@@ -129,4 +150,12 @@ def run_performance_comparison():
     print("\n✅ Performance validation complete!")
 
 if __name__ == "__main__":
-    run_performance_comparison()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Benchmark unified vs fragmented database access")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--db", help="SQLite file to benchmark (default: Config.DB_FILE)")
+    source.add_argument("--synthetic", choices=["tiny", "small", "medium", "large"],
+                        help="Benchmark a generated database of this size")
+    parser.add_argument("--seed", type=int, default=1337, help="Seed for --synthetic")
+    args = parser.parse_args()
+
+    run_performance_comparison(synthetic_db(args.synthetic, args.seed) if args.synthetic else args.db)
\ No newline at end of file
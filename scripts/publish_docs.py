@@ -92,7 +92,8 @@ def publish_to_docs():
         "clan_dashboard.html": "index.html", # RENAME to index.html
         "dashboard_logic.js": "dashboard_logic.js",
         "clan_data.js": "clan_data.js", # Data file
-        "ai_data.js": "ai_data.js",   # AI Data file
+        # ai_data.js is not copied: mcp_enrich writes docs/ai_data.js directly, and the
+        # root copy would overwrite it with stale insights
         "clan_data.json": "clan_data.json", # Raw JSON (if needed by JS)
     }
 
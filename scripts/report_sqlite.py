@@ -11,7 +11,7 @@ from reporting.excel import reporter
 from core.config import Config
 from core.usernames import UsernameNormalizer
 from core.timestamps import TimestampHelper
-from database.connector import SessionLocal
+from database.connector import ReadOnlySession
 from core.analytics import AnalyticsService
 from database.models import ClanMember
 
@@ -38,7 +38,7 @@ def load_metadata(session, min_timestamps=None):
             norm = UsernameNormalizer.normalize(username)
             if norm in min_timestamps:
                 snap = min_timestamps[norm]
-                # snap is WOMSnapshot object
+                # snap is a SnapshotRow (core/analytics.py)
                 if snap.timestamp:
                     joined_dt = snap.timestamp
                     # Ensure UTC
@@ -60,12 +60,13 @@ def load_metadata(session, min_timestamps=None):
         }
     return metadata
 
-def run_report_sync():
+def run_report_sync(context=None):
+    """Generate the Excel report. `context` is an optional shared core.analytics.AnalyticsSnapshot."""
     logger.info("Initializing analytics engine for report generation...", extra={'trace_id': 'REPORT'})
     
-    db = SessionLocal()
+    db = ReadOnlySession()
     try:
-        analytics = AnalyticsService(db)
+        analytics = AnalyticsService(db, context=context)
         
         # Fetch min timestamps for metadata fallback
         min_ts = analytics.get_min_timestamps()
@@ -1,17 +1,26 @@
 import discord
 import asyncio
 import logging
+import re
+import time
 from datetime import datetime, timezone, timedelta
+from typing import Dict, Optional
+from sqlalchemy import func, insert, select
+from core import telemetry
 from core.config import Config
+from core.metrics import REGISTRY
 from core.timestamps import TimestampHelper
 from core.usernames import UsernameNormalizer
 from database.connector import SessionLocal
-from database.models import DiscordMessage
-from services.identity_service import resolve_member_by_name
+from database.models import DiscordMessage, DiscordChannelCheckpoint
+from database.rollups import record_messages
+from services.identity_service import IdentityIndex
 from services.user_access_service import UserAccessService
 
 logger = logging.getLogger('DiscordService')
 
+RELAY_REGEX = re.compile(r"\*\*(.+?)\*\*:")
+
 class DiscordFetcher:
     def __init__(self):
         intents = discord.Intents.default()
@@ -54,6 +63,10 @@ class DiscordFetcher:
         finally:
             await self.client.close()
 
+    def _load_checkpoints(self, db):
+        """channel_id -> DiscordChannelCheckpoint (table from the discord_checkpoints_005 migration)."""
+        return {cp.channel_id: cp for cp in db.query(DiscordChannelCheckpoint).all()}
+
     async def _fetch_logic(self):
         channels = []
         if Config.RELAY_CHANNEL_ID:
@@ -63,96 +76,153 @@ class DiscordFetcher:
             for guild in self.client.guilds:
                 channels.extend(guild.text_channels)
         
-        import re
-        relay_regex = re.compile(r"\*\*(.+?)\*\*:")
-        
         db = SessionLocal()
         try:
-            for channel in channels:
-                logger.info(f"Scanning channel: {channel.name}")
-                if not channel.permissions_for(channel.guild.me).read_message_history:
-                    continue
+            checkpoints = self._load_checkpoints(db)
+            # Each distinct unresolved author falls back to the slow path once per run
+            self._unresolved = set()
+            # Channels are scanned concurrently; batches are saved synchronously so the
+            # shared session never interleaves two transactions.
+            semaphore = asyncio.Semaphore(max(1, Config.DISCORD_CHANNEL_CONCURRENCY))
 
-                batch = []
-                total_fetched = 0
-                async for msg in channel.history(limit=None, after=self.start_date, oldest_first=True):
-                    if self.end_date and msg.created_at > self.end_date:
-                        break
-                    
-                    # Convert to Model
-                    # Normalize display name so name variants map to the same user
-                    # Improved: Clean potential tags first (e.g. "Name [Role]" -> "Name")
-                    clean_display_name = UsernameNormalizer.clean_discord_nickname(msg.author.display_name)
-                    normalized_name = UsernameNormalizer.normalize(clean_display_name)
-
-                    model = DiscordMessage(
-                        id=msg.id,
-                        author_id=msg.author.id,
-                        author_name=normalized_name,
-                        content=msg.content,
-                        channel_id=msg.channel.id,
-                        channel_name=msg.channel.name,
-                        guild_id=msg.guild.id,
-                        guild_name=msg.guild.name,
-                        created_at=TimestampHelper.to_utc(msg.created_at)  # Ensure UTC
-                    )
-                    
-                    # Relay Bot Parsing
-                    if str(msg.author) == "Osrs clanchat#0000":
-                        match = relay_regex.search(msg.content)
-                        if match:
-                            model.author_name = UsernameNormalizer.normalize(match.group(1).strip())
-
-                    # Resolve member_id via alias lookup
-                    member_id = resolve_member_by_name(db, model.author_name)
-                    if member_id:
-                        model.user_id = member_id
-                    else:
-                        logger.debug(f"Could not resolve member_id for Discord author '{model.author_name}'")
-
-                    batch.append(model)
-                    total_fetched += 1
-                    # Optional per-run cap
-                    if Config.DISCORD_MAX_MESSAGES and total_fetched >= Config.DISCORD_MAX_MESSAGES:
-                        logger.warning(f"Reached DISCORD_MAX_MESSAGES cap ({Config.DISCORD_MAX_MESSAGES}). Stopping early.")
-                        break
-                    
-                    if len(batch) >= Config.DISCORD_BATCH_SIZE:
-                        self._save_batch(db, batch, total_fetched)
-                        batch = []
-                        await asyncio.sleep(Config.DISCORD_RATE_LIMIT_DELAY)
-
-                if batch:
-                    self._save_batch(db, batch, total_fetched)
+            async def scan(channel):
+                async with semaphore:
+                    try:
+                        await self._fetch_channel(db, channel, checkpoints.get(channel.id))
+                    except Exception as e:
+                        logger.error(f"Channel {channel.name} failed: {e}")
+
+            await asyncio.gather(*(scan(channel) for channel in channels))
         finally:
             db.close()
 
+    async def _fetch_channel(self, db, channel, checkpoint=None):
+        logger.info(f"Scanning channel: {channel.name}")
+        if not channel.permissions_for(channel.guild.me).read_message_history:
+            return
+
+        # Resume exactly after this channel's own high-water mark when we have one. A channel
+        # without one starts from the history floor, not the global start date: that comes from
+        # the newest stored message and would skip a newly added channel's older history.
+        after = discord.Object(id=checkpoint.last_message_id) if checkpoint else self._history_floor()
+
+        batch = []
+        total_fetched = 0
+        async for msg in channel.history(limit=None, after=after, oldest_first=True):
+            if self.end_date and msg.created_at > self.end_date:
+                break
+            
+            # Convert to a row for the bulk insert
+            # Normalize display name so name variants map to the same user
+            # Improved: Clean potential tags first (e.g. "Name [Role]" -> "Name")
+            clean_display_name = UsernameNormalizer.clean_discord_nickname(msg.author.display_name)
+            normalized_name = UsernameNormalizer.normalize(clean_display_name)
+
+            row = {
+                'id': msg.id,
+                'author_id': msg.author.id,
+                'author_name': normalized_name,
+                'content': msg.content,
+                'channel_id': msg.channel.id,
+                'channel_name': msg.channel.name,
+                'guild_id': msg.guild.id,
+                'guild_name': msg.guild.name,
+                'created_at': TimestampHelper.to_utc(msg.created_at),  # Ensure UTC
+                'user_id': None,  # resolved per distinct author in _save_batch
+            }
+            
+            # Relay Bot Parsing
+            if str(msg.author) == "Osrs clanchat#0000":
+                match = RELAY_REGEX.search(msg.content)
+                if match:
+                    row['author_name'] = UsernameNormalizer.normalize(match.group(1).strip())
+
+            batch.append(row)
+            total_fetched += 1
+            # Optional per-run cap
+            if Config.DISCORD_MAX_MESSAGES and total_fetched >= Config.DISCORD_MAX_MESSAGES:
+                logger.warning(f"Reached DISCORD_MAX_MESSAGES cap ({Config.DISCORD_MAX_MESSAGES}). Stopping early.")
+                break
+            
+            if len(batch) >= Config.DISCORD_BATCH_SIZE:
+                self._save_batch(db, batch, total_fetched)
+                batch = []
+                await asyncio.sleep(Config.DISCORD_RATE_LIMIT_DELAY)
+
+        if batch:
+            self._save_batch(db, batch, total_fetched)
+
+    def _history_floor(self) -> datetime:
+        """Where a channel with no checkpoint starts: the clan founding date, or an earlier start_date."""
+        floor = Config.CLAN_FOUNDING_DATE
+        start = TimestampHelper.to_utc(self.start_date) if self.start_date else None
+        return min(floor, start) if start else floor
+
+    def _advance_checkpoint(self, db, batch):
+        """Move the channel's high-water mark to the newest message in the batch (same transaction)."""
+        newest = max(batch, key=lambda m: m['id'])
+        db.merge(DiscordChannelCheckpoint(
+            channel_id=newest['channel_id'],
+            channel_name=newest['channel_name'],
+            guild_id=newest['guild_id'],
+            last_message_id=newest['id'],
+            last_message_at=newest['created_at'],
+            updated_at=datetime.now(timezone.utc),
+        ))
+
+    def _resolve_authors(self, db, names) -> Dict[str, Optional[int]]:
+        """Resolve each distinct author name once: shared identity index first, UserAccessService for misses."""
+        if getattr(self, '_unresolved', None) is None:
+            self._unresolved = set()
+
+        index = IdentityIndex.for_session(db)
+        resolved = index.resolve_many(db, names)
+        user_service = None
+        for name, member_id in resolved.items():
+            key = UsernameNormalizer.normalize(name, for_comparison=True)
+            if member_id is None and key and key not in self._unresolved:
+                user_service = user_service or UserAccessService(db, identity_index=index)
+                try:
+                    resolved[name] = user_service.resolve_user_id(name)
+                except Exception as e:
+                    logger.debug(f"Could not resolve user_id for '{name}': {e}")
+                if resolved[name] is None:
+                    self._unresolved.add(key)
+        return resolved
+
     def _save_batch(self, db, batch, current_total=None):
+        """Resolve authors, write a batch of message rows (dicts) with one INSERT OR IGNORE and roll up the new ones."""
+        save_start = time.perf_counter()
         try:
-            # Use UserAccessService for consistent user resolution
-            user_service = UserAccessService(db)
-            
-            for msg in batch:
-                # Resolve member_id via UserAccessService for consistency
-                if msg.author_name:
-                    try:
-                        user_id = user_service.resolve_user_id(msg.author_name)
-                        msg.user_id = user_id
-                    except Exception as e:
-                        logger.debug(f"Could not resolve user_id for '{msg.author_name}': {e}")
-                        # Fallback to legacy method
-                        member_id = resolve_member_by_name(db, msg.author_name)
-                        msg.user_id = member_id
-                
-                db.merge(msg) 
+            authors = self._resolve_authors(db, {m['author_name'] for m in batch if m['author_name']})
+            for m in batch:
+                m['user_id'] = authors.get(m['author_name'])
+
+            # Messages already stored are left untouched; RETURNING yields only the new ids.
+            # insert_seq (MAX + 1) is computed under the write lock, so it follows commit order;
+            # name_matcher reads new authors past it (snowflake ids interleave across channels).
+            table = DiscordMessage.__table__
+            next_seq = select(func.coalesce(func.max(table.c.insert_seq), 0) + 1).scalar_subquery()
+            stmt = insert(table).values(insert_seq=next_seq).prefix_with("OR IGNORE").returning(table.c.id)
+            new_ids = set(db.execute(stmt, batch).scalars().all()) if batch else set()
+            telemetry.count("discord_messages", len(batch))
+            telemetry.count("discord_messages_new", len(new_ids))
+            REGISTRY.counter("discord_messages_total").inc(len(batch))
+            REGISTRY.counter("discord_messages_new_total").inc(len(new_ids))
+            if batch:
+                record_messages(db, [m for m in batch if m['id'] in new_ids])
+                self._advance_checkpoint(db, batch)
             db.commit()
+            REGISTRY.histogram("discord_batch_save_seconds").observe(time.perf_counter() - save_start)
             
+            inserted = len(new_ids)
             total_str = f" (Total: {current_total})" if current_total else ""
-            logger.info(f"Saved {len(batch)} messages{total_str}.")
-            # self.fetched_messages.extend(batch) # optimization: don't hold in memory
+            logger.info(f"Saved {inserted} messages, {len(batch) - inserted} already stored{total_str}.")
         except Exception as e:
+            # Re-raise so the channel stops here: a later batch would move its checkpoint past these messages
             logger.error(f"DB Error: {e}")
             db.rollback()
+            raise
 
     async def send_summary_embed(self, channel_id, stats):
         """
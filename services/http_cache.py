@@ -0,0 +1,229 @@
+"""
+Persistent HTTP Response Cache
+==============================
+
+SQLite-backed cache for WOM API responses, shared across `main.py` stages
+(each stage runs in a fresh subprocess, so the in-memory `WOMClient._cache`
+always starts cold).
+
+- Keys are `WOMClient._get_cache_key(endpoint, params)`
+- Bodies are stored as zlib-compressed JSON
+- TTLs are chosen per endpoint (see `DEFAULT_TTL_RULES`)
+- Eviction is LRU by total compressed byte size
+- Expired entries that carry an ETag / Last-Modified are kept so the client
+  can revalidate them with a conditional GET (a 304 just refreshes the TTL)
+
+Usage:
+    cache = PersistentHTTPCache("data/wom_cache.db", max_bytes=64 * 1024 * 1024)
+    entry = cache.get(key)
+    if entry and entry.fresh:
+        return entry.body
+    ...
+    cache.set(key, endpoint, body, etag=resp.headers.get('ETag'))
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger("HTTPCache")
+
+# (endpoint regex, ttl seconds). First match wins.
+DEFAULT_TTL_RULES: List[Tuple[str, int]] = [
+    (r'^/players/[^/]+/names$', 7 * 86400),    # name changes are append-only and rare
+    (r'^/players/[^/]+/snapshots$', 3600),      # history pages; re-runs within the hour are free
+    (r'^/players/[^/]+/gained$', 3600),
+    (r'^/players/[^/]+$', 900),
+    (r'^/names$', 86400),
+    (r'^/groups/[^/]+$', 300),                  # roster changes matter; keep short
+    (r'^/groups/[^/]+/', 300),
+]
+
+
+@dataclass
+class CacheEntry:
+    body: Any
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def revalidatable(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class PersistentHTTPCache:
+    """
+    On-disk response cache with per-endpoint TTLs and byte-size LRU eviction.
+
+    Args:
+        path: SQLite file for the cache (separate from the clan database).
+        max_bytes: Upper bound on the sum of compressed body sizes.
+        default_ttl: TTL for endpoints that match no rule.
+        ttl_rules: Optional (regex, ttl) list overriding DEFAULT_TTL_RULES.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, default_ttl: int = 300,
+                 ttl_rules: Optional[List[Tuple[str, int]]] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._rules = [(re.compile(p), ttl) for p, ttl in (ttl_rules or DEFAULT_TTL_RULES)]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS http_cache (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_http_cache_last_access ON http_cache(last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+
+    def ttl_for(self, endpoint: str) -> int:
+        for pattern, ttl in self._rules:
+            if pattern.search(endpoint):
+                return ttl
+        return self.default_ttl
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Return the entry for `key`, or None.
+
+        Expired entries are returned only if they can be revalidated; callers
+        check `entry.fresh` before using the body without a request.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, expires_at FROM http_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            body, etag, last_modified, expires_at = row
+            if expires_at <= time.time() and not (etag or last_modified):
+                self._delete(key)
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE http_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+        try:
+            entry = CacheEntry(json.loads(zlib.decompress(body)), etag, last_modified, expires_at)
+        except (zlib.error, ValueError) as e:
+            logger.warning(f"Dropping corrupt cache entry {key}: {e}")
+            self.invalidate(key)
+            return None
+        if entry.fresh:
+            self.hits += 1
+        return entry
+
+    def set(self, key: str, endpoint: str, body: Any, etag: Optional[str] = None,
+            last_modified: Optional[str] = None) -> None:
+        blob = zlib.compress(json.dumps(body, separators=(',', ':')).encode('utf-8'))
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._delete(key)
+            self._conn.execute(
+                "INSERT INTO http_cache (key, endpoint, body, size, etag, last_modified, stored_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, blob, len(blob), etag, last_modified, now, now + self.ttl_for(endpoint), now),
+            )
+            self._total_bytes += len(blob)
+            self._evict()
+            self._conn.commit()
+
+    def refresh(self, key: str, endpoint: str) -> None:
+        """Extend an entry's TTL after a 304 Not Modified."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE http_cache SET expires_at = ?, last_access = ? WHERE key = ?",
+                (now + self.ttl_for(endpoint), now, key),
+            )
+            self._conn.commit()
+        self.revalidated += 1
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._delete(key)
+            self._conn.commit()
+
+    def _delete(self, key: str) -> None:
+        row = self._conn.execute("SELECT size FROM http_cache WHERE key = ?", (key,)).fetchone()
+        if row:
+            self._conn.execute("DELETE FROM http_cache WHERE key = ?", (key,))
+            self._total_bytes -= row[0]
+
+    def _evict(self) -> None:
+        """Drop least-recently-used entries until the cache fits in max_bytes."""
+        if self._total_bytes <= self.max_bytes:
+            return
+        victims = []
+        freed = 0
+        for key, size in self._conn.execute("SELECT key, size FROM http_cache ORDER BY last_access ASC"):
+            if self._total_bytes - freed <= self.max_bytes:
+                break
+            victims.append((key,))
+            freed += size
+        self._conn.executemany("DELETE FROM http_cache WHERE key = ?", victims)
+        self._total_bytes -= freed
+        self.evictions += len(victims)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def get_stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidated': self.revalidated,
+            'evictions': self.evictions,
+            'bytes': self._total_bytes,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,8 +1,10 @@
 import logging
+import weakref
 from datetime import datetime, UTC
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterable
 
 import requests
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
 from core.config import Config
@@ -11,6 +13,21 @@ from database.models import PlayerNameAlias, ClanMember
 
 logger = logging.getLogger("IdentityService")
 
+# Bumped whenever clan_members / player_name_aliases change; IdentityIndex reloads when it moves
+_identity_version = 0
+
+
+def bump_identity_version() -> int:
+    """Invalidate every IdentityIndex (call after writing members or aliases outside the ORM)."""
+    global _identity_version
+    _identity_version += 1
+    return _identity_version
+
+
+def identity_version() -> int:
+    """Current identity version; caches built from members/aliases compare against it."""
+    return _identity_version
+
 
 def _now() -> datetime:
     # Use timezone-aware UTC timestamps to avoid comparison issues
@@ -52,6 +69,7 @@ def upsert_alias(
         alias.is_current = bool(is_current)
         db.add(alias)
         db.commit()
+        bump_identity_version()
         db.refresh(alias)
         return alias
 
@@ -68,6 +86,7 @@ def upsert_alias(
     )
     db.add(alias)
     db.commit()
+    bump_identity_version()
     db.refresh(alias)
     return alias
 
@@ -80,18 +99,109 @@ def resolve_member_by_name(db: Session, name: str) -> Optional[int]:
     """
     if not name:
         return None
+    return IdentityIndex.for_session(db).resolve(db, name)
 
-    norm = UsernameNormalizer.normalize(name, for_comparison=True)
-    if not norm:
-        return None
 
-    alias = db.query(PlayerNameAlias).filter(PlayerNameAlias.normalized_name == norm).one_or_none()
-    if alias:
-        return alias.member_id
+def load_identity_map(db: Session) -> Dict[str, int]:
+    """
+    Preload every known name -> `ClanMember.id` in two queries.
+
+    Keys are `UsernameNormalizer.normalize` output; aliases win over usernames,
+    matching the lookup order of `resolve_member_by_name`.
+    """
+    identity: Dict[str, int] = {}
+    for username, member_id in db.query(ClanMember.username, ClanMember.id).all():
+        norm = UsernameNormalizer.normalize(username, for_comparison=True)
+        if norm:
+            identity[norm] = member_id
+    for normalized_name, member_id in db.query(PlayerNameAlias.normalized_name, PlayerNameAlias.member_id).all():
+        if normalized_name and member_id is not None:
+            identity[normalized_name] = member_id
+    return identity
+
+
+class IdentityIndex:
+    """
+    In-memory name -> `ClanMember.id` index over clan_members and player_name_aliases.
+
+    Keys are `UsernameNormalizer.normalize` output. One index is shared per engine
+    (`IdentityIndex.for_session`) and reloads lazily when the identity version
+    changes: `upsert_alias`, the roster sync and any ORM flush touching
+    ClanMember / PlayerNameAlias bump it. Misses fall back to one batched
+    lookup, so rows written by raw SQL elsewhere are still found.
+    """
 
-    # Fallback: resolve directly from ClanMember on normalized username
-    member = db.query(ClanMember).filter(ClanMember.username == norm).one_or_none()
-    return member.id if member else None
+    _by_engine: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    def __init__(self):
+        self._names: Dict[str, int] = {}
+        self._version = -1
+        self.loads = 0
+        self.hits = 0
+        self.lookups = 0
+
+    @classmethod
+    def for_session(cls, db: Session) -> "IdentityIndex":
+        engine = db.get_bind()
+        index = cls._by_engine.get(engine)
+        if index is None:
+            index = cls._by_engine[engine] = cls()
+        return index
+
+    def _ensure_loaded(self, db: Session) -> None:
+        if self._version != identity_version():
+            version = identity_version()
+            self._names = load_identity_map(db)
+            self._version = version
+            self.loads += 1
+
+    def resolve(self, db: Session, name: str) -> Optional[int]:
+        return self.resolve_many(db, [name]).get(name)
+
+    def resolve_many(self, db: Session, names: Iterable[str]) -> Dict[str, Optional[int]]:
+        """Resolve many names at once: hash lookups, plus one query pair for all misses."""
+        self._ensure_loaded(db)
+        results: Dict[str, Optional[int]] = {}
+        missing: Dict[str, List[str]] = {}
+        for name in names:
+            key = UsernameNormalizer.normalize(name, for_comparison=True) if name else ""
+            member_id = self._names.get(key) if key else None
+            results[name] = member_id
+            if member_id is not None:
+                self.hits += 1
+            elif key:
+                missing.setdefault(key, []).append(name)
+
+        if missing:
+            self.lookups += 1
+            for key, member_id in self._lookup(db, list(missing)).items():
+                self._names[key] = member_id
+                for name in missing[key]:
+                    results[name] = member_id
+        return results
+
+    def _lookup(self, db: Session, keys: List[str]) -> Dict[str, int]:
+        found: Dict[str, int] = {}
+        for i in range(0, len(keys), 900):  # stay under SQLite's bound-parameter limit
+            chunk = keys[i:i + 900]
+            for key, member_id in db.query(PlayerNameAlias.normalized_name, PlayerNameAlias.member_id).filter(
+                    PlayerNameAlias.normalized_name.in_(chunk)).all():
+                if member_id is not None:
+                    found[key] = member_id
+            remaining = [k for k in chunk if k not in found]
+            if remaining:
+                for username, member_id in db.query(ClanMember.username, ClanMember.id).filter(
+                        ClanMember.username.in_(remaining)).all():
+                    found[username] = member_id
+        return found
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_identity_on_flush(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (ClanMember, PlayerNameAlias)):
+            bump_identity_version()
+            return
 
 
 def _wom_headers() -> Dict[str, str]:
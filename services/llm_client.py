@@ -19,6 +19,9 @@ from enum import Enum
 import requests
 from dotenv import load_dotenv
 
+from core import telemetry
+from core.metrics import REGISTRY
+
 load_dotenv()
 
 logger = logging.getLogger("LLMClient")
@@ -224,6 +227,7 @@ class UnifiedLLMClient:
         errors = []
         
         for provider in providers:
+            request_start = None
             try:
                 # Attempt to use this provider
                 logger.info(f"Attempting generation with {provider.value}...")
@@ -231,12 +235,21 @@ class UnifiedLLMClient:
                 if not client:
                     continue
                     
+                telemetry.count("llm_requests")
+                request_start = time.perf_counter()
                 response = client.generate(prompt, max_tokens, temperature)
+                REGISTRY.histogram("llm_request_seconds", provider=provider.value,
+                                   outcome="ok").observe(time.perf_counter() - request_start)
                 logger.info(f"✅ Success with {provider.value}")
                 return response
                 
             except Exception as e:
+                if request_start is not None:
+                    REGISTRY.histogram("llm_request_seconds", provider=provider.value,
+                                       outcome="error").observe(time.perf_counter() - request_start)
                 error_msg = f"{provider.value} failed: {str(e)}"
+                if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
+                    telemetry.count("llm_429")
                 logger.warning(error_msg)
                 errors.append(error_msg)
                 continue
@@ -0,0 +1,195 @@
+"""
+Trigram fuzzy matcher for player / Discord author names.
+
+Replaces the `author_name ILIKE '%name%'` scan over discord_messages: the
+distinct names that already map to a member (clan usernames, aliases and
+resolved Discord authors) are loaded once into an in-memory trigram index,
+and lookups only score candidates that share a trigram with the query.
+
+Scoring is pg_trgm-style word similarity: the share of the query's (unpadded)
+trigrams found in a candidate, so a name contained in a longer Discord nickname
+scores 1.0 like the old substring match, and near-misses score proportionally.
+"""
+
+import logging
+import weakref
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from core.config import Config
+from core.usernames import UsernameNormalizer
+from database.models import ClanMember, DiscordMessage, PlayerNameAlias
+from services.identity_service import identity_version
+
+logger = logging.getLogger("NameMatcher")
+
+
+def trigrams(name: str) -> Set[str]:
+    """Padded character trigrams of an already-normalized name."""
+    if not name:
+        return set()
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _inner_trigrams(name: str) -> Set[str]:
+    """Unpadded trigrams: all present in any candidate that contains `name`."""
+    return {name[i:i + 3] for i in range(len(name) - 2)}
+
+
+@dataclass(frozen=True)
+class NameMatch:
+    name: str
+    member_id: int
+    score: float       # share of the query's inner trigrams found in `name`
+    similarity: float  # shared / union trigrams, used to rank equal scores
+
+
+class TrigramNameMatcher:
+    """
+    In-memory trigram index of normalized name -> member id.
+
+    Use `for_session` to share one index per engine; it rebuilds when the
+    identity version moves (see `services.identity_service`).
+    """
+
+    _by_engine: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    def __init__(self, names: Optional[Dict[str, int]] = None):
+        self._version = -1
+        # Resolved Discord authors, kept between rebuilds and extended past this insert_seq
+        self._discord_names: Dict[str, int] = {}
+        self._discord_seq: Optional[int] = None
+        self._index(names or {})
+
+    def _index(self, names: Dict[str, int]) -> None:
+        self._names: List[str] = []
+        self._members: List[int] = []
+        self._grams: List[int] = []
+        self._postings: Dict[str, List[int]] = {}
+        for name, member_id in names.items():
+            self.add(name, member_id)
+
+    @classmethod
+    def for_session(cls, db: Session) -> "TrigramNameMatcher":
+        engine = db.get_bind()
+        matcher = cls._by_engine.get(engine)
+        if matcher is None:
+            matcher = cls._by_engine[engine] = cls()
+        if matcher._version != identity_version():
+            matcher.load(db)
+        return matcher
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, name: str, member_id: int) -> None:
+        key = UsernameNormalizer.normalize(name, for_comparison=True)
+        grams = trigrams(key)
+        if not grams:
+            return
+        slot = len(self._names)
+        self._names.append(key)
+        self._members.append(member_id)
+        self._grams.append(len(grams))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(slot)
+
+    def load(self, db: Session) -> None:
+        """
+        (Re)build from member names, aliases and Discord authors that already resolved.
+
+        Members and aliases are small and re-read on every rebuild. Discord authors
+        are scanned in full on the first build; later rebuilds (every identity
+        version bump, e.g. each member flush during a harvest) only read messages
+        inserted since, an index range on `insert_seq`. That counter follows commit
+        order, unlike snowflake ids, which interleave across concurrently harvested
+        channels. Outside migrations, messages get their user_id at insert and keep
+        it, so authors already read never need re-reading.
+        """
+        version = identity_version()
+        # Taken before the scan: rows committed meanwhile are read again next time, never skipped
+        seq = db.execute(select(func.max(DiscordMessage.insert_seq))).scalar() or 0
+        authors = (
+            select(DiscordMessage.author_name, DiscordMessage.user_id)
+            .where(DiscordMessage.user_id.isnot(None))
+            .group_by(DiscordMessage.author_name, DiscordMessage.user_id)
+        )
+        if self._discord_seq is not None:
+            authors = authors.where(DiscordMessage.insert_seq > self._discord_seq)
+        for name, member_id in db.execute(authors).all():
+            key = UsernameNormalizer.normalize(name, for_comparison=True)
+            if key:
+                self._discord_names[key] = member_id
+        self._discord_seq = seq
+
+        names: Dict[str, int] = dict(self._discord_names)
+        sources = (
+            select(ClanMember.username, ClanMember.id),
+            select(PlayerNameAlias.normalized_name, PlayerNameAlias.member_id)
+            .where(PlayerNameAlias.member_id.isnot(None)),
+        )
+        for stmt in sources:
+            for name, member_id in db.execute(stmt).all():
+                key = UsernameNormalizer.normalize(name, for_comparison=True)
+                if key:
+                    names[key] = member_id
+
+        self._index(names)
+        self._version = version
+        logger.debug(f"Trigram index built over {len(self)} names")
+
+    def match(self, name: str, threshold: Optional[float] = None, limit: int = 5) -> List[NameMatch]:
+        """Ranked candidates scoring at least `threshold` (Config.FUZZY_MATCH_THRESHOLD by default)."""
+        if threshold is None:
+            threshold = Config.FUZZY_MATCH_THRESHOLD
+        key = UsernameNormalizer.normalize(name, for_comparison=True)
+        query = trigrams(key)
+        if not query:
+            return []
+        # Names under 3 characters have no inner trigrams; score them on padded ones
+        inner = _inner_trigrams(key) or query
+
+        shared: Counter = Counter()
+        contained: Counter = Counter()
+        for gram in query:
+            is_inner = gram in inner
+            for slot in self._postings.get(gram, ()):
+                shared[slot] += 1
+                if is_inner:
+                    contained[slot] += 1
+
+        scored = []
+        for slot, common in shared.items():
+            score = contained[slot] / len(inner)
+            if score >= threshold:
+                similarity = common / (len(query) + self._grams[slot] - common)
+                scored.append((score, similarity, slot))
+        scored.sort(key=lambda s: (-s[0], -s[1], self._names[s[2]]))
+        return [NameMatch(self._names[slot], self._members[slot], round(score, 4), round(similarity, 4))
+                for score, similarity, slot in scored[:limit]]
+
+    def best(self, name: str, threshold: Optional[float] = None) -> Optional[int]:
+        """Member id of the top candidate, or None if nothing clears the threshold or the top is ambiguous."""
+        matches = self.match(name, threshold, limit=2)
+        if not matches:
+            return None
+        top = matches[0]
+        if len(matches) > 1:
+            runner_up = matches[1]
+            if runner_up.member_id != top.member_id and \
+                    (runner_up.score, runner_up.similarity) == (top.score, top.similarity):
+                logger.debug(f"Ambiguous fuzzy match for '{name}': {top.name} / {runner_up.name}")
+                return None
+        return top.member_id
+
+    def match_many(self, names: Iterable[str], threshold: Optional[float] = None,
+                   limit: int = 5) -> Dict[str, List[NameMatch]]:
+        return {name: self.match(name, threshold, limit) for name in names}
+
+    def best_many(self, names: Iterable[str], threshold: Optional[float] = None) -> Dict[str, Optional[int]]:
+        return {name: self.best(name, threshold) for name in names}
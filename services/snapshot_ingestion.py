@@ -0,0 +1,429 @@
+"""
+Snapshot Ingestion Engine
+=========================
+
+Batched writer for WOM snapshot histories.
+
+The old save loop issued an existence SELECT, an ORM add and a flush per
+snapshot, then one INSERT per boss row. This engine buffers parsed snapshots
+and writes each chunk with:
+
+- one multi-row `INSERT OR IGNORE ... RETURNING id` into `wom_snapshots`
+  (duplicates are rejected by the UNIQUE (username, timestamp) index)
+- one `executemany` into `boss_snapshots` for every newly inserted snapshot
+- one `executemany` each into `skill_snapshots` / `activity_snapshots`, so
+  readers never have to parse `raw_data` again
+- one `executemany` touching `clan_members.last_updated`
+
+Snapshots whose content (skills/bosses/activities) matches one already stored
+for the same player - an offline player re-snapshotted - are written as
+reference rows: `content_hash` + `ref_snapshot_id` pointing at the row that
+holds raw_data and the boss/skill rows (Config.WOM_SNAPSHOT_DEDUP).
+
+Usage:
+    ingestor = SnapshotIngestor(db_session)
+    for username, member_id, snapshots in results:
+        ingestor.add_player(username, member_id, snapshots)
+    stats = ingestor.finish()
+    print(stats.summary())
+"""
+
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from core.config import Config
+from core.timestamps import TimestampHelper
+from database.raw_payload import RawPayloadCodec, load_raw_data
+from database.models import ActivitySnapshot, BossSnapshot, ClanMember, SkillSnapshot, WOMSnapshot
+
+logger = logging.getLogger("SnapshotIngestion")
+
+UNIQUE_SNAPSHOT_INDEX = "uq_wom_snapshots_user_ts"
+
+
+@dataclass
+class ParsedSnapshot:
+    """A WOM snapshot payload reduced to the columns we persist."""
+    timestamp: datetime  # naive UTC, matches how SQLite stores DateTime
+    total_xp: int
+    total_boss_kills: int
+    raw_json: str
+    bosses: List[Tuple[str, int, int]]  # (boss_name, kills, rank)
+    skills: List[Tuple[str, int, int, int]] = field(default_factory=list)  # (skill, level, experience, rank)
+    activities: List[Tuple[str, int, int]] = field(default_factory=list)  # (activity, score, rank)
+    content_hash: Optional[str] = None  # of the 'data' block; equal hashes = nothing changed
+
+
+def content_hash(snap_data: Dict[str, Any]) -> str:
+    """Stable digest of a snapshot's data block (key order independent)."""
+    return hashlib.blake2b(json.dumps(snap_data, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def extract_skill_rows(snap_data: Dict[str, Any]) -> Tuple[List[Tuple[str, int, int, int]], List[Tuple[str, int, int]]]:
+    """(skills, activities) rows from a snapshot's `data` block."""
+    skills = [
+        (name, val.get('level', 0), val.get('experience', 0), val.get('rank', 0))
+        for name, val in (snap_data.get('skills') or {}).items()
+    ]
+    activities = [
+        (name, val.get('score', -1), val.get('rank', 0))
+        for name, val in (snap_data.get('activities') or {}).items()
+        if val.get('score', -1) > -1
+    ]
+    return skills, activities
+
+
+def parse_wom_snapshot(snap: Dict[str, Any]) -> Optional[ParsedSnapshot]:
+    """Parse one `/players/{username}/snapshots` entry. Returns None if unusable."""
+    created_at = snap.get('createdAt')
+    if not created_at:
+        return None
+
+    try:
+        ts_dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        ts_dt = TimestampHelper.to_utc(ts_dt)
+        if ts_dt is None:
+            return None
+    except Exception:
+        return None
+
+    snap_data = snap.get('data', {}) or {}
+    skills = snap_data.get('skills', {}) or {}
+    bosses = snap_data.get('bosses', {}) or {}
+
+    xp = skills.get('overall', {}).get('experience', 0)
+    total_boss = sum(b.get('kills', 0) for b in bosses.values() if b.get('kills', 0) > 0)
+
+    boss_rows = []
+    for b_name, b_val in bosses.items():
+        kills = b_val.get('kills', -1)
+        if kills > -1:
+            boss_rows.append((b_name, kills, b_val.get('rank', 0)))
+
+    skill_rows, activity_rows = extract_skill_rows(snap_data)
+
+    return ParsedSnapshot(
+        timestamp=ts_dt.astimezone(timezone.utc).replace(tzinfo=None),
+        total_xp=xp,
+        total_boss_kills=total_boss,
+        raw_json=json.dumps(snap),
+        bosses=boss_rows,
+        skills=skill_rows,
+        activities=activity_rows,
+        content_hash=content_hash(snap_data),
+    )
+
+
+@dataclass
+class IngestStats:
+    """Counters reported at the end of an ingestion run."""
+    snapshots_inserted: int = 0
+    duplicates_skipped: int = 0
+    invalid_skipped: int = 0
+    boss_rows: int = 0
+    skill_rows: int = 0
+    unchanged_refs: int = 0
+    chunks: int = 0
+    commits: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_written(self) -> int:
+        return self.snapshots_inserted + self.boss_rows + self.skill_rows
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows_written / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"Saved {self.snapshots_inserted} snapshots, {self.boss_rows} boss records and "
+                f"{self.skill_rows} skill/activity records "
+                f"({self.unchanged_refs} unchanged snapshots stored as references, "
+                f"{self.duplicates_skipped} duplicates skipped) in {self.elapsed:.2f}s "
+                f"[{self.rows_per_sec:,.0f} rows/sec, {self.chunks} chunks, {self.commits} commits]")
+
+
+@dataclass
+class _PendingSnapshot:
+    username: str
+    member_id: Optional[int]
+    parsed: ParsedSnapshot
+
+
+class SnapshotIngestor:
+    """
+    Buffers parsed snapshots and writes them in chunks.
+
+    Args:
+        db_session: SQLAlchemy session; the engine writes through its connection
+                    and commits every `commit_interval` chunks.
+        chunk_size: Snapshots per INSERT batch (default Config.WOM_INGEST_CHUNK_SIZE).
+        commit_interval: Chunks per COMMIT (default Config.WOM_INGEST_COMMIT_INTERVAL).
+    """
+
+    def __init__(self, db_session: Session, chunk_size: Optional[int] = None,
+                 commit_interval: Optional[int] = None):
+        self.db = db_session
+        self.chunk_size = max(1, int(chunk_size or Config.WOM_INGEST_CHUNK_SIZE))
+        self.commit_interval = max(1, int(commit_interval or Config.WOM_INGEST_COMMIT_INTERVAL))
+        self.stats = IngestStats()
+        self._buffer: List[_PendingSnapshot] = []
+        self._chunks_since_commit = 0
+        self._started = time.perf_counter()
+        self.dedup = Config.WOM_SNAPSHOT_DEDUP
+        # Opt-in compressed raw_data (Config.RAW_DATA_COMPRESSION)
+        self._codec = RawPayloadCodec.for_session(db_session) if Config.RAW_DATA_COMPRESSION == 'zlib' else None
+        self._has_unique_index = self._detect_unique_index()
+
+    def _detect_unique_index(self) -> bool:
+        """Whether (username, timestamp) is UNIQUE, so INSERT OR IGNORE can dedupe."""
+        indexes = self.db.execute(text("PRAGMA index_list(wom_snapshots)")).all()
+        if any(row[1] == UNIQUE_SNAPSHOT_INDEX and row[2] for row in indexes):
+            return True
+        # Created by the dedup_snaps_002 migration (not by Base.metadata.create_all)
+        logger.warning(f"{UNIQUE_SNAPSHOT_INDEX} is missing; run `alembic upgrade head`. "
+                       "Falling back to per-chunk duplicate filtering.")
+        return False
+
+    def add_player(self, username: str, member_id: Optional[int], snapshots: List[Dict[str, Any]]) -> int:
+        """Parse and buffer a player's snapshots. Returns how many were buffered."""
+        buffered = 0
+        for snap in snapshots or []:
+            parsed = parse_wom_snapshot(snap)
+            if parsed is None:
+                self.stats.invalid_skipped += 1
+                continue
+            self._buffer.append(_PendingSnapshot(username, member_id, parsed))
+            buffered += 1
+            if len(self._buffer) >= self.chunk_size:
+                self.flush()
+        return buffered
+
+    def _filter_existing(self, pending: List[_PendingSnapshot]) -> List[_PendingSnapshot]:
+        """Fallback dedupe (one query per chunk) when the UNIQUE index is unavailable."""
+        usernames = list({p.username for p in pending})
+        rows = self.db.execute(
+            select(WOMSnapshot.username, WOMSnapshot.timestamp).where(WOMSnapshot.username.in_(usernames))
+        ).all()
+        existing = {(u, ts) for u, ts in rows}
+        fresh = []
+        for p in pending:
+            key = (p.username, p.parsed.timestamp)
+            if key in existing:
+                continue
+            existing.add(key)
+            fresh.append(p)
+        return fresh
+
+    def _stored_hashes(self, pending: List[_PendingSnapshot]) -> Dict[Tuple[str, str], int]:
+        """(username, content_hash) -> id of the stored row holding that content."""
+        hashes = list({p.parsed.content_hash for p in pending if p.parsed.content_hash})
+        if not hashes:
+            return {}
+        rows = self.db.execute(
+            select(WOMSnapshot.username, WOMSnapshot.content_hash, func.min(WOMSnapshot.id))
+            .where(WOMSnapshot.content_hash.in_(hashes))
+            .where(WOMSnapshot.username.in_(list({p.username for p in pending})))
+            .where(WOMSnapshot.ref_snapshot_id.is_(None))
+            .group_by(WOMSnapshot.username, WOMSnapshot.content_hash)
+        ).all()
+        return {(u, h): sid for u, h, sid in rows}
+
+    def _insert(self, conn, pending: List[_PendingSnapshot],
+                refs: Optional[Dict[int, int]] = None) -> List[Tuple[int, str, datetime]]:
+        """INSERT OR IGNORE the rows; with `refs` (id(pending) -> snapshot id) as reference rows without raw_data."""
+        if not pending:
+            return []
+        snaps_table = WOMSnapshot.__table__
+        stmt = (
+            insert(snaps_table)
+            .prefix_with("OR IGNORE")
+            .returning(snaps_table.c.id, snaps_table.c.username, snaps_table.c.timestamp)
+        )
+        rows = []
+        for p in pending:
+            ref = refs.get(id(p)) if refs else None
+            raw = None if ref is not None else (
+                self._codec.encode(p.parsed.raw_json) if self._codec else p.parsed.raw_json)
+            rows.append({
+                'username': p.username,
+                'timestamp': p.parsed.timestamp,
+                'total_xp': p.parsed.total_xp,
+                'total_boss_kills': p.parsed.total_boss_kills,
+                'ehp': 0,
+                'ehb': 0,
+                'raw_data': raw,
+                'user_id': p.member_id,
+                'content_hash': p.parsed.content_hash,
+                'ref_snapshot_id': ref,
+            })
+        return [tuple(r) for r in conn.execute(stmt, rows).all()]
+
+    def flush(self) -> None:
+        """Write the buffered chunk."""
+        if not self._buffer:
+            return
+        pending, self._buffer = self._buffer, []
+        candidates = pending if self._has_unique_index else self._filter_existing(pending)
+
+        conn = self.db.connection()
+        by_key = {(p.username, p.parsed.timestamp): p for p in candidates}
+        inserted: List[Tuple[int, str, datetime]] = []
+        ref_inserted: List[Tuple[int, str, datetime]] = []
+
+        if candidates:
+            canonical = self._stored_hashes(candidates) if self.dedup else {}
+            full, later, refs = [], [], {}
+            seen = set()
+            for p in candidates:
+                key = (p.username, p.parsed.content_hash)
+                if not self.dedup or p.parsed.content_hash is None:
+                    full.append(p)
+                elif key in canonical:
+                    refs[id(p)] = canonical[key]
+                elif key in seen:
+                    later.append(p)  # same content as an earlier snapshot in this chunk
+                else:
+                    seen.add(key)
+                    full.append(p)
+
+            inserted = self._insert(conn, full)
+            for snap_id, username, ts in inserted:
+                digest = by_key[(username, ts)].parsed.content_hash
+                if digest is not None:
+                    canonical.setdefault((username, digest), snap_id)
+            # A chunk's first copy can be dropped as an existing (username, timestamp); store the rest in full
+            retry = []
+            for p in later:
+                key = (p.username, p.parsed.content_hash)
+                if key in canonical:
+                    refs[id(p)] = canonical[key]
+                else:
+                    retry.append(p)
+            inserted += self._insert(conn, retry)
+            ref_inserted = self._insert(conn, [p for p in candidates if id(p) in refs], refs)
+
+        boss_rows = []
+        skill_rows = []
+        activity_rows = []
+        touched_members = {by_key[(u, ts)].member_id for _, u, ts in ref_inserted} - {None}
+        for snap_id, username, ts in inserted:
+            p = by_key.get((username, ts))
+            if p is None:
+                continue
+            if p.member_id is not None:
+                touched_members.add(p.member_id)
+            boss_rows.extend(
+                {'snapshot_id': snap_id, 'wom_snapshot_id': snap_id,
+                 'boss_name': name, 'kills': kills, 'rank': rank}
+                for name, kills, rank in p.parsed.bosses
+            )
+            skill_rows.extend(
+                {'snapshot_id': snap_id, 'skill': name, 'level': level, 'experience': xp, 'rank': rank}
+                for name, level, xp, rank in p.parsed.skills
+            )
+            activity_rows.extend(
+                {'snapshot_id': snap_id, 'activity': name, 'score': score, 'rank': rank}
+                for name, score, rank in p.parsed.activities
+            )
+
+        if boss_rows:
+            conn.execute(insert(BossSnapshot.__table__), boss_rows)
+        if skill_rows:
+            conn.execute(insert(SkillSnapshot.__table__), skill_rows)
+        if activity_rows:
+            conn.execute(insert(ActivitySnapshot.__table__), activity_rows)
+
+        if touched_members:
+            # Mark successful scan for members that received new snapshots
+            members_table = ClanMember.__table__
+            now = datetime.now(timezone.utc)
+            conn.execute(
+                members_table.update()
+                .where(members_table.c.id == bindparam('member_id'))
+                .values(last_updated=bindparam('scanned_at')),
+                [{'member_id': mid, 'scanned_at': now} for mid in touched_members],
+            )
+
+        self.stats.snapshots_inserted += len(inserted) + len(ref_inserted)
+        self.stats.unchanged_refs += len(ref_inserted)
+        self.stats.duplicates_skipped += len(pending) - len(inserted) - len(ref_inserted)
+        self.stats.boss_rows += len(boss_rows)
+        self.stats.skill_rows += len(skill_rows) + len(activity_rows)
+        self.stats.chunks += 1
+        self._chunks_since_commit += 1
+
+        if self._chunks_since_commit >= self.commit_interval:
+            self.commit()
+
+    def commit(self) -> None:
+        self.db.commit()
+        self.stats.commits += 1
+        self._chunks_since_commit = 0
+
+    def finish(self) -> IngestStats:
+        """Flush remaining rows, commit, and return the final stats."""
+        self.flush()
+        if self._chunks_since_commit:
+            self.commit()
+        self.stats.elapsed = time.perf_counter() - self._started
+        logger.info(self.stats.summary())
+        return self.stats
+
+
+def backfill_skill_snapshots(db: Session, batch_size: int = 500) -> int:
+    """
+    Populate skill_snapshots / activity_snapshots for snapshots ingested before
+    those tables existed. Walks wom_snapshots by id, parsing each raw_data once.
+    Returns the number of snapshots backfilled.
+    """
+    snaps = WOMSnapshot.__table__
+    done = select(SkillSnapshot.snapshot_id).union(select(ActivitySnapshot.snapshot_id))
+    conn = db.connection()
+    last_id, backfilled = 0, 0
+
+    while True:
+        rows = conn.execute(
+            select(snaps.c.id, snaps.c.raw_data)
+            .where(snaps.c.id > last_id)
+            .where(snaps.c.ref_snapshot_id.is_(None))  # references share their source's rows
+            .where(snaps.c.id.not_in(done))
+            .order_by(snaps.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        skill_rows, activity_rows = [], []
+        for snap_id, raw in rows:
+            payload = load_raw_data(db, raw)
+            # Harvested rows wrap the player data in 'data'; older rows may not
+            skills, activities = extract_skill_rows(payload.get('data', payload) or {})
+            skill_rows.extend(
+                {'snapshot_id': snap_id, 'skill': name, 'level': level, 'experience': xp, 'rank': rank}
+                for name, level, xp, rank in skills
+            )
+            activity_rows.extend(
+                {'snapshot_id': snap_id, 'activity': name, 'score': score, 'rank': rank}
+                for name, score, rank in activities
+            )
+            backfilled += bool(skills or activities)
+
+        if skill_rows:
+            conn.execute(insert(SkillSnapshot.__table__), skill_rows)
+        if activity_rows:
+            conn.execute(insert(ActivitySnapshot.__table__), activity_rows)
+        db.commit()
+        conn = db.connection()
+        logger.info(f"Backfilled skills up to snapshot {last_id} ({backfilled} snapshots so far)")
+
+    return backfilled
@@ -36,6 +36,7 @@ from sqlalchemy.orm import Session
 from database.models import ClanMember, WOMSnapshot, DiscordMessage, PlayerNameAlias, BossSnapshot
 from core.usernames import UsernameNormalizer
 from core.config import Config
+from services.name_matcher import TrigramNameMatcher
 
 logger = logging.getLogger("UserAccessService")
 
@@ -73,8 +74,10 @@ class UserAccessService:
     Replaces inconsistent database access patterns identified in reliability audit.
     """
     
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, identity_index=None):
         self.db = db_session
+        # Optional services.identity_service.IdentityIndex answering steps 1-2 from memory
+        self.identity_index = identity_index
         self._user_id_cache: Dict[str, Optional[int]] = {}
         self._profile_cache: Dict[int, UserProfile] = {}
         
@@ -94,7 +97,7 @@ class UserAccessService:
         Resolution hierarchy:
         1. PlayerNameAlias table (handles username changes)
         2. Direct clan_members lookup (normalized username)
-        3. Discord author_name fuzzy matching (fallback)
+        3. Trigram fuzzy matching over known names (fallback, see services/name_matcher.py)
         
         Args:
             name: Any username variation (Discord author_name, WOM username, etc.)
@@ -117,39 +120,37 @@ class UserAccessService:
         user_id = None
         
         try:
-            # 1. Check PlayerNameAlias table (most accurate)
-            alias_stmt = select(PlayerNameAlias.member_id).where(
-                PlayerNameAlias.normalized_name == normalized
-            ).limit(1)
-            alias_result = self.db.execute(alias_stmt).scalar()
-            
-            if alias_result:
-                user_id = alias_result
-                logger.debug(f"Resolved '{name}' via PlayerNameAlias -> ID {user_id}")
+            if self.identity_index is not None:
+                # 1-2. Alias and member names, answered by the shared in-memory index
+                user_id = self.identity_index.resolve(self.db, normalized)
             else:
-                # 2. Direct clan_members lookup
-                member_stmt = select(ClanMember.id).where(
-                    ClanMember.username == normalized
+                # 1. Check PlayerNameAlias table (most accurate)
+                alias_stmt = select(PlayerNameAlias.member_id).where(
+                    PlayerNameAlias.normalized_name == normalized
                 ).limit(1)
-                member_result = self.db.execute(member_stmt).scalar()
-                
-                if member_result:
-                    user_id = member_result
-                    logger.debug(f"Resolved '{name}' via direct ClanMember -> ID {user_id}")
+                alias_result = self.db.execute(alias_stmt).scalar()
+
+                if alias_result:
+                    user_id = alias_result
+                    logger.debug(f"Resolved '{name}' via PlayerNameAlias -> ID {user_id}")
                 else:
-                    # 3. Fuzzy Discord author_name matching (last resort)
-                    discord_stmt = select(DiscordMessage.user_id).where(
-                        and_(
-                            DiscordMessage.author_name.ilike(f"%{normalized}%"),
-                            DiscordMessage.user_id.isnot(None)
-                        )
+                    # 2. Direct clan_members lookup
+                    member_stmt = select(ClanMember.id).where(
+                        ClanMember.username == normalized
                     ).limit(1)
-                    discord_result = self.db.execute(discord_stmt).scalar()
-                    
-                    if discord_result:
-                        user_id = discord_result
-                        logger.debug(f"Resolved '{name}' via Discord fuzzy match -> ID {user_id}")
-                        
+                    member_result = self.db.execute(member_stmt).scalar()
+
+                    if member_result:
+                        user_id = member_result
+                        logger.debug(f"Resolved '{name}' via direct ClanMember -> ID {user_id}")
+
+            if not user_id:
+                # 3. Fuzzy match against known member/alias/Discord names (trigram index, last resort)
+                user_id = TrigramNameMatcher.for_session(self.db).best(normalized)
+
+                if user_id:
+                    logger.debug(f"Resolved '{name}' via fuzzy name match -> ID {user_id}")
+
         except Exception as e:
             logger.error(f"Error resolving user_id for '{name}': {e}")
             user_id = None
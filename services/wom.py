@@ -1,18 +1,105 @@
 import asyncio
 import logging
+import time
 import aiohttp
 import json
-from datetime import datetime
+import math
+from collections import deque
+from datetime import datetime, timezone
+from core import telemetry
 from core.config import Config
+from core.metrics import REGISTRY
 from core.performance import retry_async, timed_operation
+from services.http_cache import PersistentHTTPCache
+
+class TokenBucket:
+    """
+    Async token bucket with AIMD (additive-increase, multiplicative-decrease) rate control.
+
+    Tokens refill at `rate_rpm / 60` per second up to `capacity` (burst size).
+    A 429 halves the rate (floored at `min_rpm`) and empties the bucket; every
+    success adds `increase_rpm` back until the configured `max_rpm` is reached.
+    """
+
+    def __init__(self, rate_rpm, capacity=1, min_rpm=1, decrease_factor=0.5, increase_rpm=1.0, clock=time.monotonic):
+        self.max_rpm = float(rate_rpm)
+        self.rate_rpm = float(rate_rpm)
+        self.min_rpm = float(min(min_rpm, rate_rpm))
+        self.capacity = max(1, int(capacity))
+        self.decrease_factor = decrease_factor
+        self.increase_rpm = increase_rpm
+        self._clock = clock
+        self._tokens = float(self.capacity)
+        self._last_refill = clock()
+        self._lock = None  # created lazily inside the running loop
+
+        # Stats
+        self._grants = deque()  # grant timestamps within the last 60s
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate_rpm / 60.0)
+        self._last_refill = now
+
+    async def acquire(self) -> float:
+        """Wait for a token. Returns the seconds spent waiting."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        start = self._clock()
+        # The lock keeps waiters FIFO: only the head of the queue sleeps on the refill
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                await asyncio.sleep((1 - self._tokens) * 60.0 / self.rate_rpm)
+
+        now = self._clock()
+        waited = now - start
+        self.acquired += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        self._grants.append(now)
+        while self._grants and now - self._grants[0] > 60:
+            self._grants.popleft()
+        return waited
+
+    def on_success(self):
+        if self.rate_rpm < self.max_rpm:
+            self.rate_rpm = min(self.max_rpm, self.rate_rpm + self.increase_rpm)
+
+    def on_throttle(self):
+        self._refill()
+        self.throttled += 1
+        self.rate_rpm = max(self.min_rpm, self.rate_rpm * self.decrease_factor)
+        self._tokens = 0.0
+
+    def get_stats(self) -> dict:
+        now = self._clock()
+        while self._grants and now - self._grants[0] > 60:
+            self._grants.popleft()
+        return {
+            'current_rpm': round(self.rate_rpm, 2),
+            'achieved_rpm': len(self._grants),
+            'requests': self.acquired,
+            'throttled': self.throttled,
+            'avg_wait_ms': round(1000 * self.total_wait / self.acquired, 2) if self.acquired else 0.0,
+            'max_wait_ms': round(1000 * self.max_wait, 2),
+        }
+
 
 class WOMClient:
     def __init__(self):
         self.api_key = Config.WOM_API_KEY
         self.base_url = Config.WOM_BASE_URL
-        self.rate_limit_delay = float(Config.WOM_RATE_LIMIT_DELAY or 0.67)
         self.target_rpm = int(Config.WOM_TARGET_RPM or 90)
         self.max_concurrent = int(Config.WOM_MAX_CONCURRENT or 5)
+        self._bucket = TokenBucket(self.target_rpm, capacity=Config.WOM_BURST, min_rpm=Config.WOM_MIN_RPM)
         self.user_agent = 'NevrLucky (Contact: partymarty94)'
         self.logger = logging.getLogger('WOMClient')
         self._session = None
@@ -20,9 +107,18 @@ class WOMClient:
         self._cache_ttl = 300
         self._max_cache_size = 1000  # BUG-001: Prevent unbounded growth
         self._rate_limit_hits = []
+        self._http_cache = None
+        if Config.WOM_CACHE_BACKEND == 'sqlite':
+            try:
+                self._http_cache = PersistentHTTPCache(Config.WOM_CACHE_PATH, max_bytes=Config.WOM_CACHE_MAX_BYTES)
+            except Exception as e:
+                self.logger.warning(f"Persistent WOM cache unavailable ({e}); using in-memory cache only")
         self._semaphore = None
-        self._last_request_time = 0
-        self._delay_lock = None
+        self._semaphore_wait = 0.0
+        self._inflight = {}  # cache_key -> Task of the request currently in flight
+        self._inflight_waiters = {}  # cache_key -> callers awaiting that task
+        self.coalesced_requests = 0
+        self.snapshot_page_counts = {}  # username -> pages read by the last snapshot fetch
         self._creation_lock = asyncio.Lock()  # Prevent concurrent session creation
 
     async def _get_session(self):
@@ -34,8 +130,6 @@ class WOMClient:
                 self._session = aiohttp.ClientSession(timeout=timeout)
         if self._semaphore is None:
             self._semaphore = asyncio.Semaphore(self.max_concurrent)
-        if self._delay_lock is None:
-            self._delay_lock = asyncio.Lock()
         return self._session
 
     async def close(self):
@@ -44,7 +138,15 @@ class WOMClient:
             recent_hits = [t for t in self._rate_limit_hits if asyncio.get_event_loop().time() - t < 3600]
             if recent_hits:
                 self.logger.warning(f"WOM Rate Limit Summary: {len(recent_hits)} hits in last hour")
+        stats = self.get_stats()
+        if stats['requests'] or stats['coalesced_requests']:
+            self.logger.info(f"WOM Request Stats: {stats}")
         
+        if self._http_cache is not None:
+            self.logger.info(f"WOM Cache Stats: {self._http_cache.get_stats()}")
+            self._http_cache.close()
+            self._http_cache = None
+
         if self._session and not self._session.closed:
             await self._session.close()
             # Wait for underlying connections to close properly
@@ -83,77 +185,130 @@ class WOMClient:
 
         self._cache[cache_key] = (asyncio.get_event_loop().time(), data)
 
-    def _adjust_rate_limit(self):
-        """Adaptively adjust rate limit based on 429 hits."""
-        now = asyncio.get_event_loop().time()
-        # Clean old hits (>5 minutes)
-        self._rate_limit_hits = [t for t in self._rate_limit_hits if now - t < 300]
-        
-        if len(self._rate_limit_hits) > 3:  # Multiple 429s recently
-            self.rate_limit_delay = min(self.rate_limit_delay * 1.1, 5.0)  # Cap at 5s max
-            self.target_rpm = int(60 / self.rate_limit_delay)
-            self.logger.warning(f"Adaptive rate limit: Slowing to ~{self.target_rpm} RPM (delay={self.rate_limit_delay:.2f}s)")
-        elif len(self._rate_limit_hits) == 0 and self.rate_limit_delay > 0.67:
-            self.rate_limit_delay *= 0.9
-            self.target_rpm = int(60 / self.rate_limit_delay)
-            # self.logger.info(f"Adaptive rate limit: Speeding up to ~{self.target_rpm} RPM")
+    def get_stats(self) -> dict:
+        """Rate limiter stats: current/achieved RPM, 429s, and time spent queued for a token or slot."""
+        stats = self._bucket.get_stats()
+        stats['max_concurrent'] = self.max_concurrent
+        stats['semaphore_wait_ms'] = round(1000 * self._semaphore_wait, 2)
+        stats['coalesced_requests'] = self.coalesced_requests
+        return stats
 
     async def _request(self, method, endpoint, data=None, params=None, use_cache=True):
+        cache_key = None
+        stored = None
         if method == 'GET' and use_cache:
             cache_key = self._get_cache_key(endpoint, params)
             cached = self._get_cached(cache_key)
             if cached:
+                telemetry.count("http_cache_hits")
                 return cached
-        
+            if self._http_cache is not None:
+                stored = self._http_cache.get(cache_key)
+                if stored is not None and stored.fresh:
+                    self._set_cache(cache_key, stored.body)
+                    telemetry.count("http_cache_hits")
+                    return stored.body
+            telemetry.count("http_cache_misses")
+
+            # Single-flight: concurrent identical GETs share one in-flight request
+            task = self._inflight.get(cache_key)
+            if task is not None:
+                self.coalesced_requests += 1
+            else:
+                task = asyncio.ensure_future(self._send(method, endpoint, data, params, cache_key, stored))
+                # Retrieve the outcome even if every waiter was cancelled (avoids "exception never retrieved")
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                self._inflight[cache_key] = task
+            return await self._join_inflight(cache_key, task)
+
+        return await self._send(method, endpoint, data, params, cache_key, stored)
+
+    async def _join_inflight(self, cache_key, task):
+        """Await a shared request; it is cancelled only when its last waiter is."""
+        self._inflight_waiters[cache_key] = self._inflight_waiters.get(cache_key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._inflight_waiters[cache_key] == 1:
+                task.cancel()
+            raise
+        finally:
+            self._inflight_waiters[cache_key] -= 1
+            if not self._inflight_waiters[cache_key]:
+                del self._inflight_waiters[cache_key]
+                if self._inflight.get(cache_key) is task:
+                    del self._inflight[cache_key]
+
+    async def _send(self, method, endpoint, data, params, cache_key, stored):
+        """Perform the HTTP request with rate limiting and retries, then populate the caches."""
         headers = {'User-Agent': self.user_agent}
         if self.api_key:
             headers['x-api-key'] = self.api_key
+        if stored is not None:
+            # Expired but revalidatable: a 304 costs no body transfer
+            headers.update(stored.conditional_headers())
 
         url = f"{self.base_url}{endpoint}"
         session = await self._get_session()
         
-        # Rate Limit Pacing
-        async with self._delay_lock:
-            now = asyncio.get_event_loop().time()
-            time_since_last = now - self._last_request_time
-            if time_since_last < self.rate_limit_delay:
-                await asyncio.sleep(self.rate_limit_delay - time_since_last)
-            
-            # Reset time to NOW (start of this virtual slot)
-            self._last_request_time = asyncio.get_event_loop().time()
-            
-        # Perform Request (Outside Serial Lock)
+        # Perform Request: a token paces the rate, the semaphore bounds requests in flight
         for attempt in range(6): 
             try:
                 # Re-check session inside retry loop just in case
                 session = await self._get_session()
-                async with session.request(method, url, json=data, params=params, headers=headers) as response:
-                    
-                    if response.status == 429:
-                        self._rate_limit_hits.append(asyncio.get_event_loop().time())
-                        self._adjust_rate_limit()
-                        
-                        wait_time = min((2 ** attempt) * 5.0, 60.0)
-                        rate_limit_msg = f"🔴 WOM RATE LIMIT HIT (429) - Waiting {wait_time:.1f}s before retry (Attempt {attempt+1}/6)"
-                        self.logger.warning(rate_limit_msg)
-                        await asyncio.sleep(wait_time)
-                        continue
-
-                    if response.status >= 500:
-                        wait_time = min((2 ** attempt) * 2.0, 30.0)
-                        self.logger.warning(f"WOM Server Error {response.status}. Retrying in {wait_time:.2f}s...")
-                        await asyncio.sleep(wait_time)
-                        continue
-                    
-                    response.raise_for_status()
-                    result = await response.json()
-                    
-                    if method == 'GET' and use_cache:
-                        self._set_cache(self._get_cache_key(endpoint, params), result)
-                    
-                    # Clear old hits on success to allow speedup
-                    self._rate_limit_hits = [t for t in self._rate_limit_hits if asyncio.get_event_loop().time() - t < 300]
-                    return result
+                await self._bucket.acquire()
+                wait_start = time.monotonic()
+                async with self._semaphore:
+                    self._semaphore_wait += time.monotonic() - wait_start
+                    telemetry.count("http_requests")
+                    request_start = time.perf_counter()
+                    async with session.request(method, url, json=data, params=params, headers=headers) as response:
+                        status = response.status
+                        REGISTRY.histogram("wom_request_seconds", endpoint=endpoint.strip('/').split('/')[0],
+                                           status=status).observe(time.perf_counter() - request_start)
+                        if status == 429 or status >= 500:
+                            retry_after = response.headers.get('Retry-After')
+                        elif status == 304 and stored is not None:
+                            result = stored.body
+                        else:
+                            response.raise_for_status()
+                            result = await response.json()
+                            etag = response.headers.get('ETag')
+                            last_modified = response.headers.get('Last-Modified')
+
+                if status == 429:
+                    telemetry.count("http_429")
+                    self._rate_limit_hits.append(asyncio.get_event_loop().time())
+                    self._bucket.on_throttle()
+                    REGISTRY.gauge("wom_rate_rpm").set(self._bucket.rate_rpm)
+
+                    wait_time = min((2 ** attempt) * 5.0, 60.0)
+                    if retry_after and retry_after.isdigit():
+                        wait_time = max(wait_time, float(retry_after))
+                    rate_limit_msg = (f"🔴 WOM RATE LIMIT HIT (429) - Backing off to ~{self._bucket.rate_rpm:.0f} RPM, "
+                                      f"waiting {wait_time:.1f}s before retry (Attempt {attempt+1}/6)")
+                    self.logger.warning(rate_limit_msg)
+                    await asyncio.sleep(wait_time)
+                    continue
+
+                if status >= 500:
+                    wait_time = min((2 ** attempt) * 2.0, 30.0)
+                    self.logger.warning(f"WOM Server Error {status}. Retrying in {wait_time:.2f}s...")
+                    await asyncio.sleep(wait_time)
+                    continue
+
+                self._bucket.on_success()
+                if cache_key is not None:
+                    self._set_cache(cache_key, result)
+                    if self._http_cache is not None:
+                        if status == 304:
+                            self._http_cache.refresh(cache_key, endpoint)
+                        else:
+                            self._http_cache.set(cache_key, endpoint, result, etag=etag, last_modified=last_modified)
+
+                # Clear old hits (only used for the close() summary)
+                self._rate_limit_hits = [t for t in self._rate_limit_hits if asyncio.get_event_loop().time() - t < 3600]
+                return result
 
             except aiohttp.ClientResponseError as e:
                 # Specific check for Auth Errors
@@ -187,13 +342,23 @@ class WOMClient:
                     'username': player.get('username'),
                     'displayName': player.get('displayName'),
                     'role': m.get('role'),
-                    'joined_at': m.get('createdAt')
+                    'joined_at': m.get('createdAt'),
+                    # Current totals and change markers, used by the group delta harvest
+                    'exp': player.get('exp'),
+                    'ehb': player.get('ehb'),
+                    'updatedAt': player.get('updatedAt'),
+                    'lastChangedAt': player.get('lastChangedAt'),
                 })
         return members
 
     async def get_player_details(self, username):
         return await self._request('GET', f'/players/{username}')
 
+    async def get_player_latest_snapshot(self, username):
+        """The player's current snapshot (same shape as a /snapshots entry), or None."""
+        details = await self.get_player_details(username)
+        return (details or {}).get('latestSnapshot')
+
     async def update_player(self, username):
         """Request a fresh scan for a player."""
         return await self._request('POST', f'/players/{username}')
@@ -227,42 +392,90 @@ class WOMClient:
             params['endDate'] = end_date
         return await self._request('GET', f'/players/{username}/gained', params=params)
 
-    async def get_player_snapshots(self, username, period='all', start_date=None, end_date=None):
-        """Fetches snapshot history for a player, handling pagination."""
-        params = {}
+    SNAPSHOT_PAGE_SIZE = 100  # Increased from 20 to 100 to reduce volume of requests
+    SNAPSHOT_MAX_OFFSET = 5000  # Safety stop: 5000 snapshots is years of data
+    SNAPSHOTS_PER_DAY_ESTIMATE = 4
+
+    def estimate_snapshot_pages(self, start_date=None, end_date=None, page_hint=None) -> int:
+        """
+        Guess how many snapshot pages a request will need.
+
+        A date window is estimated from its length; the page count recorded on
+        the previous run caps that estimate (or stands alone for full histories,
+        which otherwise start with one page). A player whose backfill took 40
+        pages still starts an incremental run with the one page its window needs.
+        """
+        hint = max(1, int(page_hint)) if page_hint else None
+        if start_date:
+            try:
+                start = datetime.fromisoformat(str(start_date).replace('Z', '+00:00'))
+                if start.tzinfo is None:
+                    start = start.replace(tzinfo=timezone.utc)
+                end = datetime.fromisoformat(str(end_date).replace('Z', '+00:00')) if end_date else datetime.now(timezone.utc)
+                if end.tzinfo is None:
+                    end = end.replace(tzinfo=timezone.utc)
+                days = max(0.0, (end - start).total_seconds() / 86400)
+                window = max(1, math.ceil(days * self.SNAPSHOTS_PER_DAY_ESTIMATE / self.SNAPSHOT_PAGE_SIZE))
+                return min(hint, window) if hint else window
+            except (TypeError, ValueError):
+                pass
+        return hint or 1
+
+    async def iter_player_snapshot_pages(self, username, period='all', start_date=None, end_date=None, page_hint=None):
+        """
+        Async generator over a player's snapshot pages, in offset order.
+
+        The first wave requests the estimated number of pages concurrently; if the
+        history turns out longer, further waves of WOM_PAGE_PREFETCH pages follow.
+        Concurrency is still bounded by the token bucket and semaphore in _request.
+        Pages are yielded as soon as they (and all earlier pages) arrive.
+        """
+        base_params = {}
         if period and period != 'all':
-            params['period'] = period
+            base_params['period'] = period
         if start_date:
-            params['startDate'] = start_date
+            base_params['startDate'] = start_date
         if end_date:
-            params['endDate'] = end_date
-            
-        # Pagination loop
+            base_params['endDate'] = end_date
+
+        endpoint = f'/players/{username}/snapshots'
+        limit = self.SNAPSHOT_PAGE_SIZE
+        max_pages = self.SNAPSHOT_MAX_OFFSET // limit + 1
+        wave = self.estimate_snapshot_pages(start_date, end_date, page_hint)
+        next_page = 0
+        pages_read = 0
+
+        try:
+            while next_page < max_pages:
+                tasks = []
+                for page in range(next_page, min(next_page + wave, max_pages)):
+                    params = dict(base_params, offset=page * limit, limit=limit)
+                    task = asyncio.ensure_future(self._request('GET', endpoint, params=params))
+                    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                    tasks.append(task)
+                try:
+                    for task in tasks:
+                        batch = await task
+                        if not batch:
+                            return
+                        pages_read += 1
+                        yield batch
+                        if len(batch) < limit:
+                            return
+                finally:
+                    # Drop prefetched pages past the end of the history
+                    for task in tasks:
+                        task.cancel()
+                next_page += len(tasks)
+                wave = max(1, Config.WOM_PAGE_PREFETCH)
+        finally:
+            self.snapshot_page_counts[username] = pages_read
+
+    async def get_player_snapshots(self, username, period='all', start_date=None, end_date=None, page_hint=None):
+        """Fetches snapshot history for a player, handling pagination."""
         all_snapshots = []
-        offset = 0
-        limit = 100 # Increased from 20 to 100 to reduce volume of requests
-        
-        while True:
-            params['offset'] = offset
-            params['limit'] = limit
-            
-            # self.logger.info(f"Fetching snapshots for {username} offset={offset}")
-            batch = await self._request('GET', f'/players/{username}/snapshots', params=params)
-            
-            if not batch:
-                break
-                
+        async for batch in self.iter_player_snapshot_pages(username, period, start_date, end_date, page_hint):
             all_snapshots.extend(batch)
-            
-            if len(batch) < limit:
-                break
-                
-            offset += limit
-            
-            # Safety break to avoid infinite loops if API behaves weirdly
-            if offset > 5000: # 5000 snapshots is years of data
-                break
-                
         return all_snapshots
 
 # REMOVED: Global singleton - Use ServiceFactory.get_wom_client() instead
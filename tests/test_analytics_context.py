@@ -0,0 +1,57 @@
+"""Tests for the run-scoped AnalyticsSnapshot memo."""
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.analytics import AnalyticsService, AnalyticsSnapshot
+from database.models import Base, WOMSnapshot
+
+NOW = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture()
+def db_session():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    for day in (40, 20, 1):
+        session.add(WOMSnapshot(username="alice", timestamp=(NOW - timedelta(days=day)).replace(tzinfo=None),
+                                total_xp=1000 - day, total_boss_kills=0))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_datasets_computed_once_per_window(db_session):
+    context = AnalyticsSnapshot(db_session, now=NOW)
+    analytics = AnalyticsService(db_session, context=context)
+
+    first = analytics.get_latest_snapshots()
+    assert analytics.get_latest_snapshots() is first
+    week = analytics.get_snapshots_at_cutoff(context.cutoff(7))
+    # The chart helpers use the same frozen clock, so they hit the memo too
+    analytics.get_boss_diversity_7d()
+
+    assert analytics.get_snapshots_at_cutoffs([context.cutoff(7)])[context.cutoff(7)] is week
+    assert week["alice"].total_xp == 980
+    assert context.get_stats()["hits"] >= 3
+
+
+def test_context_shared_between_services(db_session):
+    context = AnalyticsSnapshot(db_session, now=NOW)
+    latest = AnalyticsService(db_session, context=context).get_latest_snapshots()
+    assert AnalyticsService(db_session, context=context).get_latest_snapshots() is latest
+
+
+def test_writes_invalidate_the_memo(db_session):
+    analytics = AnalyticsService(db_session, context=AnalyticsSnapshot(db_session, now=NOW))
+    assert analytics.get_latest_snapshots()["alice"].total_xp == 999
+
+    db_session.add(WOMSnapshot(username="alice", timestamp=NOW.replace(tzinfo=None), total_xp=2000, total_boss_kills=0))
+    db_session.commit()
+
+    assert analytics.get_latest_snapshots()["alice"].total_xp == 2000
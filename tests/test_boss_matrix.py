@@ -0,0 +1,83 @@
+"""Tests for the snapshot x boss kill matrix."""
+
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.analytics import AnalyticsService
+from core.boss_matrix import BossMatrix
+from database.models import Base, BossSnapshot, ClanMember, WOMSnapshot
+
+
+@pytest.fixture()
+def db_session():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    session.add_all([ClanMember(username="alice"), ClanMember(username="bob")])
+    kills = {
+        1: ("alice", {"zulrah": 10, "vorkath": 5}),
+        2: ("alice", {"zulrah": 12, "vorkath": 25, "chambers_of_xeric": 0}),
+        3: ("bob", {"zulrah": 3}),
+        4: ("bob", {"zulrah": 3, "tombs_of_amascut": 4}),
+        5: ("ex_member", {"zulrah": 100}),
+    }
+    for sid, (user, bosses) in kills.items():
+        session.add(WOMSnapshot(id=sid, username=user, timestamp=datetime(2025, 1, sid),
+                                total_xp=0, total_boss_kills=sum(bosses.values())))
+        for boss, k in bosses.items():
+            session.add(BossSnapshot(snapshot_id=sid, boss_name=boss, kills=k))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_dict_view_matches_stored_rows(db_session):
+    matrix = BossMatrix().ensure(db_session, [2, 3])
+    matrix.ensure(db_session, [1, 2, 4])  # only id 1 and 4 are new; columns grow
+
+    assert matrix.loads == 2
+    assert matrix.bosses[-1] == "tombs_of_amascut"  # new columns are appended
+    assert matrix.as_dicts([2, 3, 99]) == {
+        2: {"chambers_of_xeric": 0, "vorkath": 25, "zulrah": 12},
+        3: {"zulrah": 3},
+    }
+
+
+def test_one_at_a_time_loads_grow_capacity_geometrically(db_session):
+    matrix = BossMatrix()
+    buffers = set()
+    for sid in [3, 1, 4, 2, 5]:
+        matrix.ensure(db_session, [sid])
+        buffers.add(id(matrix._kills))
+
+    assert matrix.kills.shape == (5, 4) and matrix._kills.shape[0] >= 5
+    assert len(buffers) < 5  # not reallocated on every row
+    assert matrix.as_dicts([1, 4]) == BossMatrix().ensure(db_session, [1, 2, 3, 4, 5]).as_dicts([1, 4])
+    assert matrix.sums([1, 2, 3, 4, 5], members_only=True)["zulrah"] == 28
+
+
+def test_sums_deltas_and_favourites(db_session):
+    matrix = BossMatrix().ensure(db_session, [1, 2, 3, 4, 5])
+
+    assert matrix.sums([2, 4, 5]) == {"chambers_of_xeric": 0, "tombs_of_amascut": 4, "vorkath": 25, "zulrah": 115}
+    assert matrix.sums([2, 4, 5], members_only=True)["zulrah"] == 15
+    assert matrix.favourites([2, 4]) == {2: ("vorkath", 25), 4: ("tombs_of_amascut", 4)}
+    assert matrix.favourites([2, 4], [1, 3]) == {2: ("vorkath", 20), 4: ("tombs_of_amascut", 4)}
+    assert matrix.favourites([3], [3]) == {}
+    assert matrix.gain_totals([2, 4], [1, None]) == {"vorkath": 20, "zulrah": 5, "tombs_of_amascut": 4}
+    assert matrix.diversity([2, 4, 5], members_only=True) == {"vorkath": 1, "zulrah": 2, "tombs_of_amascut": 1}
+
+
+def test_analytics_shares_one_matrix(db_session):
+    analytics = AnalyticsService(db_session)
+    current = {u: db_session.get(WOMSnapshot, sid) for u, sid in (("alice", 2), ("bob", 4))}
+    old = {"alice": db_session.get(WOMSnapshot, 1)}
+
+    assert analytics.get_user_top_boss_gains(current, old) == {"alice": ("vorkath", 20), "bob": ("tombs_of_amascut", 4)}
+    assert analytics.get_detailed_boss_gains(current, old) == {"vorkath": 20, "zulrah": 5, "tombs_of_amascut": 4}
+    assert analytics.get_boss_data([1])[1] == {"vorkath": 5, "zulrah": 10}
+    assert analytics.boss_matrix().loads == 1
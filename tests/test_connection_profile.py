@@ -0,0 +1,35 @@
+"""Tests for the SQLite connection profile in database/connector.py."""
+
+import sqlite3
+import pytest
+
+from core.analytics import AnalyticsService  # noqa: F401  (import order: avoids the services <-> database cycle)
+from database.connector import SQLITE_PROFILE, connect
+
+
+def test_profile_applied_to_raw_connections(tmp_path):
+    db_file = str(tmp_path / "clan.db")
+    conn = connect(db_file=db_file)
+    conn.execute("CREATE TABLE t (a)")
+    conn.commit()
+
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0].upper() == str(SQLITE_PROFILE["journal_mode"]).upper()
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == SQLITE_PROFILE["busy_timeout"]
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == SQLITE_PROFILE["cache_size"]
+    assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+    conn.close()
+
+
+def test_read_only_connections_cannot_write(tmp_path):
+    db_file = str(tmp_path / "clan.db")
+    writer = connect(db_file=db_file)
+    writer.execute("CREATE TABLE t (a)")
+    writer.execute("INSERT INTO t VALUES (1)")
+    writer.commit()
+
+    reader = connect(read_only=True, db_file=db_file)
+    assert reader.execute("SELECT a FROM t").fetchall() == [(1,)]
+    with pytest.raises(sqlite3.OperationalError):
+        reader.execute("INSERT INTO t VALUES (2)")
+    reader.close()
+    writer.close()
@@ -0,0 +1,137 @@
+"""Tests for Discord harvesting: concurrent channels, checkpoints and bulk batch saves."""
+
+import discord
+import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from services.discord import DiscordFetcher
+from database.models import Base, ClanMember, DiscordMessage, DiscordChannelCheckpoint
+
+
+class _Author:
+    def __init__(self, name):
+        self.id = hash(name) & 0xFFFF
+        self.display_name = name
+
+    def __str__(self):
+        return self.display_name
+
+
+class _FakeChannel:
+    def __init__(self, channel_id, name, message_ids):
+        self.id = channel_id
+        self.name = name
+        self.guild = SimpleNamespace(id=1, name="Clan", me=object())
+        self.message_ids = message_ids
+        self.requested_after = []
+
+    def permissions_for(self, member):
+        return SimpleNamespace(read_message_history=True)
+
+    async def history(self, limit=None, after=None, oldest_first=True):
+        self.requested_after.append(after)
+        start_after = after.id if isinstance(after, discord.Object) else 0
+        base = datetime(2025, 3, 1, tzinfo=timezone.utc)
+        for mid in sorted(self.message_ids):
+            if mid > start_after:
+                yield SimpleNamespace(
+                    id=mid, author=_Author(f"user{mid % 3}"), content="hi",
+                    channel=self, guild=self.guild, created_at=base + timedelta(minutes=mid),
+                )
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _fetcher(channels):
+    fetcher = DiscordFetcher()
+    fetcher.client = SimpleNamespace(guilds=[SimpleNamespace(text_channels=channels)])
+    fetcher.start_date = datetime(2025, 3, 1, tzinfo=timezone.utc)  # newest stored message, as in the harvest
+    return fetcher
+
+
+@pytest.mark.asyncio
+async def test_channels_resume_from_their_own_checkpoint(session_factory):
+    db = session_factory()
+    db.add(DiscordChannelCheckpoint(channel_id=10, channel_name="busy", guild_id=1, last_message_id=105))
+    db.commit()
+    db.close()
+
+    busy = _FakeChannel(10, "busy", [101, 103, 105, 107, 109])
+    quiet = _FakeChannel(20, "quiet", [2, 4])
+
+    with patch("services.discord.SessionLocal", session_factory), \
+         patch("services.discord.Config.RELAY_CHANNEL_ID", None), \
+         patch("services.discord.Config.DISCORD_BATCH_SIZE", 1), \
+         patch("services.discord.Config.DISCORD_RATE_LIMIT_DELAY", 0):
+        await _fetcher([busy, quiet])._fetch_logic()
+
+    # busy resumes after its checkpoint; quiet has none and starts from the founding date, not start_date
+    assert busy.requested_after[0].id == 105
+    assert quiet.requested_after[0] == datetime(2025, 2, 14, tzinfo=timezone.utc)
+
+    db = session_factory()
+    saved = sorted(db.execute(select(DiscordMessage.id)).scalars().all())
+    assert saved == [2, 4, 107, 109]
+    marks = {cp.channel_id: cp.last_message_id for cp in db.execute(select(DiscordChannelCheckpoint)).scalars()}
+    assert marks == {10: 109, 20: 4}
+    db.close()
+
+
+def test_save_batch_resolves_each_author_once_and_ignores_duplicates(session_factory):
+    db = session_factory()
+    db.add(ClanMember(username="alice", role="member"))
+    db.commit()
+    alice_id = db.execute(select(ClanMember.id)).scalar_one()
+
+    def row(mid, author):
+        return {"id": mid, "author_id": 1, "author_name": author, "content": "x", "channel_id": 10,
+                "channel_name": "general", "guild_id": 1, "guild_name": "Clan",
+                "created_at": datetime(2025, 3, 1, tzinfo=timezone.utc), "user_id": None}
+
+    fetcher = DiscordFetcher()
+    with patch("services.discord.UserAccessService") as access:
+        access.return_value.resolve_user_id.return_value = None
+        fetcher._save_batch(db, [row(1, "alice"), row(2, "alice"), row(3, "stranger")])
+        fetcher._save_batch(db, [row(3, "stranger"), row(4, "stranger")])
+
+    # 'alice' comes from the preloaded map; 'stranger' falls back once and is memoized as unresolved
+    assert access.return_value.resolve_user_id.call_count == 1
+    stored = dict(db.execute(select(DiscordMessage.id, DiscordMessage.user_id)).all())
+    assert stored == {1: alice_id, 2: alice_id, 3: None, 4: None}
+    assert db.execute(select(DiscordChannelCheckpoint.last_message_id)).scalar_one() == 4
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_stops_channel_without_advancing_checkpoint(session_factory):
+    channel = _FakeChannel(10, "busy", [1, 2, 3])
+    fetcher = _fetcher([channel])
+    advance = fetcher._advance_checkpoint
+
+    def fail_on_second(db, batch):
+        if batch[0]['id'] == 2:
+            raise RuntimeError("disk full")
+        advance(db, batch)
+
+    fetcher._advance_checkpoint = fail_on_second
+    with patch("services.discord.SessionLocal", session_factory), \
+         patch("services.discord.Config.RELAY_CHANNEL_ID", None), \
+         patch("services.discord.Config.DISCORD_BATCH_SIZE", 1), \
+         patch("services.discord.Config.DISCORD_RATE_LIMIT_DELAY", 0):
+        await fetcher._fetch_logic()
+
+    # Message 3 was never saved, so the next run resumes after 1 and retries 2
+    db = session_factory()
+    assert db.execute(select(DiscordMessage.id)).scalars().all() == [1]
+    assert db.execute(select(DiscordChannelCheckpoint.last_message_id)).scalar_one() == 1
+    db.close()
@@ -1,6 +1,10 @@
 import sqlite3
 
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
 from scripts.harvest_sqlite import resolve_member_id_sqlite
+from database.models import Base, ClanMember, PlayerNameAlias
 
 
 def _setup_in_memory_db():
@@ -50,3 +54,20 @@ def test_resolve_member_id_returns_none_when_missing():
         assert resolved is None
     finally:
         conn.close()
+
+
+def test_resolve_member_id_uses_callers_identity_index(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'harvest.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    conn, cursor = _setup_in_memory_db()  # empty: the answer must come from the index
+    try:
+        session.add(ClanMember(id=3, username="currentname"))
+        session.add(PlayerNameAlias(member_id=3, normalized_name="oldname", canonical_name="OldName"))
+        session.commit()
+
+        assert resolve_member_id_sqlite(cursor, "oldname", db_session=session) == 3
+    finally:
+        conn.close()
+        session.close()
+        engine.dispose()
@@ -0,0 +1,124 @@
+"""Tests for the persistent WOM HTTP response cache."""
+
+import os
+import time
+import pytest
+from unittest.mock import patch
+
+from services.http_cache import PersistentHTTPCache
+from services.wom import WOMClient
+
+
+@pytest.fixture()
+def cache(tmp_path):
+    cache = PersistentHTTPCache(str(tmp_path / "cache.db"), max_bytes=10_000)
+    yield cache
+    cache.close()
+
+
+def test_ttl_rules_per_endpoint(cache):
+    assert cache.ttl_for("/players/zezima/names") == 7 * 86400
+    assert cache.ttl_for("/players/zezima/snapshots") == 3600
+    assert cache.ttl_for("/groups/11114") == 300
+    assert cache.ttl_for("/efficiency/leaderboard") == cache.default_ttl
+
+
+def test_round_trip_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = PersistentHTTPCache(path)
+    first.set("k", "/players/zezima", {"username": "zezima"}, etag='"abc"')
+    first.close()
+
+    second = PersistentHTTPCache(path)
+    entry = second.get("k")
+    assert entry.fresh
+    assert entry.body == {"username": "zezima"}
+    assert entry.conditional_headers() == {"If-None-Match": '"abc"'}
+    assert second.total_bytes > 0
+    second.close()
+
+
+def test_expired_entries_kept_only_when_revalidatable(cache):
+    with patch("services.http_cache.time.time", return_value=1_000.0):
+        cache.set("plain", "/groups/1", [1, 2, 3])
+        cache.set("tagged", "/groups/1", [4, 5, 6], last_modified="Mon, 01 Jan 2025 00:00:00 GMT")
+
+    with patch("services.http_cache.time.time", return_value=1_000.0 + 301):
+        assert cache.get("plain") is None
+        stale = cache.get("tagged")
+        assert stale is not None and not stale.fresh
+        cache.refresh("tagged", "/groups/1")
+        assert cache.get("tagged").fresh
+
+
+def test_lru_eviction_by_bytes(tmp_path):
+    cache = PersistentHTTPCache(str(tmp_path / "cache.db"), max_bytes=800)
+    payload = lambda i: {"blob": os.urandom(300).hex(), "i": i}  # ~330 bytes compressed
+
+    with patch("services.http_cache.time.time", side_effect=[time.time() + i for i in range(6)]):
+        cache.set("a", "/x", payload(1))
+        cache.set("b", "/x", payload(2))
+        cache.get("a")  # touch a, so b is least recently used
+        cache.set("c", "/x", payload(3))
+
+    assert cache.total_bytes <= 800
+    assert cache.evictions == 1
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    cache.close()
+
+
+class _FakeResponse:
+    def __init__(self, status, body=None, headers=None):
+        self.status = status
+        self._body = body
+        self.headers = headers or {}
+
+    async def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _FakeSession:
+    closed = False
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent_headers = []
+
+    def request(self, method, url, json=None, params=None, headers=None):
+        self.sent_headers.append(headers)
+        return self.responses.pop(0)
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_client_revalidates_with_etag(tmp_path):
+    with patch("services.wom.Config.WOM_CACHE_BACKEND", "sqlite"), \
+         patch("services.wom.Config.WOM_CACHE_PATH", str(tmp_path / "cache.db")):
+        client = WOMClient()
+
+    client._session = _FakeSession([
+        _FakeResponse(200, {"username": "zezima"}, {"ETag": '"v1"'}),
+        _FakeResponse(304),
+    ])
+    assert await client.get_player_details("zezima") == {"username": "zezima"}
+
+    # Expire both cache layers; the next call must send a conditional GET
+    client._cache.clear()
+    client._http_cache._conn.execute("UPDATE http_cache SET expires_at = 0")
+    assert await client.get_player_details("zezima") == {"username": "zezima"}
+
+    assert client._session.sent_headers[1]["If-None-Match"] == '"v1"'
+    assert client._http_cache.revalidated == 1
+    await client.close()
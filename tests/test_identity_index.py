@@ -0,0 +1,63 @@
+"""Tests for the shared in-memory IdentityIndex."""
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from services.identity_service import IdentityIndex, upsert_alias
+from database.models import Base, ClanMember
+
+
+@pytest.fixture()
+def db_session():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    session.statements = statements
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_hits_are_served_from_memory(db_session):
+    db_session.add_all([ClanMember(username="alice"), ClanMember(username="bob")])
+    db_session.commit()
+    index = IdentityIndex.for_session(db_session)
+
+    first = index.resolve_many(db_session, ["Alice", "BOB"])
+    db_session.statements.clear()
+    second = index.resolve_many(db_session, ["alice", "bob", "Alice"])
+
+    assert first["Alice"] and first["BOB"]
+    assert second == {"alice": first["Alice"], "bob": first["BOB"], "Alice": first["Alice"]}
+    assert db_session.statements == []
+    assert IdentityIndex.for_session(db_session) is index
+
+
+def test_alias_upsert_invalidates_index(db_session):
+    db_session.add(ClanMember(username="docofmed"))
+    db_session.commit()
+    member_id = db_session.query(ClanMember.id).scalar()
+    index = IdentityIndex.for_session(db_session)
+    assert index.resolve(db_session, "Old Doc") is None
+
+    upsert_alias(db_session, member_id, "Old Doc", source="manual")
+
+    assert index.resolve(db_session, "old doc") == member_id
+    assert index.loads == 2
+
+
+def test_misses_fall_back_to_one_batched_lookup(db_session):
+    index = IdentityIndex.for_session(db_session)
+    index.resolve(db_session, "warmup")
+    # Written behind the ORM's back, so no invalidation happens
+    db_session.execute(text("INSERT INTO clan_members (username) VALUES ('carol'), ('dave')"))
+    db_session.commit()
+
+    result = index.resolve_many(db_session, ["carol", "dave", "nobody"])
+
+    assert result["carol"] and result["dave"] and result["nobody"] is None
+    assert index.lookups == 2
@@ -0,0 +1,77 @@
+"""Tests for the in-process metrics registry."""
+
+import json
+import random
+
+import pytest
+
+from core.metrics import Histogram, MetricsRegistry, REGISTRY, bucket_bounds, bucket_index
+from core.performance import PerformanceMonitor, timed_operation
+
+
+def test_buckets_cover_every_value_in_order():
+    previous = -1
+    for value in sorted(set(range(5000)) | {2 ** k + d for k in range(12, 40) for d in (-1, 0, 1)}):
+        index = bucket_index(value)
+        low, high = bucket_bounds(index)
+        assert low <= value <= high
+        assert index >= previous
+        previous = index
+
+
+def test_observe_uses_bucket_index():
+    hist = Histogram(scale=1)
+    values = [-5, 0, 1, 63, 64, 65, 1000, 2 ** 20 + 7, 2 ** 60]
+    for v in values:
+        hist.observe(v)
+    assert [i for i, n in enumerate(hist.counts) if n] == sorted({bucket_index(v) for v in values})
+
+
+def test_quantiles_within_bucket_precision():
+    rng = random.Random(7)
+    values = sorted(rng.lognormvariate(-4, 1) for _ in range(20000))
+    hist = Histogram()
+    for v in values:
+        hist.observe(v)
+
+    assert hist.count == len(values)
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(q * len(values)) - 1]
+        assert hist.quantile(q) == pytest.approx(exact, rel=0.04)
+    assert hist.quantile(1.0) == max(values)
+
+
+def test_export_prometheus_and_json(tmp_path):
+    registry = MetricsRegistry()
+    registry.counter("messages_total").inc(3)
+    registry.gauge("rate_rpm").set(90)
+    registry.histogram("request_seconds", endpoint="players").observe(0.25)
+    assert registry.counter("messages_total").value == 3  # handles are cached per name + labels
+
+    text = registry.to_prometheus()
+    assert "# TYPE clan_request_seconds summary" in text
+    assert 'clan_request_seconds_count{endpoint="players",trace_id="' in text
+    assert "clan_messages_total{" in text
+
+    path = tmp_path / "metrics.json"
+    registry.export(str(path))
+    data = json.loads(path.read_text())
+    assert data["histograms"][0]["labels"] == {"endpoint": "players"}
+    assert data["histograms"][0]["count"] == 1
+    assert data["trace_id"]
+
+
+def test_timing_helpers_feed_the_registry():
+    @timed_operation("metrics test op")
+    def op(fail=False):
+        if fail:
+            raise ValueError("boom")
+
+    op()
+    with pytest.raises(ValueError):
+        op(fail=True)
+    with PerformanceMonitor("metrics test op"):
+        pass
+
+    assert REGISTRY.histogram("operation_seconds", operation="metrics test op", outcome="ok").count == 2
+    assert REGISTRY.histogram("operation_seconds", operation="metrics test op", outcome="error").count == 1
@@ -0,0 +1,86 @@
+"""Tests for the trigram fuzzy name matcher."""
+
+import pytest
+from datetime import datetime, timezone
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from services.identity_service import bump_identity_version
+from services.name_matcher import TrigramNameMatcher
+from services.user_access_service import UserAccessService
+from database.models import Base, ClanMember, DiscordMessage
+
+
+def test_contained_names_score_like_substring_match():
+    matcher = TrigramNameMatcher({"[ABC] Zezima | Mod": 1, "Lynx Titan": 2})
+
+    assert matcher.match("zezima")[0].score == 1.0
+    assert matcher.best("Zezima") == 1
+    assert matcher.best("unrelated") is None
+
+
+def test_threshold_and_ranking():
+    matcher = TrigramNameMatcher({"lynxtitan": 1, "lynxtitan2": 2, "titan": 3})
+
+    assert matcher.match("lynx titn", threshold=1.0) == []
+    near = matcher.match("lynx titn", threshold=0.5)
+    assert [m.member_id for m in near] == [1, 2]
+    # Exact name outranks the longer name that merely contains it
+    assert matcher.best("LynxTitan") == 1
+
+
+def test_ambiguous_top_match_is_rejected():
+    matcher = TrigramNameMatcher({"bobx": 1, "boby": 2})
+    assert matcher.best("bob") is None
+    assert matcher.best_many(["bobx", "bob"]) == {"bobx": 1, "bob": None}
+
+
+@pytest.fixture()
+def db_session():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_user_access_service_falls_back_to_indexed_match(db_session):
+    db_session.add(ClanMember(id=7, username="docofmed"))
+    db_session.add(DiscordMessage(id=1, author_id=1, author_name="Doc Of Med | Mentor", content="hi",
+                                  channel_id=1, created_at=datetime(2025, 1, 1, tzinfo=timezone.utc), user_id=7))
+    db_session.commit()
+
+    matcher = TrigramNameMatcher.for_session(db_session)
+    assert len(matcher) == 2
+    assert UserAccessService(db_session).resolve_user_id("med | mentor") == 7
+    assert TrigramNameMatcher.for_session(db_session) is matcher
+
+
+def test_identity_bump_only_reads_new_messages(db_session):
+    db_session.add(ClanMember(id=7, username="docofmed"))
+    db_session.add(DiscordMessage(id=100, author_id=1, author_name="Doc Of Med | Mentor", content="hi", channel_id=1,
+                                  created_at=datetime(2025, 1, 1, tzinfo=timezone.utc), user_id=7, insert_seq=1))
+    db_session.commit()
+    TrigramNameMatcher.for_session(db_session)
+
+    # Another channel commits an older message later: lower snowflake id, higher insert_seq
+    db_session.add(DiscordMessage(id=50, author_id=2, author_name="Zulrah Slayer", content="gz", channel_id=2,
+                                  created_at=datetime(2024, 12, 1, tzinfo=timezone.utc), user_id=7, insert_seq=2))
+    db_session.commit()
+    bump_identity_version()
+
+    statements = []
+    engine = db_session.get_bind()
+    listener = lambda conn, cursor, sql, params, context, many: statements.append(sql)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        matcher = TrigramNameMatcher.for_session(db_session)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert matcher.best("zulrah slayer") == 7
+    assert matcher.best("doc of med") == 7
+    author_scans = [sql for sql in statements if "discord_messages" in sql and "GROUP BY" in sql]
+    assert author_scans and all("discord_messages.insert_seq >" in sql for sql in author_scans)
@@ -7,23 +7,48 @@ Tests measure:
 - Dashboard export time (target: <1s)
 
 These benchmarks help track performance regressions across releases.
+
+They run against a synthetic database (scripts/generate_synthetic_db.py),
+generated once per session: the "small" profile by default, or any of
+tiny/small/medium/large via PERF_PROFILE (e.g. PERF_PROFILE=medium pytest
+tests/test_performance.py -s).
 """
 
+import os
 import pytest
 import time
 from datetime import datetime, timezone, timedelta
-from database.connector import SessionLocal
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
 from core.analytics import AnalyticsService
 from core.timestamps import TimestampHelper
+from database.connector import connect
+from scripts.generate_synthetic_db import PROFILES, generate
+
+
+@pytest.fixture(scope="session")
+def synthetic_db(tmp_path_factory):
+    """Path of a generated benchmark database."""
+    profile = os.environ.get("PERF_PROFILE", "small")
+    db_file = str(tmp_path_factory.mktemp("perf") / f"synthetic_{profile}.db")
+    generate(db_file, PROFILES[profile], seed=1337)
+    return db_file
+
+
+@pytest.fixture(scope="session")
+def session_factory(synthetic_db):
+    engine = create_engine("sqlite://", creator=lambda: connect(db_file=synthetic_db))
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
 
 
 class TestAnalyticsPerformance:
     """Benchmarks for core analytics operations."""
 
     @pytest.fixture
-    def db_session(self):
+    def db_session(self, session_factory):
         """Provide database session for tests."""
-        session = SessionLocal()
+        session = session_factory()
         yield session
         session.close()
 
@@ -126,7 +151,7 @@ class TestReportPerformance:
     If report generation fails, these tests will skip gracefully.
     """
 
-    def test_full_pipeline_timing(self):
+    def test_full_pipeline_timing(self, session_factory, tmp_path, monkeypatch):
         """
         Measure overall report generation time.
         Target: <2s for full pipeline
@@ -134,10 +159,9 @@ class TestReportPerformance:
         This is an integration test that measures end-to-end performance.
         """
         from reporting.excel import ExcelReporter
-        from database.connector import SessionLocal
-        from core.analytics import AnalyticsService
         
-        db = SessionLocal()
+        monkeypatch.chdir(tmp_path)  # the report is written to the working directory
+        db = session_factory()
         try:
             analytics = AnalyticsService(db)
             reporter = ExcelReporter()
@@ -160,9 +184,9 @@ class TestQueryOptimization:
     """
 
     @pytest.fixture
-    def db_session(self):
+    def db_session(self, session_factory):
         """Provide database session."""
-        session = SessionLocal()
+        session = session_factory()
         yield session
         session.close()
 
@@ -0,0 +1,220 @@
+"""Tests for the in-process DAG pipeline runner."""
+
+import threading
+from datetime import datetime, timezone
+import time
+
+import pytest
+
+from core.pipeline import Pipeline, PipelineContext, PipelineState, Stage, build_graph, database_fingerprint
+
+
+def _stage(name, log, inputs=(), outputs=(), critical=False, fail=False, delay=0.0):
+    def run(ctx):
+        log.append(("start", name))
+        time.sleep(delay)
+        log.append(("end", name))
+        return False if fail else None
+    return Stage(name, name, run, inputs=tuple(inputs), outputs=tuple(outputs), critical=critical)
+
+
+def test_graph_from_inputs_and_outputs():
+    log = []
+    graph = build_graph([
+        _stage("harvest", log, outputs=["db"]),
+        _stage("enrich", log, inputs=["db"], outputs=["insights"]),
+        _stage("report", log, inputs=["db"], outputs=["xlsx"]),
+        _stage("export", log, inputs=["db", "insights"], outputs=["json"]),
+        _stage("publish", log, inputs=["json"]),
+    ])
+    assert graph == {"harvest": [], "enrich": ["harvest"], "report": ["harvest"],
+                     "export": ["harvest", "enrich"], "publish": ["export"]}
+
+
+@pytest.mark.asyncio
+async def test_independent_stages_run_concurrently():
+    log, barrier = [], threading.Barrier(2, timeout=5)
+
+    def both(name):
+        def run(ctx):
+            barrier.wait()  # deadlocks (BrokenBarrierError) unless both run at once
+            log.append(name)
+        return Stage(name, name, run, inputs=("db",))
+
+    results = await Pipeline([_stage("harvest", log, outputs=["db"]), both("report"), both("csv")]).run()
+    assert {r.status for r in results.values()} == {"ok"}
+    assert sorted(log[-2:]) == ["csv", "report"]
+
+
+@pytest.mark.asyncio
+async def test_failures_skip_dependents_and_critical_aborts():
+    log = []
+    results = await Pipeline([
+        _stage("harvest", log, outputs=["db"]),
+        _stage("export", log, inputs=["db"], outputs=["json"], fail=True),
+        _stage("publish", log, inputs=["json"]),
+        _stage("csv", log, inputs=["db"]),
+    ]).run()
+    assert results["export"].status == "failed"
+    assert results["publish"].status == "skipped"
+    assert results["csv"].status == "ok"
+
+    log = []
+    results = await Pipeline([
+        _stage("harvest", log, outputs=["db"], critical=True, fail=True),
+        _stage("report", log, inputs=["db"]),
+    ]).run()
+    assert results["report"].status == "skipped"
+    assert ("start", "report") not in log
+
+
+@pytest.mark.asyncio
+async def test_async_stages_and_isolation():
+    calls = []
+
+    async def harvest(ctx):
+        calls.append("harvest")
+
+    def isolated(module, description):
+        calls.append(module)
+        return True
+
+    stages = [Stage("harvest", "h", harvest, outputs=("db",)),
+              Stage("csv", "c", lambda ctx: calls.append("in-process"), module="scripts.export_csv", inputs=("db",))]
+    results = await Pipeline(stages, run_isolated=isolated, isolate=["csv"]).run(PipelineContext())
+    assert calls == ["harvest", "scripts.export_csv"]
+    assert list(results) == ["harvest", "csv"]
+
+
+def test_context_creates_one_analytics_snapshot(monkeypatch):
+    import core.analytics
+    import database.connector
+
+    sessions = []
+
+    class _Session:
+        def __init__(self):
+            sessions.append(self)
+            self.closed = False
+
+        def close(self):
+            self.closed = True
+
+    class _SlowSnapshot:
+        def __init__(self, db):
+            time.sleep(0.01)  # widen the window between the None check and the assignment
+
+    monkeypatch.setattr(database.connector, "ReadOnlySession", _Session)
+    monkeypatch.setattr(core.analytics, "AnalyticsSnapshot", _SlowSnapshot)
+    ctx = PipelineContext()
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(ctx.analytics)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ctx.close()
+
+    assert len({id(a) for a in seen}) == 1
+    assert len(sessions) == 1 and sessions[0].closed
+
+
+@pytest.mark.asyncio
+async def test_unchanged_inputs_are_cached(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "insights.json").write_text("[]")
+    runs = []
+
+    def export(ctx):
+        runs.append("export")
+        (tmp_path / "out.json").write_text("{}")
+
+    stages = [Stage("export", "e", export, inputs=("insights.json",), outputs=("out.json",))]
+
+    def run(force=False):
+        return Pipeline(stages, state=PipelineState(str(tmp_path / "state.json")), force=force).run()
+
+    assert (await run())["export"].status == "ok"
+    assert (await run())["export"].status == "cached"
+    assert (await run(force=True))["export"].status == "ok"
+
+    (tmp_path / "insights.json").write_text("[1]")
+    assert (await run())["export"].status == "ok"
+    (tmp_path / "out.json").unlink()
+    assert (await run())["export"].status == "ok"
+    assert runs == ["export"] * 4
+
+
+def test_database_fingerprint_tracks_writes(tmp_path):
+    import sqlite3
+    db_file = str(tmp_path / "clan.db")
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE clan_members (id INTEGER PRIMARY KEY, username TEXT, role TEXT)")
+    conn.execute("INSERT INTO clan_members (username, role) VALUES ('alice', 'member')")
+    conn.commit()
+
+    before = database_fingerprint(db_file)
+    assert database_fingerprint(db_file) == before
+    conn.execute("UPDATE clan_members SET role = 'captain'")
+    conn.commit()
+    assert database_fingerprint(db_file) != before
+    conn.close()
+
+
+@pytest.mark.asyncio
+async def test_stage_telemetry(tmp_path):
+    import sqlite3
+    from core import telemetry
+
+    conn = sqlite3.connect(str(tmp_path / "t.db"), check_same_thread=False, factory=telemetry.CountingConnection)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+
+    def write(ctx):
+        conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(50)])
+        conn.commit()
+        telemetry.count("http_requests", 3)
+        telemetry.count("http_cache_hits", 3)
+        telemetry.count("http_cache_misses")
+
+    def read(ctx):
+        assert len(conn.execute("SELECT x FROM t").fetchall()) == 50
+
+    results = await Pipeline([Stage("write", "w", write, outputs=("db",)),
+                              Stage("read", "r", read, inputs=("db",))]).run()
+    write_m, read_m = results["write"].metrics, results["read"].metrics
+    assert (write_m["rows_written"], write_m["rows_read"]) == (50, 0)
+    assert (read_m["rows_written"], read_m["rows_read"]) == (0, 50)
+    assert write_m["http_requests"] == 3 and write_m["http_cache_hit_ratio"] == 0.75
+    assert write_m["cpu_s"] >= 0 and write_m["wall_s"] >= 0
+
+    report = telemetry.run_report(results, datetime(2026, 1, 1, tzinfo=timezone.utc), 1.0)
+    assert [s["name"] for s in report["stages"]] == ["write", "read"]
+    assert report["status"] == "ok"
+    conn.close()
+
+
+@pytest.mark.asyncio
+async def test_overlapping_stages_count_only_their_own_writes(tmp_path):
+    import sqlite3
+    from core import telemetry
+
+    setup = sqlite3.connect(str(tmp_path / "t.db"))
+    setup.execute("CREATE TABLE t (x INTEGER)")
+    setup.commit()
+    setup.close()
+    both_started = threading.Barrier(2)
+
+    def writer(rows):
+        def run(ctx):
+            conn = sqlite3.connect(str(tmp_path / "t.db"), timeout=5, factory=telemetry.CountingConnection)
+            both_started.wait(timeout=5)
+            for i in range(rows):
+                conn.execute("INSERT INTO t VALUES (?)", (i,))
+                conn.commit()
+                time.sleep(0.001)
+            conn.close()
+        return run
+
+    results = await Pipeline([Stage("a", "a", writer(30)), Stage("b", "b", writer(20))]).run()
+    assert results["a"].metrics["rows_written"] == 30
+    assert results["b"].metrics["rows_written"] == 20
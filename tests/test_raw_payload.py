@@ -0,0 +1,90 @@
+"""Tests for compressed wom_snapshots.raw_data storage."""
+
+import json
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+
+from services.snapshot_ingestion import SnapshotIngestor, backfill_skill_snapshots
+from core.config import Config
+from database.models import Base, SkillSnapshot, WOMSnapshot
+from database.raw_payload import (
+    RawPayloadCodec,
+    compress_existing,
+    decompress_existing,
+    is_compressed,
+    storage_report,
+    store_dictionary,
+)
+
+
+def _snap(day: int):
+    return {
+        "createdAt": f"2025-01-{day:02d}T12:00:00.000Z",
+        "data": {
+            "skills": {s: {"metric": s, "experience": 1000 * day + i, "rank": 50 + i, "level": 40 + i}
+                       for i, s in enumerate(["overall", "attack", "defence", "strength", "hitpoints"])},
+            "bosses": {b: {"metric": b, "kills": day, "rank": -1} for b in ["zulrah", "vorkath", "kraken"]},
+        },
+    }
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_codec_round_trip_with_dictionary():
+    raw = json.dumps(_snap(3))
+    plain = RawPayloadCodec()
+    trained = RawPayloadCodec({1: json.dumps(_snap(1)).encode()})
+
+    assert plain.decode(plain.encode(raw)) == raw
+    blob = trained.encode(raw)
+    assert is_compressed(blob) and trained.decode(blob) == raw
+    assert len(blob) < len(plain.encode(raw)) < len(raw)
+    with pytest.raises(LookupError):
+        plain.decode(blob)
+    assert plain.decode(raw) == raw  # legacy text rows pass through
+
+
+def test_compress_existing_rows_and_lazy_payload(db):
+    ingestor = SnapshotIngestor(db)
+    ingestor.add_player("alice", None, [_snap(d) for d in range(1, 6)])
+    ingestor.finish()
+    before = storage_report(db)
+
+    assert store_dictionary(db) == 1
+    assert compress_existing(db) == 5
+    after = storage_report(db)
+
+    assert before["text_rows"] == 5 and after["text_rows"] == 0
+    assert after["stored_bytes"] < before["stored_bytes"] / 3
+    snap = db.execute(select(WOMSnapshot).order_by(WOMSnapshot.id)).scalars().first()
+    assert "raw_data" not in snap.__dict__  # deferred until accessed
+    assert snap.payload["data"]["skills"]["attack"]["level"] == 41
+
+    # Readers of the typed tables work off compressed rows too
+    db.query(SkillSnapshot).delete()
+    db.commit()
+    assert backfill_skill_snapshots(db) == 5
+
+    assert decompress_existing(db) == 5
+    assert db.execute(text("SELECT COUNT(*) FROM wom_snapshots WHERE typeof(raw_data) = 'text'")).scalar() == 5
+
+
+def test_ingest_compresses_when_enabled(db, monkeypatch):
+    monkeypatch.setattr(Config, "RAW_DATA_COMPRESSION", "zlib")
+    ingestor = SnapshotIngestor(db)
+    ingestor.add_player("alice", None, [_snap(1)])
+    ingestor.finish()
+
+    stored = db.execute(text("SELECT raw_data FROM wom_snapshots")).scalar_one()
+    assert is_compressed(stored)
+    assert db.execute(select(WOMSnapshot)).scalar_one().payload == _snap(1)
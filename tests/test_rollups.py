@@ -0,0 +1,93 @@
+"""Tests for the discord_author_daily message rollup."""
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from services.discord import DiscordFetcher
+from core.analytics import AnalyticsService
+from database import rollups
+from database.models import Base, ClanMember, DiscordAuthorDaily, DiscordMessage
+
+BASE = datetime(2025, 3, 1, 10, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture()
+def db_session():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _row(mid, author, minutes, user_id=None):
+    return {"id": mid, "author_id": 1, "author_name": author, "content": "x", "channel_id": 10,
+            "channel_name": "general", "guild_id": 1, "guild_name": "Clan",
+            "created_at": BASE + timedelta(minutes=minutes), "user_id": user_id}
+
+
+MESSAGES = [
+    _row(1, "Alice", 5, 1), _row(2, "alice", 20, 1), _row(3, "Bob", 50),
+    _row(4, "Alice", 70, 1), _row(5, "Bob", 24 * 60 + 3), _row(6, "Carol", 24 * 60 + 130),
+]
+
+
+def _store(db, rows, rollup=True):
+    db.execute(insert(DiscordMessage.__table__), rows)
+    if rollup:
+        rollups.record_messages(db, rows)
+    db.commit()
+
+
+def test_incremental_rollup_matches_rebuild(db_session):
+    _store(db_session, MESSAGES[:3])
+    _store(db_session, MESSAGES[3:])
+    incremental = db_session.execute(select(DiscordAuthorDaily.author_key, DiscordAuthorDaily.day,
+                                            DiscordAuthorDaily.hour, DiscordAuthorDaily.message_count)).all()
+
+    rollups.rebuild_author_daily(db_session)
+    rebuilt = db_session.execute(select(DiscordAuthorDaily.author_key, DiscordAuthorDaily.day,
+                                        DiscordAuthorDaily.hour, DiscordAuthorDaily.message_count)).all()
+
+    assert sorted(incremental) == sorted(rebuilt)
+    assert ("alice", "2025-03-01", 10, 2) in rebuilt
+
+
+def test_windows_are_exact_inside_an_hour(db_session):
+    _store(db_session, MESSAGES)
+
+    # 10:15 cuts the first hour: message 1 (10:05) is out, message 2 (10:20) is in
+    since = BASE + timedelta(minutes=15)
+    assert rollups.author_message_counts(db_session, since) == {"alice": 2, "bob": 2, "carol": 1}
+    assert rollups.user_message_counts(db_session, since) == {1: 2}
+    assert rollups.daily_message_counts(db_session, since) == {"2025-03-01": 3, "2025-03-02": 2}
+    assert rollups.author_message_counts(db_session) == {"alice": 3, "bob": 2, "carol": 1}
+    # 2025-03-01 is a Saturday (%w = 6)
+    assert rollups.hourly_message_counts(db_session, since)[(6, 10)] == 2
+
+
+def test_analytics_reads_from_rollup(db_session):
+    _store(db_session, MESSAGES)
+    # Rows that bypassed the rollup are not seen by windowed counts
+    _store(db_session, [_row(7, "Alice", 80, 1)], rollup=False)
+
+    analytics = AnalyticsService(db_session)
+    assert analytics.get_message_counts(BASE) == {"alice": 3, "bob": 2, "carol": 1}
+    assert analytics.get_message_counts_by_id(BASE) == {1: 3}
+    assert analytics.get_discord_message_counts_bulk(["Alice", "Dave"], BASE) == {"alice": 3}
+
+
+def test_save_batch_rolls_up_only_new_messages(db_session):
+    db_session.add(ClanMember(id=1, username="alice"))
+    db_session.commit()
+
+    fetcher = DiscordFetcher()
+    fetcher._save_batch(db_session, [dict(r) for r in MESSAGES[:2]])
+    fetcher._save_batch(db_session, [dict(r) for r in MESSAGES[:4]])
+
+    assert rollups.author_message_counts(db_session) == {"alice": 3, "bob": 1}
+    assert rollups.user_message_counts(db_session) == {1: 3}
@@ -0,0 +1,91 @@
+"""Tests for the set-based roster sync used by process_wom_harvest."""
+
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker, Session
+
+from scripts.harvest_sqlite import sync_roster_bulk, sync_roster_per_row
+from database.models import Base, ClanMember, WOMSnapshot
+
+
+@pytest.fixture()
+def db():
+    """Provides a fresh in-memory test database for each test."""
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _seed(db: Session, names):
+    for name in names:
+        db.add(ClanMember(username=name, role="member"))
+    db.commit()
+
+
+def test_bulk_sync_inserts_updates_and_counts(db: Session):
+    _seed(db, ["alice", "bob", "carol", "dave", "erin"])
+    db.add(WOMSnapshot(username="alice", timestamp=datetime(2025, 1, 1), total_xp=1, total_boss_kills=0))
+    db.add(WOMSnapshot(username="alice", timestamp=datetime(2025, 2, 1), total_xp=2, total_boss_kills=0))
+    db.commit()
+
+    roster = [
+        {"username": "Alice", "role": "owner", "joinedAt": "2024-01-01T00:00:00.000Z"},
+        {"username": "bob", "role": "member"},
+        {"username": "carol", "role": "member"},
+        {"username": "dave", "role": "member"},
+        {"username": "erin", "role": "member"},
+        {"username": "Frank", "role": "guest"},
+    ]
+    result = sync_roster_bulk(db, roster)
+    db.commit()
+
+    assert (result.inserted, result.updated, result.unchanged, result.deleted) == (1, 1, 4, 0)
+    assert result.rows_changed == 2
+    assert result.latest_snapshot_ts["alice"] == datetime(2025, 2, 1)
+    assert "frank" in result.members
+
+    alice = db.execute(select(ClanMember).where(ClanMember.username == "alice")).scalar_one()
+    assert alice.role == "owner"
+    assert alice.joined_at == datetime(2024, 1, 1)
+
+
+def test_bulk_sync_deletes_stale_members_below_threshold(db: Session):
+    _seed(db, ["m1", "m2", "m3", "m4", "m5", "m6", "m7", "m8", "m9", "gone"])
+
+    roster = [{"username": f"m{i}", "role": "member"} for i in range(1, 10)]
+    result = sync_roster_bulk(db, roster)
+    db.commit()
+
+    assert result.deleted == 1
+    assert not result.delete_aborted
+    assert "gone" not in result.members
+    assert db.execute(select(ClanMember).where(ClanMember.username == "gone")).scalar_one_or_none() is None
+
+
+def test_bulk_sync_aborts_mass_delete(db: Session):
+    _seed(db, ["a", "b", "c", "d"])
+
+    result = sync_roster_bulk(db, [{"username": "a", "role": "member"}])
+    db.commit()
+
+    assert result.delete_aborted
+    assert result.would_delete == 3
+    assert result.deleted == 0
+    assert len(db.execute(select(ClanMember)).scalars().all()) == 4
+
+
+def test_bulk_sync_matches_legacy_counts(db: Session):
+    _seed(db, ["alice", "bob"])
+    roster = [{"username": "alice", "role": "owner"}, {"username": "bob", "role": "member"}, {"username": "new guy", "role": "member"}]
+
+    legacy = sync_roster_per_row(db, roster)
+    db.rollback()
+    bulk = sync_roster_bulk(db, roster)
+
+    assert (bulk.inserted, bulk.updated, bulk.unchanged) == (legacy.inserted, legacy.updated, legacy.unchanged)
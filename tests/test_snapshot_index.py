@@ -0,0 +1,71 @@
+"""Tests for the wom_snapshots as-of index."""
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from core.analytics import AnalyticsService, SnapshotRow
+from core.snapshot_index import SnapshotAsOfIndex
+from database.models import Base, WOMSnapshot
+
+BASE = datetime(2025, 1, 1)
+
+
+@pytest.fixture()
+def db_session():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    for user, days in (("alice", [0, 5, 10, 10, 40]), ("bob", [3, 20]), ("carol", [35])):
+        for i, day in enumerate(days):
+            session.add(WOMSnapshot(username=user, timestamp=BASE + timedelta(days=day),
+                                    total_xp=1000 * day + i, total_boss_kills=day))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _window_query(db, cutoff):
+    """The ROW_NUMBER() baseline query the index replaces."""
+    ranked = select(
+        WOMSnapshot.id, WOMSnapshot.username,
+        func.row_number().over(partition_by=WOMSnapshot.username,
+                               order_by=(WOMSnapshot.timestamp.desc(), WOMSnapshot.id.desc())).label("rn"),
+    ).where(WOMSnapshot.timestamp <= cutoff).subquery()
+    return {u: i for i, u in db.execute(select(ranked.c.id, ranked.c.username).where(ranked.c.rn == 1))}
+
+
+def test_as_of_matches_window_query(db_session):
+    index = SnapshotAsOfIndex.load(db_session)
+    for day in (-1, 0, 4, 10, 11, 36, 100):
+        cutoff = BASE + timedelta(days=day)
+        assert {u: s.id for u, s in index.at(cutoff).items()} == _window_query(db_session, cutoff)
+
+
+def test_timezone_aware_cutoffs_and_bulk_baselines(db_session):
+    index = SnapshotAsOfIndex.load(db_session)
+    aware = datetime(2025, 1, 11, tzinfo=timezone.utc)
+
+    baselines = index.baselines([aware, None])
+
+    assert baselines[aware]["alice"].total_xp == 10003  # later of the two day-10 rows
+    assert set(baselines[aware]) == {"alice", "bob"}
+    assert baselines[None]["carol"].timestamp == BASE + timedelta(days=35)
+    assert index.earliest()["alice"].total_xp == 0
+
+
+def test_analytics_cutoffs_share_one_index(db_session):
+    analytics = AnalyticsService(db_session)
+    c1, c2 = BASE + timedelta(days=6), BASE + timedelta(days=25)
+
+    bulk = analytics.get_snapshots_at_cutoffs([c1, c2])
+    index = analytics.snapshot_index()
+
+    assert analytics.get_snapshots_at_cutoff(c2)["bob"].total_xp == 20001
+    assert {u: s.id for u, s in bulk[c1].items()} == _window_query(db_session, c1)
+    assert isinstance(bulk[c2]["alice"], SnapshotRow)
+    assert analytics.snapshot_index() is index
+    assert analytics.get_min_timestamps()["bob"].total_xp == 3000
@@ -0,0 +1,289 @@
+"""Tests for the batched WOM snapshot ingestion engine."""
+
+import asyncio
+import pytest
+import threading
+from datetime import datetime
+from sqlalchemy import create_engine, select, func, text
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import StaticPool
+
+from scripts.harvest_sqlite import stream_wom_harvest, plan_group_delta, ingest_latest_snapshots, harvest_ingestor
+from services.discord import DiscordFetcher
+from services.snapshot_ingestion import (SnapshotIngestor, UNIQUE_SNAPSHOT_INDEX, backfill_skill_snapshots,
+                                         parse_wom_snapshot)
+from core.analytics import AnalyticsService
+from database.models import (Base, ClanMember, DiscordMessage, WOMSnapshot, BossSnapshot, SkillSnapshot,
+                             ActivitySnapshot)
+
+
+@pytest.fixture()
+def db():
+    """Provides a fresh in-memory test database for each test."""
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _snap(day: int, xp: int = None, zulrah: int = 5, vorkath: int = -1):
+    xp = 1000 + day if xp is None else xp  # distinct content per day unless pinned
+    return {
+        "createdAt": f"2025-01-{day:02d}T12:00:00.000Z",
+        "data": {
+            "skills": {"overall": {"experience": xp}},
+            "bosses": {
+                "zulrah": {"kills": zulrah, "rank": 10},
+                "vorkath": {"kills": vorkath, "rank": -1},
+            },
+        },
+    }
+
+
+def test_parse_wom_snapshot():
+    parsed = parse_wom_snapshot(_snap(3, xp=500, zulrah=7))
+    assert parsed.timestamp == datetime(2025, 1, 3, 12, 0)
+    assert parsed.total_xp == 500
+    assert parsed.total_boss_kills == 7
+    assert parsed.bosses == [("zulrah", 7, 10)]
+
+    assert parse_wom_snapshot({"data": {}}) is None
+    assert parse_wom_snapshot({"createdAt": "not a date"}) is None
+
+
+def test_ingestor_writes_snapshots_bosses_and_marks_member(db: Session):
+    db.add(ClanMember(username="alice", role="member"))
+    db.commit()
+    member_id = db.execute(select(ClanMember.id)).scalar_one()
+
+    ingestor = SnapshotIngestor(db, chunk_size=2, commit_interval=1)
+    ingestor.add_player("alice", member_id, [_snap(1), _snap(2), _snap(3)])
+    ingestor.add_player("bob", None, [_snap(1), {"createdAt": None}])
+    stats = ingestor.finish()
+
+    assert stats.snapshots_inserted == 4
+    assert stats.boss_rows == 4
+    assert stats.invalid_skipped == 1
+    assert stats.chunks == 2
+
+    snaps = db.execute(select(WOMSnapshot).order_by(WOMSnapshot.id)).scalars().all()
+    assert [s.username for s in snaps] == ["alice", "alice", "alice", "bob"]
+    assert snaps[0].user_id == member_id and snaps[3].user_id is None
+
+    bosses = db.execute(select(BossSnapshot)).scalars().all()
+    assert {b.snapshot_id for b in bosses} == {s.id for s in snaps}
+    assert all(b.wom_snapshot_id == b.snapshot_id for b in bosses)
+
+    alice = db.execute(select(ClanMember)).scalar_one()
+    assert alice.last_updated is not None
+
+
+@pytest.mark.parametrize("unique_index", [True, False])
+def test_ingestor_skips_duplicates_across_runs(db: Session, unique_index):
+    if unique_index:  # as created by the dedup_snaps_002 migration
+        db.execute(text(f"CREATE UNIQUE INDEX {UNIQUE_SNAPSHOT_INDEX} ON wom_snapshots (username, timestamp)"))
+        db.commit()
+    db.add(ClanMember(username="carol", role="member"))  # caller's pending work survives the ingestor
+
+    seed = SnapshotIngestor(db)
+    assert seed._has_unique_index is unique_index
+    seed.add_player("alice", None, [_snap(1)])
+    seed.finish()
+
+    ingestor = SnapshotIngestor(db)
+    ingestor.add_player("alice", None, [_snap(1), _snap(2)])
+    ingestor.flush()
+    ingestor.add_player("alice", None, [_snap(2), _snap(4)])
+    stats = ingestor.finish()
+
+    assert stats.snapshots_inserted == 2
+    assert stats.duplicates_skipped == 2
+    assert db.execute(select(func.count()).select_from(WOMSnapshot)).scalar() == 3
+    assert db.execute(select(func.count()).select_from(BossSnapshot)).scalar() == 3
+    assert db.execute(select(ClanMember.username)).scalar_one() == "carol"
+
+
+def _skilled_snap(day: int, attack: int):
+    snap = _snap(day)
+    snap["data"]["skills"]["attack"] = {"level": attack, "experience": 13034431, "rank": 5}
+    snap["data"]["activities"] = {"clue_scrolls_all": {"score": 12, "rank": 3}, "lms": {"score": -1, "rank": -1}}
+    return snap
+
+
+def test_ingestor_writes_typed_skill_rows(db: Session):
+    ingestor = SnapshotIngestor(db)
+    ingestor.add_player("alice", None, [_skilled_snap(1, 99)])
+    ingestor.add_player("bob", None, [_skilled_snap(1, 60)])
+    stats = ingestor.finish()
+
+    assert stats.skill_rows == 6  # overall + attack per snapshot, one ranked activity each
+    assert db.execute(select(func.count()).select_from(ActivitySnapshot)).scalar() == 2
+    ids = list(db.execute(select(WOMSnapshot.id)).scalars())
+    assert AnalyticsService(db).get_skill_mastery(ids) == {"labels": ["Attack"], "datasets": [{"data": [1]}]}
+
+
+def test_backfill_skill_snapshots(db: Session):
+    ingestor = SnapshotIngestor(db)
+    ingestor.add_player("alice", None, [_skilled_snap(1, 99), _skilled_snap(2, 99)])
+    ingestor.finish()
+    # Simulate history ingested before the typed tables existed
+    db.query(SkillSnapshot).delete()
+    db.query(ActivitySnapshot).delete()
+    db.commit()
+
+    assert backfill_skill_snapshots(db, batch_size=1) == 2
+    assert backfill_skill_snapshots(db) == 0  # idempotent
+    levels = db.execute(select(SkillSnapshot.level).where(SkillSnapshot.skill == "attack")).scalars().all()
+    assert levels == [99, 99]
+    assert db.execute(select(func.count()).select_from(ActivitySnapshot)).scalar() == 2
+
+
+def test_unchanged_snapshots_stored_as_references(db: Session):
+    seed = SnapshotIngestor(db)
+    seed.add_player("alice", None, [_snap(1, xp=500, zulrah=3)])
+    seed.finish()
+
+    # Offline for two snapshots (one in this run, one matching the stored row), then active again
+    ingestor = SnapshotIngestor(db, chunk_size=10)
+    ingestor.add_player("alice", None, [_snap(2, xp=500, zulrah=3), _snap(3, xp=500, zulrah=3), _snap(4, xp=900, zulrah=4)])
+    stats = ingestor.finish()
+
+    assert stats.snapshots_inserted == 3 and stats.unchanged_refs == 2
+    snaps = db.execute(select(WOMSnapshot).order_by(WOMSnapshot.timestamp)).scalars().all()
+    assert [s.ref_snapshot_id for s in snaps] == [None, snaps[0].id, snaps[0].id, None]
+    assert snaps[1].raw_data is None and snaps[2].payload == snaps[0].payload
+    assert db.execute(select(func.count()).select_from(BossSnapshot)).scalar() == 2
+
+    # Readers resolve references transparently
+    boss = AnalyticsService(db).get_boss_data([s.id for s in snaps])
+    assert boss[snaps[2].id] == {"zulrah": 3} and boss[snaps[3].id] == {"zulrah": 4}
+
+
+def test_reference_to_missing_snapshot_raises(db: Session):
+    db.add(WOMSnapshot(id=2, username="alice", timestamp=datetime(2025, 1, 2), ref_snapshot_id=1))
+    db.commit()
+    snap = db.get(WOMSnapshot, 2)
+    with pytest.raises(LookupError, match="missing snapshot 1"):
+        snap.payload
+
+
+class _FakeWOM:
+    def __init__(self, histories):
+        self.histories = histories
+        self.calls = []
+
+    async def get_player_snapshots(self, username, start_date=None):
+        self.calls.append((username, start_date))
+        await asyncio.sleep(0)
+        return self.histories.get(username)
+
+
+@pytest.mark.asyncio
+async def test_stream_harvest_overlaps_fetch_and_write():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        session.add(ClanMember(username="alice", role="member"))
+        session.commit()
+        members = {"alice": session.execute(select(ClanMember.id, ClanMember.username)).one()}
+
+        wom = _FakeWOM({
+            "Alice": [_snap(1), _snap(2)],
+            "bob": [_snap(1)],
+            "carol": None,
+        })
+        jobs = [("Alice", "2024-12-31T00:00:00"), ("bob", None), ("carol", None)]
+        ingestor = SnapshotIngestor(session, chunk_size=1)
+        writer_threads = set()
+        add_player = ingestor.add_player
+
+        def tracked_add_player(*args):
+            writer_threads.add(threading.get_ident())
+            return add_player(*args)
+
+        ingestor.add_player = tracked_add_player
+
+        fetched = await stream_wom_harvest(wom, jobs, ingestor, members, workers=2, queue_size=1)
+        stats = ingestor.finish()
+
+        assert fetched == 3
+        # The session is shared with the Discord harvest: writes stay on the loop thread
+        assert writer_threads == {threading.get_ident()}
+        assert sorted(wom.calls) == sorted(jobs)
+        assert stats.snapshots_inserted == 3
+        rows = session.execute(select(WOMSnapshot.username, WOMSnapshot.user_id)).all()
+        assert sorted(rows, key=lambda r: r[0]) == [("alice", members["alice"].id)] * 2 + [("bob", None)]
+    finally:
+        session.close()
+
+
+def test_discord_rollback_keeps_harvested_chunks(monkeypatch):
+    # WOM and Discord sessions share the one StaticPool connection, as in run_sqlite_harvest
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Sessions = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    wom_db, discord_db = Sessions(), Sessions()
+    try:
+        ingestor = harvest_ingestor(wom_db)
+        ingestor.chunk_size = 1
+        ingestor.add_player("alice", None, [_snap(1), _snap(2)])
+
+        def fail(db, batch):
+            raise RuntimeError("checkpoint write failed")
+
+        fetcher = DiscordFetcher()
+        monkeypatch.setattr(fetcher, "_advance_checkpoint", fail)
+        batch = [{'id': 1, 'author_id': 7, 'author_name': 'bob', 'content': 'hi', 'channel_id': 10,
+                  'channel_name': 'general', 'guild_id': 1, 'guild_name': 'Clan',
+                  'created_at': datetime(2025, 3, 1), 'user_id': None}]
+        with pytest.raises(RuntimeError):
+            fetcher._save_batch(discord_db, batch)
+        stats = ingestor.finish()
+
+        assert discord_db.execute(select(func.count()).select_from(DiscordMessage)).scalar() == 0
+        assert stats.snapshots_inserted == 2
+        assert wom_db.execute(select(func.count()).select_from(WOMSnapshot)).scalar() == 2
+    finally:
+        wom_db.close()
+        discord_db.close()
+
+
+def test_plan_group_delta_routes_members():
+    now = datetime(2025, 1, 10, 12, 0)
+    stored = {
+        "steady": datetime(2025, 1, 10, 6, 0),
+        "grinder": datetime(2025, 1, 10, 6, 0),
+        "returning": datetime(2024, 12, 1),
+    }
+    members = [
+        {"username": "Steady", "lastChangedAt": "2025-01-09T00:00:00.000Z"},
+        {"username": "grinder", "lastChangedAt": "2025-01-10T11:00:00.000Z"},
+        {"username": "returning", "lastChangedAt": "2025-01-10T11:00:00.000Z"},
+        {"username": "newbie", "lastChangedAt": None},
+    ]
+
+    plan = plan_group_delta(members, stored, now=now, max_gap_days=3)
+
+    assert plan.unchanged == ["Steady"]
+    assert plan.latest == ["grinder"]
+    assert plan.history == [("returning", "2024-12-01T00:00:00"), ("newbie", None)]
+
+
+@pytest.mark.asyncio
+async def test_ingest_latest_snapshots(db: Session):
+    class _LatestWOM:
+        async def get_player_latest_snapshot(self, username):
+            return _snap(10, xp=42) if username == "grinder" else None
+
+    ingestor = SnapshotIngestor(db)
+    fetched = await ingest_latest_snapshots(_LatestWOM(), ["grinder", "ghost"], ingestor, {})
+    stats = ingestor.finish()
+
+    assert fetched == 1
+    assert stats.snapshots_inserted == 1
+    assert db.execute(select(WOMSnapshot.total_xp)).scalar_one() == 42
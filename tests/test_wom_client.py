@@ -0,0 +1,119 @@
+"""Tests for WOMClient request handling (coalescing, pagination)."""
+
+import asyncio
+import aiohttp
+import pytest
+
+from services.wom import WOMClient
+
+
+class _FakeResponse:
+    def __init__(self, status, body):
+        self.status = status
+        self._body = body
+        self.headers = {}
+
+    async def json(self):
+        await asyncio.sleep(0.01)  # keep the request in flight long enough to overlap
+        return self._body
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(None, (), status=self.status, message="Not Found")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _FakeSession:
+    closed = False
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.calls = []
+
+    def request(self, method, url, json=None, params=None, headers=None):
+        self.calls.append((method, url, dict(params or {})))
+        return _FakeResponse(*self.handler(method, url, params or {}))
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_gets_share_one_request():
+    client = WOMClient()
+    client._session = _FakeSession(lambda m, url, p: (200, {"url": url}))
+
+    results = await asyncio.gather(
+        client.get_player_details("zezima"),
+        client.get_player_details("zezima"),
+        client.get_player_details("zezima"),
+        client.get_player_details("lynx titan"),
+    )
+
+    assert results[0] == results[1] == results[2]
+    assert len(client._session.calls) == 2
+    assert client.coalesced_requests == 2
+    assert client.get_stats()["coalesced_requests"] == 2
+    assert not client._inflight
+
+
+@pytest.mark.asyncio
+async def test_coalesced_waiters_share_failures():
+    client = WOMClient()
+    client._session = _FakeSession(lambda m, url, p: (404, None))
+
+    results = await asyncio.gather(
+        client.get_player_details("nobody"),
+        client.get_player_details("nobody"),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(r, Exception) for r in results)
+    assert client.coalesced_requests == 1
+    assert not client._inflight
+
+
+def _history_handler(total):
+    def handler(method, url, params):
+        offset, limit = params["offset"], params["limit"]
+        return 200, [{"createdAt": f"snap-{i}"} for i in range(offset, min(offset + limit, total))]
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_snapshot_pages_fetched_in_one_wave_with_hint():
+    client = WOMClient()
+    client._session = _FakeSession(_history_handler(250))
+
+    pages = [page async for page in client.iter_player_snapshot_pages("zezima", page_hint=3)]
+
+    assert [len(p) for p in pages] == [100, 100, 50]
+    assert [p["offset"] for _, _, p in client._session.calls] == [0, 100, 200]
+    assert client.snapshot_page_counts["zezima"] == 3
+
+
+@pytest.mark.asyncio
+async def test_get_player_snapshots_without_hint_matches_sequential_order():
+    client = WOMClient()
+    client._session = _FakeSession(_history_handler(420))
+
+    snaps = await client.get_player_snapshots("zezima")
+
+    assert [s["createdAt"] for s in snaps] == [f"snap-{i}" for i in range(420)]
+    assert client.snapshot_page_counts["zezima"] == 5
+
+
+def test_estimate_snapshot_pages():
+    client = WOMClient()
+    assert client.estimate_snapshot_pages(page_hint=7) == 7
+    assert client.estimate_snapshot_pages() == 1
+    assert client.estimate_snapshot_pages("2025-01-01T00:00:00Z", "2025-01-02T00:00:00Z") == 1
+    assert client.estimate_snapshot_pages("2024-01-01T00:00:00Z", "2025-01-01T00:00:00Z") == 15
+    # The previous run's page count caps a window estimate but never inflates it
+    assert client.estimate_snapshot_pages("2025-01-01T00:00:00Z", "2025-01-02T00:00:00Z", page_hint=40) == 1
+    assert client.estimate_snapshot_pages("2024-01-01T00:00:00Z", "2025-01-01T00:00:00Z", page_hint=3) == 3
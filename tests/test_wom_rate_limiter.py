@@ -0,0 +1,60 @@
+"""Tests for the WOMClient token-bucket rate limiter."""
+
+import pytest
+from unittest.mock import patch
+
+from services.wom import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture()
+def clock():
+    clock = FakeClock()
+
+    async def fake_sleep(seconds):
+        clock.now += seconds
+
+    with patch("services.wom.asyncio.sleep", fake_sleep):
+        yield clock
+
+
+@pytest.mark.asyncio
+async def test_bucket_allows_burst_then_paces_to_rate(clock):
+    bucket = TokenBucket(rate_rpm=60, capacity=3, clock=clock)
+
+    waits = [await bucket.acquire() for _ in range(5)]
+
+    # First three are the burst, then one token per second at 60 RPM
+    assert waits[:3] == [0, 0, 0]
+    assert waits[3] == pytest.approx(1.0)
+    assert waits[4] == pytest.approx(1.0)
+    stats = bucket.get_stats()
+    assert stats["requests"] == 5
+    assert stats["achieved_rpm"] == 5
+    assert stats["max_wait_ms"] == pytest.approx(1000.0)
+
+
+@pytest.mark.asyncio
+async def test_bucket_aimd_backs_off_on_429_and_recovers(clock):
+    bucket = TokenBucket(rate_rpm=60, capacity=2, min_rpm=20, increase_rpm=5, clock=clock)
+
+    bucket.on_throttle()
+    assert bucket.rate_rpm == 30
+    bucket.on_throttle()
+    bucket.on_throttle()
+    assert bucket.rate_rpm == 20  # floored at min_rpm
+
+    # Bucket was emptied, so the next request waits a full slot at the reduced rate
+    assert await bucket.acquire() == pytest.approx(3.0)
+
+    for _ in range(10):
+        bucket.on_success()
+    assert bucket.rate_rpm == 60  # additive increase, capped at the configured target
+    assert bucket.get_stats()["throttled"] == 3